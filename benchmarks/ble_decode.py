@@ -0,0 +1,117 @@
+"""
+BLE decode benchmark - Measures how many 70-byte notifications per second one core turns into published samples:
+- decode   Chords_BLE.decode_notification alone (np.frombuffer with a structured dtype, vectorized counter unwrapping)
+- queue    Connection.handle_ble_notification, the bleak callback: decode and queue the block
+- publish  queue, then Connection.deliver_samples stamps every block and publishes it once to the sink bus
+The process is pinned to one CPU where the OS allows it (Linux), so the notification rate is a single-core figure;
+a BLE link delivers 50 notifications/s per device. Half of the runs use streams with 1% of the notifications lost.
+
+Usage:
+$ python -m benchmarks.ble_decode
+$ python -m benchmarks.ble_decode --notifications 50000 --cpu 2
+"""
+
+import io
+import os
+import time
+import argparse
+import contextlib
+import numpy as np
+from chordspy.chords_ble import Chords_BLE
+from chordspy.connection import Connection
+from chordspy.sample_queue import SampleQueue
+from chordspy.sinks import Sink
+
+class CountingSink(Sink):
+    """Counts the samples published to it, standing in for LSL and the recording."""
+    def __init__(self):
+        super().__init__('count', max_samples=10 ** 9)
+        self.samples = 0
+
+    def consume(self, block):
+        self.samples += len(block.samples)
+
+def notifications(count, lossy):
+    """
+    Generate notifications of Chords_BLE.BLOCK_COUNT samples, dropping 1% of them when lossy.
+    Returns:
+        list: bytearray notifications
+    """
+    rng = np.random.default_rng(4)
+    records = np.zeros(count * Chords_BLE.BLOCK_COUNT, dtype=Chords_BLE.SAMPLE_DTYPE)
+    records['counter'] = np.arange(len(records)) % 256
+    records['channels'] = rng.integers(-2048, 2048, size=(len(records), Chords_BLE.NUM_CHANNELS))
+    packets = [bytearray(records[i:i + Chords_BLE.BLOCK_COUNT].tobytes()) for i in range(0, len(records), Chords_BLE.BLOCK_COUNT)]
+    if lossy:
+        keep = rng.random(len(packets)) >= 0.01
+        packets = [p for p, k in zip(packets, keep) if k]
+    return packets
+
+def make_manager(packets):
+    """Connection set up like connect_ble, without LSL or the shared ring."""
+    manager = Connection()
+    manager.lsl_enabled = False
+    manager.shared_ring_name = None
+    manager.show_rate = False
+    manager.running = True
+    manager.ble_connection = Chords_BLE()
+    manager.sample_queue = SampleQueue(len(packets) * Chords_BLE.BLOCK_COUNT)
+    return manager
+
+def run_decode(packets):
+    """Decode every notification. Returns the elapsed seconds."""
+    client = Chords_BLE()
+    start = time.perf_counter()
+    for packet in packets:
+        client.decode_notification(packet)
+    return time.perf_counter() - start
+
+def run_queue(packets):
+    """Decode and queue every notification through the Connection callback. Returns the elapsed seconds."""
+    manager = make_manager(packets)
+    start = time.perf_counter()
+    for packet in packets:
+        manager.handle_ble_notification(None, packet)
+    return time.perf_counter() - start
+
+def run_publish(packets):
+    """Decode, queue, stamp and publish every notification to a sink. Returns the elapsed seconds."""
+    manager = make_manager(packets)
+    sink = manager.sinks.attach(CountingSink())
+    start = time.perf_counter()
+    for packet in packets:
+        manager.handle_ble_notification(None, packet)
+    manager.sample_queue.close()
+    manager.deliver_samples("BLE")    # Drains the queue on this thread and returns once it is empty
+    sink.close()                      # Waits until the sink got every block
+    elapsed = time.perf_counter() - start
+    assert sink.samples == len(packets) * Chords_BLE.BLOCK_COUNT, "samples were lost on the way to the sink"
+    return elapsed
+
+CASES = {'decode': run_decode, 'queue': run_queue, 'publish': run_publish}
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure BLE notifications decoded and published per second on one core')
+    parser.add_argument('--notifications', type=int, default=20000, help='Notifications per run')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per case, the best one is kept')
+    parser.add_argument('--cpu', type=int, default=0, help='CPU to pin the process to')
+    args = parser.parse_args()
+
+    if hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, {args.cpu})
+        print(f"Pinned to CPU {args.cpu}")
+    else:
+        print("CPU pinning is not available on this OS, the figures may use more than one core")
+
+    print(f"{'case':<16} {'notifications/s':>16} {'us/notification':>16} {'samples/s':>12}")
+    for lossy in (False, True):
+        packets = notifications(args.notifications, lossy)
+        for name, run in CASES.items():
+            with contextlib.redirect_stdout(io.StringIO()):    # Gap and stream messages
+                best = min(run(packets) for _ in range(args.repeat))
+            rate = len(packets) / best
+            label = f"{name}/{'lossy' if lossy else 'clean'}"
+            print(f"{label:<16} {rate:>16.0f} {best / len(packets) * 1e6:>16.2f} {rate * Chords_BLE.BLOCK_COUNT:>12.0f}")
+
+if __name__ == "__main__":
+    main()
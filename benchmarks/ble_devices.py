@@ -0,0 +1,66 @@
+"""
+Multi-device BLE benchmark - Streams N emulated NPG devices (chordspy.emulator.BleEmulator, 10-sample notifications at
+500 Hz per device) through Connection.connect_ble_devices, all on one event loop thread, and reports per device the
+delivered rate, missing samples and reconnects, plus the process CPU time and thread count. With --drop one device
+goes out of range in the middle of the run to exercise its independent reconnect while the others keep streaming.
+
+Usage:
+$ python -m benchmarks.ble_devices
+$ python -m benchmarks.ble_devices --devices 8 --seconds 20 --merged --drop 3
+"""
+
+import io
+import time
+import argparse
+import threading
+import contextlib
+from chordspy.connection import Connection
+from chordspy.emulator import BleEmulator
+
+def main():
+    parser = argparse.ArgumentParser(description='Stream several emulated BLE devices on one event loop')
+    parser.add_argument('--devices', type=int, default=4, help='Number of emulated devices')
+    parser.add_argument('--seconds', type=float, default=10, help='Seconds to stream')
+    parser.add_argument('--merged', action='store_true', help='Publish one merged stream instead of one per device')
+    parser.add_argument('--drop', type=float, default=0.0, help='Take the first device out of range for this many seconds halfway through')
+    parser.add_argument('--drop-rate', type=float, default=0.0, help='Probability that a notification is lost on the air')
+    args = parser.parse_args()
+
+    emulator = BleEmulator(drop_rate=args.drop_rate, seed=1)
+    addresses = [f"EMU:00:00:00:00:{i + 1:02X}" for i in range(args.devices)]
+    manager = Connection()
+    manager.stream_name = "chordspy_ble_devices"
+    manager.shared_ring_name = None
+    manager.show_rate = False
+    manager.reconnect_max = 1.0
+    threads_before = threading.active_count()
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log):    # Connection and reconnect messages
+        manager.connect_ble_devices(addresses, args.merged, emulator.client)
+        start_wall, start_cpu = time.monotonic(), time.process_time()
+        if args.drop:
+            time.sleep(args.seconds / 2)
+            emulator.drop(addresses[0], args.drop)
+            time.sleep(args.seconds / 2)
+        else:
+            time.sleep(args.seconds)
+        elapsed, cpu = time.monotonic() - start_wall, time.process_time() - start_cpu
+        threads = threading.active_count() - threads_before
+        stats = manager.ble_device_stats()
+        sinks = {address: device.sink_stats() for address, device in manager.ble_devices.items()}
+        merged_out = manager.sink_stats().get('lsl', {}).get('samples_out', 0)
+        manager.cleanup()
+
+    print(f"{args.devices} devices for {elapsed:.1f} s: {cpu / elapsed * 100:.1f}% of one core, {threads} threads added "
+          f"(one event loop for every device, the others are data handlers and sinks)")
+    print(f"{'device':<22} {'samples/s':>10} {'missing':>8} {'reconnects':>11} {'outage s':>9}")
+    for address in addresses:
+        device = stats[address]
+        delivered = sum(s.get('samples_out', 0) for s in sinks[address].values()) / max(1, len(sinks[address]))
+        print(f"{address:<22} {delivered / elapsed:>10.1f} {device['missing_samples']:>8} {device['reconnects']:>11} {device['outage_seconds']:>9.1f}")
+    if args.merged:
+        merge = stats['merged']
+        print(f"merged stream: {merged_out / elapsed:.1f} rows/s to LSL, {merge['late_samples']} late and {merge['filled_samples']} NaN-filled device samples")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Compression benchmark - Reports, for every predictor and codec of chordspy.compressed_recording, the compression
+ratio against raw int16 samples and the CPU cost of encoding and decoding one second of data, on a synthetic
+EXG-like signal (or on a recording given with --input). It also records the data through CompressedWriter, checks
+that CompressedRecording gives back exactly the same samples, and times a 10 s random-access read.
+
+Usage:
+$ python -m benchmarks.compression
+$ python -m benchmarks.compression --channels 16 --rate 500 --minutes 10
+$ python -m benchmarks.compression --input ChordsPy_20250101_120000.bin
+"""
+
+import os
+import time
+import tempfile
+import argparse
+import numpy as np
+from chordspy.binary_recording import BinaryRecording
+from chordspy.compressed_recording import CODECS, PREDICTORS, CompressedWriter, CompressedRecording, encode_chunk, decode_chunk
+
+CONFIGS = [(p, c, l) for p in PREDICTORS for c, l in (('zlib', 1), ('zlib', 6), ('lzma', 0), ('lzma', 6)) if c in CODECS]
+
+def make_signal(channels, rate, minutes):
+    """
+    Synthetic 12-bit EXG: 10 Hz rhythm, 50 Hz mains pickup, slow electrode drift and amplifier noise per channel.
+    Returns:
+        numpy.ndarray: (samples, channels) int16 ADC codes
+    """
+    rng = np.random.default_rng(0)
+    n = int(minutes * 60 * rate)
+    t = np.arange(n)[:, None] / rate
+    phase = rng.uniform(0, 2 * np.pi, size=(1, channels))
+    rhythm = rng.uniform(50, 200, size=(1, channels)) * np.sin(2 * np.pi * 10 * t + phase)
+    mains = 40 * np.sin(2 * np.pi * 50 * t)
+    drift = np.cumsum(rng.normal(0, 0.5, size=(n, channels)), axis=0)
+    noise = rng.normal(0, 3, size=(n, channels))
+    return np.clip(np.rint(2048 + rhythm + mains + drift + noise), 0, 4095).astype(np.int16)
+
+def measure(data, rate, chunk, predictor, codec, level):
+    """
+    Encode and decode the data in chunks.
+    Returns:
+        tuple: (compression ratio, encode CPU s per data second, decode CPU s per data second)
+    """
+    seconds = len(data) / rate
+    start = time.process_time()
+    encoded = [(encode_chunk(data[i:i + chunk], predictor, codec, level), len(data[i:i + chunk])) for i in range(0, len(data), chunk)]
+    encode = time.process_time() - start
+    start = time.process_time()
+    for (payload, itemsize), count in encoded:
+        decode_chunk(payload, count, data.shape[1], itemsize, predictor, codec)
+    decode = time.process_time() - start
+    stored = sum(len(payload) for (payload, _), _ in encoded)
+    return data.nbytes / stored, encode / seconds, decode / seconds
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the compressed recording format')
+    parser.add_argument('--channels', type=int, default=16)
+    parser.add_argument('--rate', type=float, default=500)
+    parser.add_argument('--minutes', type=float, default=10, help='Minutes of synthetic data')
+    parser.add_argument('--chunk', type=int, default=5000, help='Samples per compressed chunk')
+    parser.add_argument('--input', help='Binary recording (.bin) to use instead of synthetic data')
+    args = parser.parse_args()
+
+    if args.input:
+        recording = BinaryRecording(args.input)
+        data, rate = np.asarray(recording.samples).astype(np.int16), recording.sampling_rate
+        print(f"{args.input}: {recording.num_channels} channels at {rate:g} Hz, {recording.duration / 60:.1f} min")
+    else:
+        data, rate = make_signal(args.channels, args.rate, args.minutes), args.rate
+        print(f"Synthetic EXG: {args.channels} channels at {rate:g} Hz, {args.minutes:g} min")
+
+    print(f"{'predictor':<10} {'codec':<8} {'ratio':>6} {'encode CPU ms/s':>16} {'core %':>7} {'decode CPU ms/s':>16}")
+    for predictor, codec, level in CONFIGS:
+        ratio, encode, decode = measure(data, rate, args.chunk, predictor, codec, level)
+        print(f"{predictor:<10} {codec + '-' + str(level):<8} {ratio:>6.2f} {encode * 1e3:>16.2f} {encode * 100:>7.2f} {decode * 1e3:>16.2f}")
+
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'recording.zbin')
+        writer = CompressedWriter(path, data.shape[1], rate, chunk_samples=args.chunk, max_samples=len(data))    # Written faster than real time
+        writer.start()
+        for i in range(0, len(data), 10):
+            writer.write(data[i:i + 10], np.arange(i, i + 10), i / rate)
+        writer.close()
+        recording = CompressedRecording(path)
+        same = len(recording) == len(data) and np.array_equal(recording.read(), data)
+        middle = recording.duration / 2
+        start = time.perf_counter()
+        reader = CompressedRecording(path)
+        reader.time_range(middle, middle + 10)
+        seek = time.perf_counter() - start
+        reader.close()
+        print(f"CompressedWriter default ({writer.predictor}, {writer.codec}-{writer.level}): {os.path.getsize(path) / 1e6:.2f} MB, "
+              f"lossless: {same}, 10 s read from the middle: {seek * 1e3:.1f} ms")
+        recording.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Latency benchmark - Runs the whole acquisition pipeline against simulated byte-stream sources, without hardware, in
+the latency measurement mode of chordspy.latency, and reports p50/p95/p99 per stage:
+- usb: a BoardEmulator pseudo-terminal read by Chords_USB through Connection.connect_usb, so serial buffering is
+  measured from the moment the emulator generates each packet (the serial stage)
+- ble: 70-byte notifications of 10 samples, built like the NPG firmware's and handed to the BLE notification
+  handler every 20 ms from a sender thread, as bleak would
+A reference LSL consumer receives the stream, either waking up on every chunk or polling with --poll like an app timer.
+
+Usage:
+$ python -m benchmarks.latency
+$ python -m benchmarks.latency --source usb --board NPG-LITE --seconds 20 --poll 0.01
+"""
+
+import os
+import time
+import argparse
+import threading
+import numpy as np
+from chordspy.connection import Connection
+from chordspy.chords_serial import Chords_USB
+from chordspy.chords_ble import Chords_BLE
+from chordspy.sample_queue import SampleQueue
+from chordspy.emulator import BoardEmulator
+from chordspy.latency import LatencyProbe, ReferenceConsumer
+
+def ble_packet(counter, rng):
+    """
+    One notification: Chords_BLE.BLOCK_COUNT samples of a counter byte and big-endian int16 channels.
+    Returns:
+        bytearray: The packet
+    """
+    count = Chords_BLE.BLOCK_COUNT
+    samples = np.zeros(count, dtype=[('counter', 'u1'), ('channels', '>i2', Chords_BLE.NUM_CHANNELS)])
+    samples['counter'] = (counter + np.arange(count)) % 256
+    samples['channels'] = rng.integers(-2048, 2048, size=(count, Chords_BLE.NUM_CHANNELS))
+    return bytearray(samples.tobytes())
+
+def run_usb(manager, args, stop, closers):
+    """
+    Stream from an emulated USB board. The emulator is added to closers, stopped once the manager is cleaned up.
+    Returns:
+        callable: Emission time lookup of the emulator
+    """
+    emulator = BoardEmulator(args.board, waveform="noise", seed=1)
+    emulator.start()
+    os.environ[Chords_USB.PORTS_ENV] = emulator.port
+    if not manager.connect_usb():
+        emulator.stop()
+        raise RuntimeError("Chords_USB did not detect the emulated board")
+    closers.append(emulator.stop)
+    return emulator.emit_time
+
+def run_ble(manager, args, stop, closers):
+    """
+    Send simulated BLE notifications through Connection.handle_ble_notification until stop is set.
+    Returns:
+        None: BLE notifications have no byte path before the handler, there is no serial stage
+    """
+    manager.ble_connection = Chords_BLE()
+    manager.running = True
+    manager.sample_queue = SampleQueue(manager.queue_size)
+    manager.ble_thread = threading.Thread(target=manager.ble_data_handler, daemon=True)
+    manager.ble_thread.start()
+
+    def send():
+        rng = np.random.default_rng(1)
+        start, counter = time.monotonic(), 0
+        while not stop.is_set():
+            manager.handle_ble_notification(None, ble_packet(counter, rng))
+            counter += Chords_BLE.BLOCK_COUNT
+            delay = start + counter / Chords_BLE.SAMPLING_RATE - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+    threading.Thread(target=send, daemon=True).start()
+    return None
+
+def measure(source, args):
+    """
+    Stream from one simulated source and collect the latency report.
+    Returns:
+        LatencyProbe: The probe, stamped during the measured seconds
+    """
+    manager = Connection()
+    manager.stream_name = f"chordspy_latency_{source}"
+    manager.shared_ring_name = None
+    manager.latency_probe = LatencyProbe()
+    consumer = ReferenceConsumer(manager.latency_probe, manager.stream_name, args.poll).start()
+    stop = threading.Event()
+    closers = []    # Called after cleanup, once the manager has let go of the source
+    try:
+        manager.latency_probe.emit_time = (run_usb if source == 'usb' else run_ble)(manager, args, stop, closers)
+        if not consumer.ready.wait(10):
+            raise RuntimeError("The reference consumer did not find the stream")
+        time.sleep(args.warmup)
+        manager.latency_probe.reset()    # Leave out connection setup and the first chunks
+        time.sleep(args.seconds)
+    finally:
+        stop.set()
+        consumer.stop()
+        manager.cleanup()
+        for close in closers:
+            close()
+    return manager.latency_probe
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure per-stage latency from device bytes to an LSL consumer on simulated sources')
+    parser.add_argument('--source', choices=['usb', 'ble', 'all'], default='all')
+    parser.add_argument('--board', default='NPG-LITE', help='Board emulated for the usb source')
+    parser.add_argument('--seconds', type=float, default=10, help='Measured seconds per source')
+    parser.add_argument('--warmup', type=float, default=1, help='Seconds streamed before measuring')
+    parser.add_argument('--poll', type=float, default=0.0, help='Polling interval of the consumer in seconds (0 = every chunk)')
+    args = parser.parse_args()
+
+    for source in (['usb', 'ble'] if args.source == 'all' else [args.source]):
+        probe = measure(source, args)
+        consumer = f"polling every {args.poll * 1e3:g} ms" if args.poll else "woken by every chunk"
+        print(f"\n{source}: {probe.chunks} chunks in {args.seconds:g} s, consumer {consumer}")
+        print(probe.format_report())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+LSL push benchmark - Measures the CPU cost of sending samples to LSL one push_sample call at a time versus one
+push_chunk call per decoded block (Connection.push_block), and checks that a consumer receives identical samples
+and timestamps both ways.
+
+Usage:
+$ python -m benchmarks.lsl_push
+$ python -m benchmarks.lsl_push --channels 16 --rate 500 --block 10
+"""
+
+import time
+import argparse
+import numpy as np
+from pylsl import StreamInfo, StreamOutlet, StreamInlet, resolve_byprop, local_clock
+from chordspy.connection import Connection
+
+def make_outlet(name, channels, rate):
+    """
+    Create an outlet configured like Connection.setup_lsl.
+    Returns:
+        StreamOutlet: The outlet
+    """
+    info = StreamInfo(name, "EXG", channels, rate, "float32", name)
+    return StreamOutlet(info, 0, 360)
+
+def push_per_sample(outlet, data, block, rate):
+    """Push every sample on its own, timestamps back-dated like the old handlers."""
+    interval = 1.0 / rate
+    now = local_clock()
+    for start in range(0, len(data), block):
+        chunk = data[start:start + block]
+        for i, sample in enumerate(chunk.tolist()):
+            outlet.push_sample(sample, now + (start + i) * interval)
+
+def push_per_block(outlet, data, block, rate):
+    """Push every block with one push_chunk call through Connection.push_block."""
+    interval = 1.0 / rate
+    now = local_clock()
+    manager = Connection()
+    manager.lsl_connection = outlet
+    for start in range(0, len(data), block):
+        chunk = data[start:start + block]
+        manager.push_block(chunk, now + (start + len(chunk) - 1) * interval)
+    manager.lsl_connection = None
+
+def cpu_seconds(push, outlet, data, block, rate):
+    """
+    Measure the process CPU time of one push strategy.
+    Returns:
+        float: CPU seconds spent pushing
+    """
+    start = time.process_time()
+    push(outlet, data, block, rate)
+    return time.process_time() - start
+
+def received(push, channels, rate, data, block):
+    """
+    Push through a fresh outlet and collect what a consumer receives.
+    Returns:
+        tuple: (samples, timestamps) as numpy arrays, timestamps relative to the first one
+    """
+    name = f"chordspy-bench-{push.__name__}"
+    outlet = make_outlet(name, channels, rate)
+    inlet = StreamInlet(resolve_byprop("name", name, timeout=5)[0], max_buflen=60)
+    inlet.open_stream(timeout=5)
+    time.sleep(0.5)
+    push(outlet, data, block, rate)
+    samples, stamps = [], []
+    deadline = time.time() + 5
+    while len(samples) < len(data) and time.time() < deadline:
+        chunk, ts = inlet.pull_chunk(timeout=0.2)
+        samples.extend(chunk)
+        stamps.extend(ts)
+    inlet.close_stream()    # Close the consumer before its outlet goes away
+    stamps = np.array(stamps)
+    return np.array(samples), stamps - stamps[0] if len(stamps) else stamps
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark per-sample against chunked LSL pushes')
+    parser.add_argument('--channels', type=int, default=16)
+    parser.add_argument('--rate', type=float, default=500)
+    parser.add_argument('--seconds', type=float, default=60, help='Seconds of data to push')
+    parser.add_argument('--block', type=int, default=10, help='Samples per decoded block')
+    parser.add_argument('--no-verify', action='store_true', help='Skip the consumer-side comparison')
+    args = parser.parse_args()
+
+    data = np.random.default_rng(0).integers(0, 4096, size=(int(args.seconds * args.rate), args.channels)).astype(np.float64)
+    outlet = make_outlet("chordspy-bench-cpu", args.channels, args.rate)
+    per_sample = cpu_seconds(push_per_sample, outlet, data, args.block, args.rate)
+    per_block = cpu_seconds(push_per_block, outlet, data, args.block, args.rate)
+
+    print(f"{args.channels} channels at {args.rate:g} Hz, {args.seconds:g} s of data, {args.block}-sample blocks")
+    print(f"push_sample : {per_sample:8.3f} CPU s ({per_sample / args.seconds * 100:6.2f}% of one core in real time)")
+    print(f"push_chunk  : {per_block:8.3f} CPU s ({per_block / args.seconds * 100:6.2f}% of one core in real time)")
+    print(f"Reduction   : {(1 - per_block / per_sample) * 100:8.1f}%")
+
+    if not args.no_verify:
+        check = data[:int(5 * args.rate)]
+        samples_a, stamps_a = received(push_per_sample, args.channels, args.rate, check, args.block)
+        samples_b, stamps_b = received(push_per_block, args.channels, args.rate, check, args.block)
+        same = samples_a.shape == samples_b.shape and np.array_equal(samples_a, samples_b) and np.allclose(stamps_a, stamps_b, atol=1e-6)
+        print(f"Consumer side identical: {same} ({len(samples_a)} and {len(samples_b)} samples received)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+"""
+Parser throughput benchmark suite - Feeds pre-generated byte streams into every transport decoder, no hardware needed.
+Covered decoders:
+- usb.read_data            Chords_USB.read_data (batch decode, ring buffer, loss accounting)
+- ble.notification_handler Chords_BLE.notification_handler, single-sample and 10-block notifications
+- ble.connection           Connection.handle_ble_notification (decode and publish to the sample queue)
+- wifi.process_packet      Chords_WIFI.process_packet
+- wifi.connection          Connection.handle_wifi_packet (decode and publish to the sample queue)
+Each case runs on a clean and a corrupted stream and reports samples/s, ns per sample and allocations per sample.
+CPython has no allocation counter, so allocations are reported from tracemalloc as peak bytes and retained blocks per sample.
+The outputs are replaced by a no-op outlet so only the decoding and dispatch cost is measured.
+
+Usage:
+$ python -m benchmarks.parsers
+$ python -m benchmarks.parsers --output results.json
+$ python -m benchmarks.parsers --compare results.json
+"""
+
+import io
+import sys
+import json
+import time
+import argparse
+import platform
+import tracemalloc
+import contextlib
+from datetime import datetime
+import numpy as np
+from chordspy.chords_serial import Chords_USB
+from chordspy.chords_ble import Chords_BLE
+from chordspy.chords_wifi import Chords_WIFI
+from chordspy.connection import Connection
+from chordspy.sample_queue import SampleQueue
+from chordspy.emulator import BoardEmulator
+
+USB_BOARDS = ["RPI-PICO-RP2040", "UNO-R4", "NANO-CLASSIC", "STM32G4-CORE-BOARD"]    # 3, 6, 8 and 16 channels
+WIFI_CHANNELS = [3, 6, 8, 16]
+
+class FakeSerial:
+    """Replays pre-generated chunks through the subset of the pyserial API used by Chords_USB.read_data."""
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.position = 0
+        self.is_open = True
+
+    @property
+    def in_waiting(self):
+        return len(self.chunks[self.position]) if self.position < len(self.chunks) else 0
+
+    def read(self, size=1):
+        chunk = self.chunks[self.position]
+        self.position += 1
+        return chunk
+
+class NullOutlet:
+    """Stands in for the LSL outlet so that only decoding and dispatch are measured."""
+    def push_sample(self, sample, timestamp=0.0):
+        pass
+
+    def push_chunk(self, chunk, timestamp=0.0):
+        pass
+
+def split(stream, size):
+    """Cut a byte stream into transport-sized chunks."""
+    return [stream[i:i + size] for i in range(0, len(stream), size)]
+
+def usb_case(board, samples, corrupt):
+    """
+    Build a Chords_USB.read_data case.
+    Returns:
+        tuple: (setup function returning a run function, number of samples)
+    """
+    emulator = BoardEmulator(board, waveform="noise", corrupt_rate=0.01 if corrupt else 0.0, drop_rate=0.01 if corrupt else 0.0, seed=1)
+    chunks = split(emulator.generate(samples), 4096)
+
+    def setup():
+        client = Chords_USB()
+        client.configure_board(FakeSerial(chunks), board)
+
+        def run():
+            for _ in range(len(chunks)):
+                client.read_data()
+        return run
+    return setup, samples
+
+def ble_packets(notifications, block, corrupt):
+    """
+    Generate BLE notifications: counter byte plus 3 big-endian int16 channels per sample.
+    Corrupted streams drop 1% of the notifications (counter gaps) and truncate another 1%.
+    """
+    rng = np.random.default_rng(2)
+    per_packet = Chords_BLE.BLOCK_COUNT if block else 1
+    total = notifications * per_packet
+    dtype = np.dtype([('counter', 'u1'), ('channels', '>i2', (Chords_BLE.NUM_CHANNELS,))])
+    records = np.zeros(total, dtype=dtype)
+    records['counter'] = np.arange(total) % 256
+    records['channels'] = rng.integers(-2048, 2048, size=(total, Chords_BLE.NUM_CHANNELS))
+    packets = split(records.tobytes(), dtype.itemsize * per_packet)
+    if corrupt:
+        fate = rng.random(len(packets))
+        packets = [p[:-3] if f < 0.01 else p for p, f in zip(packets, fate) if not 0.01 <= f < 0.02]
+    return [bytearray(p) for p in packets]
+
+def ble_case(block, corrupt, notifications):
+    """Build a Chords_BLE.notification_handler case."""
+    packets = ble_packets(notifications, block, corrupt)
+    samples = notifications * (Chords_BLE.BLOCK_COUNT if block else 1)
+
+    def setup():
+        client = Chords_BLE()
+
+        def run():
+            for packet in packets:
+                client.notification_handler(None, packet)
+        return run
+    return setup, samples
+
+def ble_connection_case(corrupt, notifications):
+    """Build a Connection.handle_ble_notification case (10-block notifications only)."""
+    packets = ble_packets(notifications, True, corrupt)
+
+    def setup():
+        manager = Connection()
+        manager.ble_connection = Chords_BLE()
+        manager.lsl_connection = NullOutlet()
+        manager.sample_queue = SampleQueue(notifications * Chords_BLE.BLOCK_COUNT)
+
+        def run():
+            for packet in packets:
+                manager.handle_ble_notification(None, packet)
+        return run
+    return setup, notifications * Chords_BLE.BLOCK_COUNT
+
+def wifi_packets(channels, messages, corrupt):
+    """
+    Generate WebSocket messages of 10 blocks each: counter byte plus big-endian int16 channels.
+    Corrupted streams end every tenth message with a truncated block.
+    """
+    rng = np.random.default_rng(3)
+    dtype = np.dtype([('counter', 'u1'), ('channels', '>i2', (channels,))])
+    records = np.zeros(messages * 10, dtype=dtype)
+    records['counter'] = np.arange(len(records)) % 256
+    records['channels'] = rng.integers(-2048, 2048, size=(len(records), channels))
+    packets = split(records.tobytes(), dtype.itemsize * 10)
+    if corrupt:
+        packets = [p + p[:dtype.itemsize // 2] if i % 10 == 0 else p for i, p in enumerate(packets)]
+    return packets
+
+def wifi_case(channels, corrupt, messages):
+    """Build a Chords_WIFI.process_packet case."""
+    packets = wifi_packets(channels, messages, corrupt)
+
+    def setup():
+        client = Chords_WIFI(channels=channels, block_size=1 + 2 * channels)
+
+        def run():
+            for packet in packets:
+                client.process_packet(packet)
+        return run
+    return setup, messages * 10
+
+def wifi_connection_case(channels, corrupt, messages):
+    """Build a Connection.handle_wifi_packet case."""
+    packets = wifi_packets(channels, messages, corrupt)
+
+    def setup():
+        manager = Connection()
+        manager.wifi_connection = Chords_WIFI(channels=channels, block_size=1 + 2 * channels)
+        manager.lsl_connection = NullOutlet()
+        manager.sample_queue = SampleQueue(messages * 10)
+
+        def run():
+            for packet in packets:
+                manager.handle_wifi_packet(packet)
+        return run
+    return setup, messages * 10
+
+def build_cases(samples):
+    """
+    Assemble every benchmark case.
+    Args:
+        samples (int): Approximate samples per case
+    Returns:
+        dict: Case name -> (setup, samples)
+    """
+    cases = {}
+    for corrupt in (False, True):
+        kind = "corrupt" if corrupt else "clean"
+        for board in USB_BOARDS:
+            channels = Chords_USB.supported_boards[board]["Num_channels"]
+            cases[f"usb.read_data/{channels}ch/{kind}"] = usb_case(board, samples, corrupt)
+        cases[f"ble.notification_handler/single/{kind}"] = ble_case(False, corrupt, samples)
+        cases[f"ble.notification_handler/block/{kind}"] = ble_case(True, corrupt, samples // 10)
+        cases[f"ble.connection/block/{kind}"] = ble_connection_case(corrupt, samples // 10)
+        for channels in WIFI_CHANNELS:
+            cases[f"wifi.process_packet/{channels}ch/{kind}"] = wifi_case(channels, corrupt, samples // 10)
+            cases[f"wifi.connection/{channels}ch/{kind}"] = wifi_connection_case(channels, corrupt, samples // 10)
+    return cases
+
+def measure(setup, samples, repeat):
+    """
+    Time a case and measure its allocations.
+    Returns:
+        dict: samples_per_s, ns_per_sample, alloc_peak_bytes_per_sample, alloc_blocks_per_sample
+    """
+    best = float("inf")
+    with contextlib.redirect_stdout(io.StringIO()):    # Decoders print on gaps and bad lengths
+        for _ in range(repeat):
+            run = setup()
+            start = time.perf_counter()
+            run()
+            best = min(best, time.perf_counter() - start)
+
+        run = setup()
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        del run    # Release the decoders here so their cleanup messages are captured too
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, "lineno"))
+    return {
+        "samples": samples,
+        "samples_per_s": samples / best,
+        "ns_per_sample": best / samples * 1e9,
+        "alloc_peak_bytes_per_sample": (peak - base) / samples,
+        "alloc_blocks_per_sample": blocks / samples,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the USB, BLE and WiFi decoders')
+    parser.add_argument('--samples', type=int, default=20000, help='Approximate samples per case')
+    parser.add_argument('--repeat', type=int, default=3, help='Timing runs per case, the best one is kept')
+    parser.add_argument('--filter', default='', help='Only run cases whose name contains this text')
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    parser.add_argument('--compare', help='JSON file from an earlier run to compare against')
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+
+    results = {}
+    header = f"{'case':<40} {'samples/s':>12} {'ns/sample':>10} {'B/sample':>9} {'blk/sample':>10}"
+    print(header + ("  vs baseline" if baseline else ""))
+    for name, (setup, samples) in build_cases(args.samples).items():
+        if args.filter not in name:
+            continue
+        result = measure(setup, samples, args.repeat)
+        results[name] = result
+        line = (f"{name:<40} {result['samples_per_s']:>12.0f} {result['ns_per_sample']:>10.0f} "
+                f"{result['alloc_peak_bytes_per_sample']:>9.1f} {result['alloc_blocks_per_sample']:>10.3f}")
+        if name in baseline:
+            line += f"  {result['samples_per_s'] / baseline[name]['samples_per_s']:>6.2f}x"
+        print(line)
+
+    if args.output:
+        report = {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "results": results,
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Recording benchmark - Compares the recording formats on the same synthetic EXG data:
+- csv (legacy)  one csv.writer.writerow per sample on the calling thread, as Connection.log_to_csv used to do
+- csv           CsvWriter, batched on a background thread
+- bin           BinaryWriter, raw 16-bit blocks plus a sparse index
+For every format it reports the time spent on the calling (acquisition) thread, the total time until the file is
+closed, the file size, and the time to load the whole recording and a 10 s slice back (pandas.read_csv for CSV, as
+csvplotter does, and the memory map for binary). It also checks that converting the binary recording to CSV gives the
+same file as CsvWriter.
+
+Usage:
+$ python -m benchmarks.recording
+$ python -m benchmarks.recording --channels 16 --rate 500 --minutes 10
+"""
+
+import os
+import csv
+import time
+import filecmp
+import tempfile
+import argparse
+import numpy as np
+import pandas as pd
+from chordspy.csv_writer import CsvWriter, csv_headers
+from chordspy.binary_recording import BinaryWriter, BinaryRecording, convert_to_csv
+
+def make_data(channels, rate, minutes):
+    """Correlated 12-bit test signal: a random walk around mid-scale per channel."""
+    rng = np.random.default_rng(0)
+    steps = rng.integers(-8, 9, size=(int(minutes * 60 * rate), channels))
+    return np.clip(2048 + np.cumsum(steps, axis=0), 0, 4095).astype(np.float64)
+
+def record_legacy(path, data, block):
+    """
+    Per-sample writerow on the calling thread.
+    Returns:
+        tuple: (calling thread seconds, total seconds)
+    """
+    start = time.perf_counter()
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(csv_headers(data.shape[1]))
+        counter = 0
+        for i in range(0, len(data), block):
+            for sample in data[i:i + block].tolist():
+                counter += 1
+                writer.writerow([counter] + sample)
+    elapsed = time.perf_counter() - start
+    return elapsed, elapsed
+
+def record_writer(writer, data, block, rate):
+    """
+    Feed blocks to a background writer, faster than real time (the writer's queue must hold the whole recording).
+    Returns:
+        tuple: (calling thread seconds, total seconds)
+    """
+    start = time.perf_counter()
+    writer.start()
+    caller = 0.0
+    for i in range(0, len(data), block):
+        t = time.perf_counter()
+        writer.write(data[i:i + block], np.arange(i, i + block), i / rate)
+        caller += time.perf_counter() - t
+    writer.close()
+    if writer.queue.overflow_samples:
+        print(f"  warning: {writer.queue.overflow_samples} samples dropped by a full queue")
+    return caller, time.perf_counter() - start
+
+def load_csv(path, rate):
+    """
+    Load a CSV recording with pandas and take a 10 s slice from the middle.
+    Returns:
+        tuple: (seconds to load everything, seconds to get the slice)
+    """
+    start = time.perf_counter()
+    frame = pd.read_csv(path)
+    full = time.perf_counter() - start
+    middle = len(frame) // 2
+    start = time.perf_counter()
+    pd.read_csv(path, skiprows=range(1, middle + 1), nrows=int(10 * rate))
+    return full, time.perf_counter() - start
+
+def load_binary(path, rate):
+    """
+    Load a binary recording into memory and take a 10 s slice from the middle.
+    Returns:
+        tuple: (seconds to load everything, seconds to get the slice)
+    """
+    start = time.perf_counter()
+    np.array(BinaryRecording(path).samples)
+    full = time.perf_counter() - start
+    start = time.perf_counter()
+    recording = BinaryRecording(path)
+    middle = recording.duration / 2
+    np.array(recording.time_range(middle, middle + 10))
+    return full, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the recording formats')
+    parser.add_argument('--channels', type=int, default=16)
+    parser.add_argument('--rate', type=float, default=500)
+    parser.add_argument('--minutes', type=float, default=10, help='Minutes of data to record')
+    parser.add_argument('--block', type=int, default=10, help='Samples per written block')
+    args = parser.parse_args()
+
+    data = make_data(args.channels, args.rate, args.minutes)
+    print(f"{args.channels} channels at {args.rate:g} Hz, {args.minutes:g} min ({len(data)} samples), {args.block}-sample blocks")
+    print(f"{'format':<14} {'caller s':>9} {'total s':>8} {'MB':>8} {'B/value':>8} {'load s':>8} {'10 s slice':>11}")
+
+    with tempfile.TemporaryDirectory() as folder:
+        paths = {name: os.path.join(folder, name.replace(' ', '_')) for name in ('csv (legacy)', 'csv', 'bin')}
+        paths = {name: path + ('.bin' if name == 'bin' else '.csv') for name, path in paths.items()}
+        results = {
+            'csv (legacy)': record_legacy(paths['csv (legacy)'], data, args.block),
+            'csv': record_writer(CsvWriter(paths['csv'], args.channels, max_samples=len(data)), data, args.block, args.rate),
+            'bin': record_writer(BinaryWriter(paths['bin'], args.channels, args.rate, max_samples=len(data)), data, args.block, args.rate),
+        }
+        for name, (caller, total) in results.items():
+            size = os.path.getsize(paths[name])
+            loader = load_binary if name == 'bin' else load_csv
+            full, part = loader(paths[name], args.rate)
+            print(f"{name:<14} {caller:>9.3f} {total:>8.3f} {size / 1e6:>8.2f} {size / data.size:>8.2f} {full:>8.3f} {part:>11.4f}")
+
+        converted = convert_to_csv(paths['bin'], os.path.join(folder, 'converted.csv'))
+        print(f"Binary converted to CSV matches CsvWriter output: {filecmp.cmp(converted, paths['csv'], shallow=False)}")
+
+if __name__ == "__main__":
+    main()
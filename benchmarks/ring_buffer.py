@@ -0,0 +1,71 @@
+"""
+Ring buffer microbenchmark - Compares the per-sample cost of the `np.roll` rolling window with chordspy.RingBuffer.
+np.roll copies the whole window on every sample, so its cost grows with the window length; the ring buffer stays flat.
+
+Usage:
+$ python -m benchmarks.ring_buffer
+$ python -m benchmarks.ring_buffer --channels 16 --samples 5000
+"""
+
+import argparse
+import time
+import numpy as np
+from chordspy.ring_buffer import RingBuffer
+
+def bench_roll(num_channels, window, samples):
+    """
+    Time the original roll-then-assign update.
+    Returns:
+        float: Nanoseconds per sample
+    """
+    data = np.zeros((num_channels, window))
+    sample = np.arange(num_channels, dtype=np.float64)
+    start = time.perf_counter()
+    for _ in range(samples):
+        data = np.roll(data, -1, axis=1)
+        data[:, -1] = sample
+    return (time.perf_counter() - start) / samples * 1e9
+
+def bench_append(num_channels, window, samples):
+    """
+    Time RingBuffer.append one sample at a time.
+    Returns:
+        float: Nanoseconds per sample
+    """
+    ring = RingBuffer(num_channels, window)
+    sample = np.arange(num_channels, dtype=np.float64)
+    start = time.perf_counter()
+    for _ in range(samples):
+        ring.append(sample)
+    return (time.perf_counter() - start) / samples * 1e9
+
+def bench_extend(num_channels, window, samples, chunk):
+    """
+    Time RingBuffer.extend with decoder-sized chunks.
+    Returns:
+        float: Nanoseconds per sample
+    """
+    ring = RingBuffer(num_channels, window)
+    block = np.ones((chunk, num_channels))
+    start = time.perf_counter()
+    for _ in range(samples // chunk):
+        ring.extend(block)
+    return (time.perf_counter() - start) / (samples // chunk * chunk) * 1e9
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark np.roll against RingBuffer')
+    parser.add_argument('--channels', type=int, default=16)
+    parser.add_argument('--samples', type=int, default=5000, help='Samples written per measurement')
+    parser.add_argument('--chunk', type=int, default=32, help='Samples per extend() call')
+    args = parser.parse_args()
+
+    print(f"{args.channels} channels, {args.samples} samples, ns per sample")
+    print(f"{'window':>8} {'np.roll':>12} {'append':>12} {'extend':>12}")
+    for window in (500, 2000, 8000, 32000):
+        roll = bench_roll(args.channels, window, args.samples)
+        append = bench_append(args.channels, window, args.samples)
+        extend = bench_extend(args.channels, window, args.samples, args.chunk)
+        print(f"{window:>8} {roll:>12.0f} {append:>12.0f} {extend:>12.0f}")
+
+if __name__ == "__main__":
+    main()
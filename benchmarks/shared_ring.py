@@ -0,0 +1,137 @@
+"""
+Shared ring benchmark - Compares how launched apps get the live stream: through LSL (resolve_streams, StreamInlet,
+pull_chunk into a RingBuffer, as gui.py does) or by attaching to the chordspy.shared_ring segment and viewing the
+newest samples in place. For each transport it starts --apps client processes at once while a publisher streams
+synthetic data in real time, and reports:
+- startup latency: from launching a client process until it holds its first window of data (imports included)
+- attach latency: the part of it after the imports (resolve + inlet, or opening the segment)
+- client CPU: CPU time of the client processes while they refresh a 2000-sample window every 10 ms, in % of one core
+- publisher CPU: CPU time of the streaming process, in % of one core
+
+Usage:
+$ python -m benchmarks.shared_ring
+$ python -m benchmarks.shared_ring --apps 4 --channels 16 --rate 500 --seconds 10
+"""
+
+import sys
+import json
+import time
+import argparse
+import threading
+import subprocess
+import numpy as np
+
+WINDOW = 2000    # Samples shown by a client, like gui.py
+
+def client(transport, name, seconds):
+    """
+    Client process: wait for the stream, then refresh a window every 10 ms. Prints a JSON report.
+    Args:
+        transport (str): 'lsl' or 'shm'
+        name (str): Stream or shared memory name
+        seconds (float): Time to keep refreshing after the first data
+    """
+    if transport == 'lsl':
+        from pylsl import StreamInlet, resolve_byprop
+        from chordspy.ring_buffer import RingBuffer
+        imported = time.time()
+        inlet = StreamInlet(resolve_byprop('name', name, timeout=10)[0])
+        buffer = RingBuffer(inlet.info().channel_count(), WINDOW)
+
+        def refresh():
+            samples, _ = inlet.pull_chunk(timeout=0.0)
+            if samples:
+                buffer.extend(np.asarray(samples))
+            return buffer.total_written
+    else:
+        from chordspy.shared_ring import SharedRingReader
+        imported = time.time()
+        ring = SharedRingReader(name, timeout=10)
+
+        def refresh():
+            ring.latest(WINDOW)
+            return ring.write_seq
+
+    while not refresh():
+        time.sleep(0.001)
+    first_data = time.time()
+    start_cpu = time.process_time()
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        refresh()
+        time.sleep(0.01)
+    print(json.dumps({'first_data': first_data, 'imported': imported, 'cpu': time.process_time() - start_cpu, 'seconds': seconds}))
+
+def publish(transport, name, channels, rate, stop):
+    """
+    Stream synthetic blocks of 10 samples in real time until stop is set.
+    Returns:
+        tuple: (publisher CPU seconds, wall seconds)
+    """
+    from pylsl import StreamInfo, StreamOutlet, local_clock
+    from chordspy.shared_ring import SharedRingWriter
+    block = np.random.default_rng(0).integers(0, 4096, size=(10, channels)).astype(np.float32)
+    if transport == 'lsl':
+        outlet = StreamOutlet(StreamInfo(name, "EXG", channels, rate, "float32", name), 0, 360)
+        push = lambda samples: outlet.push_chunk(samples, local_clock())
+    else:
+        writer = SharedRingWriter(name, channels, rate, int(10 * rate))
+        push = lambda samples: writer.write(samples, local_clock())
+    start_cpu, start = time.process_time(), time.monotonic()
+    sent = 0
+    while not stop.is_set():
+        push(block)
+        sent += len(block)
+        delay = start + sent / rate - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+    result = time.process_time() - start_cpu, time.monotonic() - start
+    if transport == 'shm':
+        writer.close()
+    return result
+
+def run(transport, apps, channels, rate, seconds):
+    """
+    Start the publisher and the clients of one transport.
+    Returns:
+        tuple: (startup latencies, attach latencies, client CPU fractions, publisher CPU fraction)
+    """
+    name = f"chordspy_bench_{transport}"
+    stop = threading.Event()
+    result = {}
+    publisher = threading.Thread(target=lambda: result.update(publish=publish(transport, name, channels, rate, stop)))
+    publisher.start()
+    time.sleep(0.5)    # Stream up before the apps are launched, as with /launch_app
+    launched = time.time()
+    processes = [subprocess.Popen([sys.executable, '-m', 'benchmarks.shared_ring', '--client', transport, '--name', name,
+                                   '--seconds', str(seconds)], stdout=subprocess.PIPE, text=True) for _ in range(apps)]
+    reports = [json.loads(p.communicate()[0].strip().splitlines()[-1]) for p in processes]
+    stop.set()
+    publisher.join()
+    cpu, wall = result['publish']
+    startup = [r['first_data'] - launched for r in reports]
+    attach = [r['first_data'] - r['imported'] for r in reports]
+    return startup, attach, [r['cpu'] / r['seconds'] for r in reports], cpu / wall
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark LSL inlets against the shared-memory ring for local apps')
+    parser.add_argument('--apps', type=int, default=4, help='Client processes per transport')
+    parser.add_argument('--channels', type=int, default=16)
+    parser.add_argument('--rate', type=float, default=500)
+    parser.add_argument('--seconds', type=float, default=10, help='Seconds each client refreshes its window')
+    parser.add_argument('--client', choices=['lsl', 'shm'], help=argparse.SUPPRESS)
+    parser.add_argument('--name', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.client:
+        client(args.client, args.name, args.seconds)
+        return
+
+    print(f"{args.apps} apps, {args.channels} channels at {args.rate:g} Hz, {args.seconds:g} s, {WINDOW}-sample window refreshed every 10 ms")
+    print(f"{'transport':<10} {'startup mean s':>15} {'startup max s':>14} {'attach mean ms':>15} {'client CPU %':>13} {'publisher CPU %':>16}")
+    for transport in ('lsl', 'shm'):
+        startup, attach, cpu, publisher = run(transport, args.apps, args.channels, args.rate, args.seconds)
+        print(f"{transport:<10} {np.mean(startup):>15.3f} {np.max(startup):>14.3f} {np.mean(attach) * 1e3:>15.1f} {np.mean(cpu) * 100:>13.2f} {publisher * 100:>16.2f}")
+
+if __name__ == "__main__":
+    main()
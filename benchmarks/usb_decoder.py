@@ -0,0 +1,126 @@
+"""
+USB packet decoder benchmark - Measures how many packets per second Chords_USB can decode without any hardware attached.
+It compares the original byte-wise parser (one packet, one np.roll at a time) with the vectorized batch decoder.
+
+Usage:
+$ python -m benchmarks.usb_decoder
+$ python -m benchmarks.usb_decoder --board MEGA-2560-R3 --packets 20000
+"""
+
+import argparse
+import time
+import numpy as np
+from chordspy.chords_serial import Chords_USB
+from chordspy.ring_buffer import RingBuffer
+
+def make_client(board):
+    """
+    Create a Chords_USB instance configured for a board without opening a serial port.
+    Args:
+        board (str): Board name from Chords_USB.supported_boards
+    Returns:
+        Chords_USB: Configured client
+    """
+    client = Chords_USB.__new__(Chords_USB)    # Skip __init__ so no signal handler is installed
+    client.ser = None
+    client.buffer = bytearray()
+    client.board = board
+    client.num_channels = Chords_USB.supported_boards[board]["Num_channels"]
+    client.packet_length = (2 * client.num_channels) + Chords_USB.HEADER_LENGTH + 1
+    client.packet_dtype = Chords_USB.make_packet_dtype(client.num_channels)
+    client.data = RingBuffer(client.num_channels, 2000)
+    client.decoded_packets = 0
+    client.rejected_packets = 0
+    return client
+
+def make_stream(num_channels, packets, seed=0):
+    """
+    Generate a clean byte stream of correctly framed packets.
+    Args:
+        num_channels (int): Channels per packet
+        packets (int): Number of packets to generate
+        seed (int): Random seed for the channel values
+    Returns:
+        bytes: Framed packet stream
+    """
+    rng = np.random.default_rng(seed)
+    dtype = Chords_USB.make_packet_dtype(num_channels)
+    frames = np.zeros(packets, dtype=dtype)
+    frames['sync'] = [Chords_USB.SYNC_BYTE1, Chords_USB.SYNC_BYTE2]
+    frames['counter'] = np.arange(packets) % 256
+    frames['channels'] = rng.integers(0, 4096, size=(packets, num_channels))
+    frames['end'] = Chords_USB.END_BYTE
+    return frames.tobytes()
+
+def legacy_parse(client, buffer):
+    """
+    The original per-packet parser from Chords_USB.read_data, kept here as the baseline.
+    Args:
+        client (Chords_USB): Configured client
+        buffer (bytearray): Bytes to parse (consumed in place)
+    """
+    client.data = np.zeros((client.num_channels, 2000))    # The original parser rolled a plain array
+    while len(buffer) >= client.packet_length:
+        sync_index = buffer.find(bytes([client.SYNC_BYTE1, client.SYNC_BYTE2]))
+        if sync_index == -1:
+            buffer.clear()
+            continue
+        if len(buffer) >= sync_index + client.packet_length:
+            packet = buffer[sync_index:sync_index + client.packet_length]
+            if (packet[0] == client.SYNC_BYTE1 and packet[1] == client.SYNC_BYTE2 and packet[-1] == client.END_BYTE):
+                channel_data = []
+                for ch in range(client.num_channels):
+                    high_byte = packet[2 * ch + client.HEADER_LENGTH]
+                    low_byte = packet[2 * ch + client.HEADER_LENGTH + 1]
+                    channel_data.append(float((high_byte << 8) | low_byte))
+                client.data = np.roll(client.data, -1, axis=1)
+                client.data[:, -1] = channel_data
+                del buffer[:sync_index + client.packet_length]
+            else:
+                del buffer[:sync_index + 1]
+        else:
+            break
+
+def batch_parse(client, buffer, chunk_size):
+    """
+    Feed the stream to the batch decoder in serial-read sized chunks.
+    Args:
+        client (Chords_USB): Configured client
+        buffer (bytes): Bytes to parse
+        chunk_size (int): Bytes delivered per simulated serial read
+    """
+    for start in range(0, len(buffer), chunk_size):
+        client.buffer.extend(buffer[start:start + chunk_size])
+        counters, samples, consumed, rejected, resyncs = client.decode_packets(client.buffer)
+        del client.buffer[:consumed]
+        client.data.extend(samples)
+        client.decoded_packets += len(samples)
+        client.rejected_packets += rejected
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the Chords_USB packet decoders')
+    parser.add_argument('--board', default='STM32G4-CORE-BOARD', choices=sorted(Chords_USB.supported_boards))
+    parser.add_argument('--packets', type=int, default=20000, help='Packets in the generated stream')
+    parser.add_argument('--chunk-size', type=int, default=4096, help='Bytes per simulated serial read')
+    args = parser.parse_args()
+
+    client = make_client(args.board)
+    stream = make_stream(client.num_channels, args.packets)
+
+    start = time.perf_counter()
+    legacy_parse(client, bytearray(stream))
+    legacy_elapsed = time.perf_counter() - start
+
+    client = make_client(args.board)
+    start = time.perf_counter()
+    batch_parse(client, stream, args.chunk_size)
+    batch_elapsed = time.perf_counter() - start
+
+    print(f"Board: {args.board} ({client.num_channels} channels), {args.packets} packets, {args.chunk_size}-byte reads")
+    print(f"Per-packet parser : {args.packets / legacy_elapsed:12.0f} packets/s")
+    print(f"Batch decoder     : {args.packets / batch_elapsed:12.0f} packets/s "
+          f"(decoded {client.decoded_packets}, rejected {client.rejected_packets})")
+    print(f"Speedup           : {legacy_elapsed / batch_elapsed:12.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -1,2 +1,12 @@
-from chordspy.app import main
-from chordspy.connection import Connection
\ No newline at end of file
+def __getattr__(name):
+    """Import the package's entry points on first use, so that e.g. chordspy.record does not load Flask or Qt."""
+    if name == 'main':
+        from chordspy.app import main
+        return main
+    if name == 'Connection':
+        from chordspy.connection import Connection
+        return Connection
+    if name == 'RingBuffer':
+        from chordspy.ring_buffer import RingBuffer
+        return RingBuffer
+    raise AttributeError(f"module 'chordspy' has no attribute {name!r}")
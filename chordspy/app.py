@@ -12,10 +12,12 @@ The application uses Server-Sent Events (SSE) for real-time updates to the front
 # Importing Necessary Libraries
 from flask import Flask, render_template, request, jsonify  # Flask web framework
 from chordspy.connection import Connection                  # Connection management module
+from chordspy.metrics import REGISTRY                       # Acquisition metrics served at /metrics
 import threading                                            # For running connection management in a separate thread
 import asyncio                                              # For asynchronous operations, especially with BLE           
 import logging                                              # For logging errors and information        
-from bleak import BleakScanner                              # BLE device scanner from Bleak library
+from chordspy.ble_scanner import BleScanner                 # Background BLE scanner with a device cache
+import json                                                 # For encoding server-sent events
 from flask import Response                                  # For handling server-sent events (SSE)
 import queue                                                # Queue for managing console messages
 import yaml                                                 # For loading application configuration from YAML files     
@@ -33,6 +35,8 @@ log.setLevel(logging.ERROR)              # Only show errors from Werkzeug (Flask
 connection_manager = None  # Manages the device connection
 connection_thread = None   # Thread for connection management
 ble_devices = []           # List of discovered BLE devices
+ble_scanner = None         # Background BLE scanner, started by the first BLE request
+ble_scanner_lock = threading.Lock()
 stream_active = False      # Flag indicating if data stream is active
 running_apps = {}          # Dictionary to track running applications
 
@@ -58,23 +62,29 @@ def log_error():
     except Exception as e:
         return jsonify({'status': 'error', 'message': 'Logging failed'}), 500
 
-# Decorator to run async functions in a synchronous context. It allows us to call async functions from Flask routes.
-def run_async(coro):
+# Background BLE scanner shared by every request. It keeps running once started so that the device list is always ready.
+def get_ble_scanner():
     """
-    Decorator to run async functions in a synchronous context.
-    Args:
-        coro: The coroutine to be executed.
+    Return the background BLE scanner, starting it on first use.
     Returns:
-        A wrapper function that runs the coroutine in a new event loop.
+        BleScanner: The running scanner
     """
-    def wrapper(*args, **kwargs):
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            return loop.run_until_complete(coro(*args, **kwargs))
-        finally:
-            loop.close()
-    return wrapper
+    global ble_scanner
+    with ble_scanner_lock:    # Flask serves requests on several threads
+        if ble_scanner is None:
+            ble_scanner = BleScanner().start()
+    return ble_scanner
+
+# Stop the background BLE scanner when the app shuts down, so that its event loop thread does not keep the adapter scanning.
+def stop_ble_scanner():
+    """
+    Stop the background BLE scanner if it was started.
+    """
+    global ble_scanner
+    with ble_scanner_lock:
+        if ble_scanner is not None:
+            ble_scanner.stop()
+            ble_scanner = None
 
 # Main route for the web interface. It renders the index.html template.
 @app.route('/')
@@ -105,24 +115,48 @@ def get_apps_config():
         logging.error(f"Error loading apps config: {str(e)}")
         return jsonify({'apps': [], 'error': str(e)})
 
-# Route to scan for nearby BLE devices. It uses BleakScanner to discover devices.
+# Route to list nearby BLE devices. It answers at once from the cache of the background scanner.
 @app.route('/scan_ble')
-@run_async
-async def scan_ble_devices():
+def scan_ble_devices():
     """
-    Scan for nearby BLE devices. It uses BleakScanner to discover devices for 5 seconds and filters for devices with names starting with 'NPG' or 'npg'.
+    List the nearby NPG devices (names starting with 'NPG' or 'npg') heard by the background scanner within its TTL, strongest signal first. The first request waits for the scanner's first cycle; devices found later are pushed by /ble_events.
     Returns:
-        JSON response with list of discovered devices or error message.
+        JSON response with list of discovered devices (name, address, rssi, first_seen, last_seen) or error message.
     """
     global ble_devices
-    try:
-        devices = await BleakScanner.discover(timeout=5)
-        ble_devices = [{'name': d.name or 'Unknown', 'address': d.address} 
-                      for d in devices if d.name and d.name.startswith(('NPG', 'npg'))]
-        return jsonify({'status': 'success', 'devices': ble_devices})
-    except Exception as e:
-        logging.error(f"BLE scan error: {str(e)}")
-        return jsonify({'status': 'error', 'message': str(e)}), 500
+    scanner = get_ble_scanner()
+    scanner.wait_first_cycle(3.0)    # The first request would otherwise answer before anything was heard
+    ble_devices = scanner.devices()
+    if scanner.error and not ble_devices:
+        logging.error(f"BLE scan error: {scanner.error}")
+        return jsonify({'status': 'error', 'message': scanner.error}), 500
+    return jsonify({'status': 'success', 'devices': ble_devices, 'scanning': scanner.scanning})
+
+# Route for Server-Sent Events (SSE) announcing BLE devices as the background scanner finds and loses them.
+@app.route('/ble_events')
+def ble_events():
+    """
+    Server-Sent Events (SSE) endpoint pushing {"type": "found" or "lost", "device": {...}} whenever a device enters or leaves the scanner cache.
+    Returns:
+        SSE formatted device events.
+    """
+    scanner = get_ble_scanner()
+    events = scanner.subscribe()
+
+    def event_stream():
+        """Generator function that yields scanner events, with a comment line every 15 s so that closed clients are noticed."""
+        try:
+            while True:
+                try:
+                    event = events.get(timeout=15)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"data: {json.dumps(event)}\n\n"
+        finally:
+            scanner.unsubscribe(events)
+
+    return Response(event_stream(), mimetype="text/event-stream")
 
 # Route to check if the data stream is currently active. It checks the connection manager's stream_active flag.
 @app.route('/check_stream')
@@ -135,6 +169,40 @@ def check_stream():
     is_connected = connection_manager.stream_active if hasattr(connection_manager, 'stream_active') else False
     return jsonify({'connected': is_connected})
 
+# Route to report the lag and drop counters of every output (LSL, recording, ...) attached to the connection.
+@app.route('/sink_stats')
+def sink_stats():
+    """
+    Report per-sink queue depth, lag and drop counters.
+    Returns:
+        JSON response mapping sink names to their counters.
+    """
+    if not connection_manager:
+        return jsonify({})
+    return jsonify(connection_manager.sink_stats())
+
+# Route to report what the overload policies did (samples dropped, refused or decimated, time blocked) at the transport boundary and in every output.
+@app.route('/overload_stats')
+def overload_stats():
+    """
+    Report the actions of the overload policies.
+    Returns:
+        JSON response with the configured policy and the counters of the transport boundary and of each sink.
+    """
+    if not connection_manager:
+        return jsonify({})
+    return jsonify(connection_manager.overload_stats())
+
+# Route serving the acquisition metrics (samples in/out, loss, queue depths, jitter, sink and decode times) to Prometheus.
+@app.route('/metrics')
+def metrics():
+    """
+    Export the metrics registry in the Prometheus text format.
+    Returns:
+        Plain text response in the exposition format 0.0.4.
+    """
+    return Response(REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 # Route to check the current connection status with the device. It returns 'connected' if the stream is active, otherwise 'connecting'.
 @app.route('/check_connection')
 def check_connection():
@@ -254,6 +322,8 @@ def connect_device():
     
     # Create new connection
     connection_manager = Connection()
+    if protocol == 'ble':
+        connection_manager.ble_scanner = get_ble_scanner()    # Connect to the device the scanner already resolved
     
     def run_connection():
         """
@@ -304,11 +374,12 @@ def disconnect_device():
         return jsonify({'status': 'disconnected'})
     return jsonify({'status': 'no active connection'})
 
-# Route to start recording data from the connected device to a CSV file.
+# Route to start recording data from the connected device to a CSV (default) or binary file.
 @app.route('/start_recording', methods=['POST'])
 def start_recording():
     """
-    Start recording data from the connected device to a CSV file.
+    Start recording data from the connected device to a CSV file, or to a binary file when the request has "format": "bin".
+    Optional "segment_seconds" or "segment_bytes" split the recording into segments listed in a manifest.
     Returns:
         JSON response indicating recording status.
     """
@@ -318,13 +389,16 @@ def start_recording():
     
     data = request.get_json()
     filename = data.get('filename')
+    recording_format = data.get('format', 'csv')
+    segment_seconds = data.get('segment_seconds')
+    segment_bytes = data.get('segment_bytes')
     
     # If filename is empty or None, let connection_manager use default
     if filename == "":
         filename = None
     
     try:
-        if connection_manager.start_csv_recording(filename):
+        if connection_manager.start_recording(filename, recording_format, segment_seconds, segment_bytes):
             post_console_message(f"Recording started: {filename or 'default filename'}")
             return jsonify({'status': 'recording_started'})
         return jsonify({'status': 'error', 'message': 'Failed to start recording'}), 500
@@ -332,7 +406,7 @@ def start_recording():
         logging.error(f"Recording error: {str(e)}")
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
-# Route to stop the current recording session. It calls the stop_csv_recording method of the connection manager.
+# Route to stop the current recording session. It calls the stop_recording method of the connection manager.
 @app.route('/stop_recording', methods=['POST'])
 def stop_recording():
     """
@@ -343,7 +417,7 @@ def stop_recording():
     global connection_manager
     if connection_manager:
         try:
-            if connection_manager.stop_csv_recording():
+            if connection_manager.stop_recording():
                 post_console_message("Recording stopped")
                 return jsonify({'status': 'recording_stopped'})
             return jsonify({'status': 'error', 'message': 'Failed to stop recording'}), 500
@@ -362,7 +436,10 @@ def main():
         webbrowser.open("http://localhost:5000")
 
     threading.Timer(1, open_browser).start()  # Open browser after 1 seconds to allow server to start
-    app.run(debug=True, use_reloader=False, host='0.0.0.0', port=5000)   # Start Flask application
+    try:
+        app.run(debug=True, use_reloader=False, host='0.0.0.0', port=5000)   # Start Flask application
+    finally:
+        stop_ble_scanner()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
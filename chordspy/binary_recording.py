@@ -0,0 +1,428 @@
+"""
+Compact binary recordings with memory-mapped random access.
+A CSV row spends 5-7 characters per sample and has to be parsed back; a binary recording stores every sample as raw
+little-endian integers (uint16 for the codes of 16-bit boards, int16 otherwise, see code_dtype) or float32 so writing is
+a single tobytes() per batch and loading is a memory map.
+
+File layout (recording.bin):
+- 8 bytes  magic b"CHORDSPY"
+- uint16   format version
+- uint32   length of the JSON header that follows
+- JSON     board, channels, sampling_rate, resolution, dtype, start_time, start_unix, channel_names (space padded so
+           the samples start on a 64-byte boundary)
+- samples  (n, channels) array in the header dtype, appended block by block
+
+Index (recording.idx, next to it): INDEX_DTYPE records with the position of a sample, its device counter (-1 if
+unknown) and its local_clock() timestamp (NaN if unknown). Records are written for the first and the last sample, for
+the samples on both sides of every counter discontinuity or timestamp gap, and otherwise once every INDEX_SECONDS, so
+the index stays a small fraction of the data and the timestamps of the samples in between are interpolated from it.
+Both files are append-only, so a recording cut short by a crash is still readable up to its last complete sample.
+
+Usage:
+$ python -m chordspy.binary_recording ChordsPy_20250101_120000.bin
+$ python -m chordspy.binary_recording ChordsPy_20250101_120000.bin --to-csv
+"""
+
+# Importing necessary libraries
+import os
+import json
+import time
+import struct
+import argparse
+from datetime import datetime
+import numpy as np
+from chordspy.recording import RecordingWriter
+from chordspy.csv_writer import csv_headers, format_rows
+
+MAGIC = b"CHORDSPY"
+VERSION = 1
+PREAMBLE = struct.Struct('<8sHI')    # Magic, version, JSON header length
+ALIGNMENT = 64                       # Samples start at a multiple of this many bytes
+INDEX_DTYPE = np.dtype([('sample', '<u8'), ('counter', '<i8'), ('timestamp', '<f8')])
+INDEX_SECONDS = 1.0                  # Longest run of continuous samples between two index records
+
+def index_filename(filename, extension='.idx'):
+    """
+    Path of the block index that belongs to a binary recording.
+    Args:
+        filename (str): Path of the recording
+        extension (str, optional): Extension of the index. Defaults to '.idx'.
+    Returns:
+        str: Same path with the index extension
+    """
+    return os.path.splitext(filename)[0] + extension
+
+def code_dtype(low, high):
+    """
+    Smallest little-endian sample type that holds a range of ADC codes.
+    Args:
+        low (int): Lowest code
+        high (int): Highest code
+    Returns:
+        str: '<u2' for unsigned codes up to 16 bits, '<i2' for signed codes that fit 16 bits, '<i4' otherwise
+    """
+    if low >= 0 and high <= 0xFFFF:
+        return '<u2'
+    if low >= -0x8000 and high <= 0x7FFF:
+        return '<i2'
+    return '<i4'
+
+def pack_header(header):
+    """
+    Serialize a recording header: preamble, then the JSON padded so the data starts on an ALIGNMENT boundary.
+    Args:
+        header (dict): Recording metadata
+    Returns:
+        bytes: The header as written at the start of the file
+    """
+    text = json.dumps(header).encode()
+    text += b' ' * (-(PREAMBLE.size + len(text)) % ALIGNMENT)
+    return PREAMBLE.pack(MAGIC, VERSION, len(text)) + text
+
+class BinaryWriter(RecordingWriter):
+    """
+    Writes sample blocks to a binary recording on a background thread.
+    Attributes:
+        sampling_rate (float): Nominal sampling rate in Hz
+        board (str): Board name stored in the header
+        resolution (int): ADC resolution in bits stored in the header
+        dtype (numpy.dtype): Little-endian sample type, uint16, int16, int32 or float32
+    """
+    def __init__(self, filename, num_channels, sampling_rate=500, board=None, resolution=12, dtype='<i2', **options):
+        """
+        Initialize the writer. The files are opened by start().
+        Args:
+            filename (str): Path of the .bin file
+            num_channels (int): Channels per sample
+            sampling_rate (float, optional): Nominal sampling rate in Hz. Defaults to 500.
+            board (str, optional): Board name stored in the header
+            resolution (int, optional): ADC resolution in bits. Defaults to 12.
+            dtype (str, optional): Sample type stored in the header, code_dtype() of the device's code range for ADC codes or '<f4' for processed values. Defaults to '<i2'.
+            **options: max_samples, flush_interval and fsync, see RecordingWriter
+        """
+        super().__init__(filename, num_channels, **options)
+        self.sampling_rate = sampling_rate
+        self.board = board
+        self.resolution = resolution
+        self.dtype = np.dtype(dtype).newbyteorder('<')
+        if self.dtype.kind not in 'iuf' or self.dtype.itemsize not in (2, 4):
+            raise ValueError(f"Unsupported sample type: {dtype}")
+        self._indexed = None     # Position of the last index record
+        self._last = None        # (position, counter, timestamp) of the last sample written
+        self._step = 1           # Counter step into the last sample written
+        self._broken = False     # Whether the last sample written started a new run
+
+    def header(self):
+        """
+        Build the JSON header of the recording.
+        Returns:
+            dict: Recording metadata
+        """
+        now = time.time()
+        return {
+            'board': self.board,
+            'channels': self.num_channels,
+            'sampling_rate': self.sampling_rate,
+            'resolution': self.resolution,
+            'dtype': self.dtype.str,
+            'start_time': datetime.fromtimestamp(now).isoformat(),
+            'start_unix': now,
+            'channel_names': csv_headers(self.num_channels)[1:],
+        }
+
+    def open_files(self):
+        """Create the recording and its index and write the header."""
+        data = open(self.filename, 'wb')
+        data.write(pack_header(self.header()))
+        self.files.append(data)
+        self.files.append(open(index_filename(self.filename), 'wb'))
+
+    def run_breaks(self, block, position):
+        """
+        Find where a block breaks the run of samples written before it. A run is a stretch of samples whose counters advance by the same step (1, or more in a decimated stream) and whose timestamps agree with that step to half a sample.
+        Args:
+            block (SampleBlock): Block about to be written
+            position (int): Position of its first sample in the recording
+        Returns:
+            tuple: (counters, times, breaks, last) with the int64 counters (-1 if unknown) and float64 timestamps of the block, the indices of its samples that start a new run, and the (position, counter, timestamp) of the sample written before it (None for the first block)
+        """
+        count = len(block.samples)
+        counters = np.asarray(block.counters, dtype=np.int64) if block.counters is not None and len(block.counters) == count else np.full(count, -1, dtype=np.int64)
+        if block.timestamps is not None:
+            times = np.asarray(block.timestamps, dtype=np.float64)
+        else:
+            start = block.timestamp if block.timestamp is not None else np.nan
+            times = start + np.arange(count) / self.sampling_rate
+        last = self._last
+        if not count:
+            return counters, times, [], last
+
+        # Counter step and timestamp agreement into every sample, from the last sample written
+        previous = last or (position - 1, -1, np.nan)
+        steps = np.diff(counters, prepend=previous[1]) if counters[0] >= 0 and previous[1] >= 0 else np.ones(count, dtype=np.int64)
+        if (counters[0] >= 0) != (previous[1] >= 0):
+            steps[0] = 0    # Counters appear or disappear: always a break
+        off = np.abs(np.diff(times, prepend=previous[2]) - steps / self.sampling_rate) > 0.5 / self.sampling_rate
+        changed = steps != np.concatenate(([self._step], steps[:-1]))
+
+        # A sample breaks the run if its timestamp is off, or if its step differs from the run's; the step into the sample after a break sets the new run's step
+        breaks = [0] if last is None else []
+        for i in np.flatnonzero(changed | off).tolist():
+            if i == 0 and last is None:
+                continue
+            previous_broke = (bool(breaks) and breaks[-1] == i - 1) if i else self._broken
+            if off[i] or (changed[i] and not previous_broke):
+                breaks.append(i)
+
+        self._step = int(steps[-1])
+        self._broken = bool(breaks) and breaks[-1] == count - 1
+        self._last = (position + count - 1, int(counters[-1]), times[-1])
+        return counters, times, breaks, last
+
+    def index_records(self, block, position):
+        """
+        Index records of a block: on both sides of every break between runs (see run_breaks()), so readers can interpolate between any two consecutive records, and at the start of a block once a run has gone INDEX_SECONDS without a record.
+        Args:
+            block (SampleBlock): Block about to be written
+            position (int): Position of its first sample in the recording
+        Returns:
+            list: (sample, counter, timestamp) tuples, in sample order
+        """
+        counters, times, breaks, last = self.run_breaks(block, position)
+        if not len(counters):
+            return []
+        records = []
+        marks = set()
+        for i in breaks:
+            if i:
+                marks.add(i - 1)
+            elif last is not None and last[0] != self._indexed:
+                records.append(last)    # Close the run before the break
+            marks.add(i)
+        if 0 not in marks and position - self._indexed >= INDEX_SECONDS * self.sampling_rate:
+            marks.add(0)
+        records += [(position + i, int(counters[i]), times[i]) for i in sorted(marks)]
+        if records:
+            self._indexed = records[-1][0]
+        return records
+
+    def write_blocks(self, blocks):
+        """
+        Append a batch of blocks and their index records, see index_records().
+        Returns:
+            int: Bytes written
+        """
+        records = []
+        position = self.rows_written
+        for block in blocks:
+            records.extend(self.index_records(block, position))
+            position += len(block.samples)
+        index = np.array(records, dtype=INDEX_DTYPE)
+        samples = blocks[0].samples if len(blocks) == 1 else np.concatenate([b.samples for b in blocks])
+        data = np.ascontiguousarray(samples, dtype=self.dtype).tobytes()
+        self.files[0].write(data)
+        self.files[1].write(index.tobytes())
+        return len(data) + index.nbytes
+
+    def close_files(self):
+        """Index the last sample, so the timestamps of the final run are interpolated too, then close the files."""
+        if self._last is not None and self._last[0] != self._indexed and not self.error:
+            index = np.array([self._last], dtype=INDEX_DTYPE)
+            self.files[1].write(index.tobytes())
+            self.bytes_written += index.nbytes
+        super().close_files()
+
+def read_header(f):
+    """
+    Read and validate the header of an open binary recording.
+    Args:
+        f (file): File opened in binary mode at position 0
+    Returns:
+        tuple: (header dict, offset of the first sample)
+    Raises:
+        ValueError: If the file is not a ChordsPy binary recording
+    """
+    magic, version, length = PREAMBLE.unpack(f.read(PREAMBLE.size))
+    if magic != MAGIC:
+        raise ValueError("Not a ChordsPy binary recording")
+    if version > VERSION:
+        raise ValueError(f"Unsupported recording version: {version}")
+    return json.loads(f.read(length)), PREAMBLE.size + length
+
+class BinaryRecording:
+    """
+    Read-only, memory-mapped view of a binary recording.
+    Attributes:
+        filename (str): Path of the .bin file
+        header (dict): Recording metadata
+        num_channels (int): Channels per sample
+        sampling_rate (float): Nominal sampling rate in Hz
+        samples (numpy.ndarray): (n, num_channels) memory-mapped samples, nothing is read until it is accessed
+        index (numpy.ndarray): INDEX_DTYPE records, at the first sample, every discontinuity and every INDEX_SECONDS
+    """
+    def __init__(self, filename):
+        """
+        Open a recording. Only the header and the index are read.
+        Args:
+            filename (str): Path of the .bin file
+        """
+        self.filename = filename
+        with open(filename, 'rb') as f:
+            self.header, offset = read_header(f)
+        if 'codec' in self.header:
+            raise ValueError("Compressed recording, open it with chordspy.compressed_recording.CompressedRecording")
+        self.num_channels = self.header['channels']
+        self.sampling_rate = self.header['sampling_rate']
+        dtype = np.dtype(self.header['dtype'])
+
+        count = (os.path.getsize(filename) - offset) // (dtype.itemsize * self.num_channels)    # Ignore a partly written last sample
+        if count:
+            self.samples = np.memmap(filename, dtype=dtype, mode='r', offset=offset, shape=(count, self.num_channels))
+        else:
+            self.samples = np.empty((0, self.num_channels), dtype=dtype)
+
+        path = index_filename(filename)
+        index = np.fromfile(path, dtype=INDEX_DTYPE) if os.path.exists(path) else np.empty(0, dtype=INDEX_DTYPE)
+        self.set_index(index[index['sample'] < count])
+
+    def set_index(self, index):
+        """
+        Install the index used for time lookups.
+        Args:
+            index (numpy.ndarray): Records with at least 'sample' and 'timestamp' fields, see record_periods()
+        """
+        self.index = index
+        self._times = None
+        self._periods = None
+        if len(index) and not np.isnan(index['timestamp']).any():
+            self._times = index['timestamp'] - index['timestamp'][0]    # Record times since the first sample
+            self._periods = self.record_periods(index)
+
+    def record_periods(self, index):
+        """
+        Seconds per sample after each index record. BinaryWriter puts records on both sides of every discontinuity, so the samples between two records are interpolated; after the last record they continue at the rate measured before it if the counters were continuous there, at the nominal rate otherwise.
+        Args:
+            index (numpy.ndarray): Index records with timestamps
+        Returns:
+            numpy.ndarray: float64 period of every record
+        """
+        periods = np.full(len(index), 1.0 / self.sampling_rate)
+        if len(index) > 1:
+            samples = np.diff(index['sample'].astype(np.int64))
+            periods[:-1] = np.diff(self._times) / np.maximum(samples, 1)
+            if 'counter' in index.dtype.names and index['counter'][-2] >= 0 and index['counter'][-1] - index['counter'][-2] == samples[-1]:
+                periods[-1] = periods[-2]
+        return periods
+
+    def __len__(self):
+        return len(self.samples)
+
+    @property
+    def duration(self):
+        """Length of the recording in seconds at the nominal sampling rate."""
+        return len(self) / self.sampling_rate
+
+    def read(self, start=0, stop=None):
+        """
+        Samples by position, as a view into the memory map (no copy).
+        Args:
+            start (int, optional): First sample index. Defaults to 0.
+            stop (int, optional): Sample index after the last one. Defaults to the end.
+        Returns:
+            numpy.ndarray: (n, num_channels) samples
+        """
+        return self.samples[start:stop]
+
+    def sample_at(self, seconds):
+        """
+        Position of the first sample at or after a time.
+        Args:
+            seconds (float): Time since the first sample
+        Returns:
+            int: Sample index between 0 and len(self)
+        """
+        if self._times is None:
+            return int(min(max(np.ceil(seconds * self.sampling_rate - 1e-9), 0), len(self)))
+        block = np.searchsorted(self._times, seconds, side='right') - 1
+        if block < 0:
+            return 0
+        end = self.index['sample'][block + 1] if block + 1 < len(self.index) else len(self)
+        offset = max(np.ceil((seconds - self._times[block]) / self._periods[block] - 1e-9), 0)
+        return int(min(self.index['sample'][block] + offset, end))
+
+    def time_range(self, start=None, stop=None):
+        """
+        Samples recorded between two times, as a view into the memory map (no copy) for binary recordings.
+        Args:
+            start (float, optional): Seconds since the first sample. Defaults to the beginning.
+            stop (float, optional): Seconds since the first sample, exclusive. Defaults to the end.
+        Returns:
+            numpy.ndarray: (n, num_channels) view
+        """
+        first = 0 if start is None else self.sample_at(start)
+        last = len(self) if stop is None else self.sample_at(stop)
+        return self.read(first, max(first, last))
+
+    def timestamps(self, start=0, stop=None):
+        """
+        local_clock() timestamps of a range of samples, from the index record before each one (see record_periods()).
+        Args:
+            start (int, optional): First sample index. Defaults to 0.
+            stop (int, optional): Sample index after the last one. Defaults to the end.
+        Returns:
+            numpy.ndarray: float64 timestamps, or seconds since the first sample if the recording has no timestamps
+        """
+        stop = len(self) if stop is None else stop
+        positions = np.arange(start, stop, dtype=np.float64)
+        if self._times is None:
+            return positions / self.sampling_rate
+        first = self.index['sample'].astype(np.float64)
+        record = np.maximum(np.searchsorted(first, positions, side='right') - 1, 0)
+        return self.index['timestamp'][record] + (positions - first[record]) * self._periods[record]
+
+def write_csv(recording, csv_filename, chunk_samples=100000):
+    """
+    Write an open recording in the CSV layout of Connection.start_csv_recording.
+    Args:
+        recording (BinaryRecording): Any recording reader with read() and num_channels
+        csv_filename (str): Output path
+        chunk_samples (int, optional): Samples converted per step, bounds memory use. Defaults to 100000.
+    Returns:
+        str: Path of the CSV file
+    """
+    with open(csv_filename, 'w', newline='', buffering=1 << 20) as f:
+        f.write(",".join(csv_headers(recording.num_channels)) + "\r\n")
+        for start in range(0, len(recording), chunk_samples):
+            samples = np.asarray(recording.read(start, start + chunk_samples))
+            f.write(format_rows(np.arange(start + 1, start + len(samples) + 1), samples))
+    return csv_filename
+
+def convert_to_csv(filename, csv_filename=None, chunk_samples=100000):
+    """
+    Convert a binary recording to the CSV layout written by Connection.start_csv_recording.
+    Args:
+        filename (str): Path of the .bin file
+        csv_filename (str, optional): Output path. Defaults to the same name with the .csv extension.
+        chunk_samples (int, optional): Samples converted per step, bounds memory use. Defaults to 100000.
+    Returns:
+        str: Path of the CSV file
+    """
+    return write_csv(BinaryRecording(filename), csv_filename or os.path.splitext(filename)[0] + '.csv', chunk_samples)
+
+def main():
+    """
+    Command line entry point: show a recording's header and optionally convert it to CSV.
+    """
+    parser = argparse.ArgumentParser(description='Inspect or convert a ChordsPy binary recording')
+    parser.add_argument('filename', help='Path of the .bin recording')
+    parser.add_argument('--to-csv', nargs='?', const='', metavar='CSV', help='Convert to CSV (default: same name with .csv)')
+    args = parser.parse_args()
+
+    recording = BinaryRecording(args.filename)
+    print(json.dumps(recording.header, indent=2))
+    print(f"{len(recording)} samples, {recording.duration:.1f} s, {len(recording.index)} blocks")
+    if args.to_csv is not None:
+        print(f"CSV written to {convert_to_csv(args.filename, args.to_csv or None)}")
+
+if __name__ == "__main__":
+    main()
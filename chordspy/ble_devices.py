@@ -0,0 +1,235 @@
+"""
+Concurrent acquisition from several BLE devices, see Connection.connect_ble_devices.
+All devices share one asyncio event loop running on a single background thread (BleLoop): every device's connection,
+notifications and reconnect loop are coroutines on that loop, so N devices cost one thread instead of one event loop
+and one blocked thread each. Each device still has its own Chords_BLE decode state and counters and its own
+Connection (sample queue, timestamps, sinks, reconnect bookkeeping).
+
+The devices can publish to one merged stream instead of one stream each: MergeSink hands every device's stamped
+blocks to a BleMerger, which lines the devices up by sample counter into rows of NUM_CHANNELS channels per device.
+"""
+
+# Importing necessary libraries
+import asyncio
+import threading
+import numpy as np
+from collections import deque
+from pylsl import local_clock
+from chordspy.sinks import Sink
+
+class BleLoop:
+    """
+    An asyncio event loop running on a daemon thread, shared by the BLE devices.
+    Attributes:
+        loop (asyncio.AbstractEventLoop): The loop, None before start()
+    """
+    def __init__(self):
+        """Initialize the loop holder. Nothing runs until start() is called."""
+        self.loop = None
+        self._thread = None
+
+    def start(self):
+        """
+        Create the event loop and run it on its thread.
+        Returns:
+            BleLoop: self
+        """
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def submit(self, coroutine):
+        """
+        Schedule a coroutine on the loop from any thread.
+        Args:
+            coroutine (coroutine): Coroutine to run
+        Returns:
+            concurrent.futures.Future: Its result
+        """
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def stop(self, timeout=2.0):
+        """
+        Stop the loop, cancel what is still running on it and wait for the thread.
+        Args:
+            timeout (float, optional): Seconds to wait for the thread. Defaults to 2.
+        """
+        if self.loop and self._thread:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self):
+        """Loop thread: run until stopped, then cancel the remaining tasks and close the loop."""
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_forever()
+            tasks = asyncio.all_tasks(self.loop)
+            for task in tasks:
+                task.cancel()
+            if tasks:
+                self.loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+        finally:
+            self.loop.close()
+
+class BleMerger:
+    """
+    Lines up the blocks of several devices into rows of one merged stream.
+    Each device's counters are shifted once, at its first block, so that this sample lands on the row of its timestamp;
+    after that its samples follow its own counters, which Connection keeps counting across reconnects. A row is
+    published once every device that delivered within hold_seconds has reached it. A device that is away
+    (reconnecting, out of range) does not hold the others up; its channels are NaN until it is back. Only the outputs
+    that carry floats see the merged stream's NaN: LSL, the shared ring and CSV recordings. Connection.start_recording
+    refuses the integer formats (bin, zbin, EDF, BDF) while merging, since they have no code for a missing sample.
+    Devices are not resampled: the drift between their clocks (tens of ppm) slowly shifts them against each other, so
+    use the per-device streams where sub-sample alignment matters.
+    Attributes:
+        devices (int): Number of devices
+        channels (int): Channels per device
+        sampling_rate (float): Nominal sampling rate of every device in Hz
+        hold_seconds (float): Time a silent device is waited for before its channels are published as NaN
+        rows_published (int): Rows handed to publish
+        late_samples (int): Device samples that arrived after their row was published, left out
+        filled_samples (int): Device samples published as NaN because the device was away
+    """
+    def __init__(self, devices, channels, sampling_rate, publish, hold_seconds=0.5):
+        """
+        Initialize the merger.
+        Args:
+            devices (int): Number of devices
+            channels (int): Channels per device
+            sampling_rate (float): Nominal sampling rate in Hz
+            publish (callable): publish(samples, counters, arrival_time) receives every (n, devices * channels) block of rows, e.g. Connection.queue_block
+            hold_seconds (float, optional): Wait for a silent device. Defaults to 0.5 s.
+        """
+        self.devices = devices
+        self.channels = channels
+        self.sampling_rate = sampling_rate
+        self.publish = publish
+        self.hold_seconds = hold_seconds
+        self.rows_published = 0
+        self.late_samples = 0
+        self.filled_samples = 0
+        self._pending = [deque() for _ in range(devices)]    # (rows, samples) blocks waiting per device
+        self._offsets = [None] * devices                      # Row of a device sample = counter + offset
+        self._reached = [None] * devices                      # Row after the newest sample of each device
+        self._last_seen = [local_clock()] * devices           # local_clock() of each device's newest block
+        self._start_time = None                               # Timestamp of row 0
+        self._next_row = 0                                    # First row not yet published
+        self._lock = threading.Lock()
+
+    def add(self, device, block):
+        """
+        Take a stamped block of one device and publish the rows every active device has reached. Called from the device's MergeSink thread.
+        Args:
+            device (int): Index of the device
+            block (SampleBlock): Block with counters and per-sample timestamps
+        """
+        if not len(block.samples):
+            return
+        with self._lock:
+            now = local_clock()
+            if self._start_time is None:
+                self._start_time = block.timestamp
+            if self._offsets[device] is None:
+                self._offsets[device] = int(round((block.timestamp - self._start_time) * self.sampling_rate)) - int(block.counters[0])
+            rows = np.asarray(block.counters, dtype=np.int64) + self._offsets[device]
+            late = rows < self._next_row
+            if late.any():
+                self.late_samples += int(late.sum())
+                rows, samples = rows[~late], block.samples[~late]
+            else:
+                samples = block.samples
+            if len(rows):
+                self._pending[device].append((rows, samples))
+                self._reached[device] = max(self._reached[device] or 0, int(rows[-1]) + 1)
+            self._last_seen[device] = now
+            self._emit(now)
+
+    def hold_deadline(self, device):
+        """
+        Time until which the rows of a silent device are waited for.
+        Args:
+            device (int): Index of the device
+        Returns:
+            float: local_clock() time after which the device's channels are published as NaN
+        """
+        return self._last_seen[device] + self.hold_seconds
+
+    def flush(self):
+        """Publish every row still waiting, filling the devices that did not reach them with NaN. Called at shutdown."""
+        with self._lock:
+            reached = [r for r in self._reached if r is not None]
+            if reached:
+                self._emit(local_clock(), max(reached))
+
+    def _emit(self, now, end=None):
+        """
+        Publish the rows from the next unpublished one up to end.
+        Args:
+            now (float): local_clock() time, the arrival time of the published block
+            end (int, optional): Row to stop before. Defaults to the oldest row reached by the active devices.
+        """
+        if end is None:
+            active = [i for i in range(self.devices) if now - self._last_seen[i] < self.hold_seconds]
+            if not active or any(self._reached[i] is None for i in active):
+                return    # Wait for the first block of every device that is still expected
+            end = min(self._reached[i] for i in active)
+        count = end - self._next_row
+        if count <= 0:
+            return
+        merged = np.full((count, self.devices * self.channels), np.nan)
+        filled = np.ones((count, self.devices), dtype=bool)
+        for device, pending in enumerate(self._pending):
+            columns = slice(device * self.channels, (device + 1) * self.channels)
+            while pending:
+                rows, samples = pending[0]
+                take = rows < end
+                merged[rows[take] - self._next_row, columns] = samples[take]
+                filled[rows[take] - self._next_row, device] = False
+                if take.all():
+                    pending.popleft()
+                else:
+                    pending[0] = (rows[~take], samples[~take])
+                    break
+        self.filled_samples += int(filled.sum())
+        counters = np.arange(self._next_row, end, dtype=np.int64)
+        self._next_row = end
+        self.rows_published += count
+        self.publish(merged, counters, now)
+
+    def stats(self):
+        """
+        Snapshot of the merger counters.
+        Returns:
+            dict: Rows published, late and NaN-filled device samples
+        """
+        return {
+            'rows_published': self.rows_published,
+            'late_samples': self.late_samples,
+            'filled_samples': self.filled_samples,
+        }
+
+class MergeSink(Sink):
+    """
+    Sink of one device's Connection that hands its stamped blocks to a BleMerger.
+    Attributes:
+        merger (BleMerger): The merger
+        device (int): Index of the device in the merger
+    """
+    def __init__(self, merger, device, **options):
+        """
+        Initialize the sink.
+        Args:
+            merger (BleMerger): The merger
+            device (int): Index of the device
+            **options: max_samples and policy, see Sink
+        """
+        super().__init__('merge', **options)
+        self.merger = merger
+        self.device = device
+
+    def consume(self, block):
+        """Add the block to the merged stream."""
+        self.merger.add(self.device, block)
@@ -0,0 +1,250 @@
+"""
+Persistent background BLE scanner with a cache of the NPG devices in range.
+Instead of a blocking 5 s BleakScanner.discover() per request, one BleakScanner keeps running on its own event loop
+thread (a BleLoop) and records every NPG advertisement with its RSSI and last-seen time. Devices not heard from for
+ttl seconds drop out of the cache. Readers get the cached list at once; subscribers get 'found' and 'lost' events as
+devices appear and expire, which app.py pushes to the web interface over SSE. The cached BLEDevice objects are handed
+to BleakClient by Chords_BLE (see Connection.ble_scanner), which skips the scan bleak otherwise runs before connecting.
+
+Usage:
+    scanner = BleScanner().start()
+    ...
+    scanner.devices()                  # [{'name', 'address', 'rssi', 'first_seen', 'last_seen'}, ...] strongest first
+    events = scanner.subscribe()       # queue.Queue of {'type': 'found' | 'lost', 'device': {...}}
+    manager.ble_scanner = scanner      # Connections reuse the resolved devices and pause the scanner while connecting
+    scanner.wait_first_cycle(3.0)      # True once the scanner has listened for one cycle
+    async with scanner.paused():       # No scanning while a GATT connection is opened, BlueZ connects slowly or fails otherwise
+        await client.connect()
+    scanner.stop()
+"""
+
+# Importing necessary libraries
+import time
+import queue
+import asyncio
+import threading
+import contextlib
+from bleak import BleakScanner
+from chordspy.ble_devices import BleLoop
+
+DEVICE_NAME_PREFIXES = ('NPG', 'npg')    # Names of the devices kept in the cache
+
+class BleScanner:
+    """
+    Continuously running BLE scanner keeping a TTL cache of the NPG devices in range.
+    Attributes:
+        ttl (float): Seconds after its last advertisement before a device is dropped from the cache
+        scanning (bool): True while the BleakScanner is running (not while paused)
+        error (str): Message of the last scanner failure (e.g. no Bluetooth adapter), None while healthy
+    """
+    def __init__(self, ttl=15.0, retry_interval=5.0, scanner_factory=None):
+        """
+        Initialize the scanner. Nothing runs until start() is called.
+        Args:
+            ttl (float, optional): Seconds a device stays cached after its last advertisement. Defaults to 15.
+            retry_interval (float, optional): Seconds before the scanner is restarted after a failure. Defaults to 5.
+            scanner_factory (callable, optional): factory(detection_callback) returning a scanner with async start() and stop(). Defaults to bleak.BleakScanner.
+        """
+        self.ttl = ttl
+        self.retry_interval = retry_interval
+        self.scanner_factory = scanner_factory or (lambda callback: BleakScanner(detection_callback=callback))
+        self.scanning = False
+        self.error = None
+        self._entries = {}           # Address -> cache entry
+        self._ble_devices = {}       # Address -> BLEDevice of the newest advertisement
+        self._subscribers = []       # Queues receiving found/lost events
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._first_cycle = threading.Event()    # Set after the first second of scanning, or the first failure
+        self._idle = threading.Event()           # Set while no BleakScanner is running
+        self._idle.set()
+        self._pauses = 0                         # Number of pause() calls not yet resumed
+        self._loop = None
+        self._future = None
+
+    def start(self):
+        """
+        Start scanning on a dedicated event loop thread.
+        Returns:
+            BleScanner: self
+        """
+        if self._loop is None:
+            self._stop_event.clear()
+            self._loop = BleLoop().start()
+            self._future = self._loop.submit(self._run())
+        return self
+
+    def stop(self, timeout=2.0):
+        """
+        Stop scanning and the event loop thread.
+        Args:
+            timeout (float, optional): Seconds to wait for the scanner to stop. Defaults to 2.
+        """
+        self._stop_event.set()
+        self._first_cycle.set()    # Nobody waits for a cycle that will not come
+        if self._loop:
+            try:
+                self._future.result(timeout)
+            except Exception:
+                pass
+            self._loop.stop()
+            self._loop = None
+
+    def wait_first_cycle(self, timeout=3.0):
+        """
+        Wait until the scanner has listened for one cycle, so that a first devices() call is not empty just because scanning has only begun.
+        Args:
+            timeout (float, optional): Seconds to wait at most. Defaults to 3.
+        Returns:
+            bool: True if the first cycle has finished (or the scanner failed or was stopped), False on timeout
+        """
+        return self._first_cycle.wait(timeout)
+
+    def pause(self, timeout=2.0):
+        """
+        Stop the BleakScanner until resume(), e.g. while a GATT connection is opened. Pauses nest, scanning restarts after the last resume().
+        Args:
+            timeout (float, optional): Seconds to wait for the running scanner to stop. Defaults to 2.
+        Returns:
+            bool: True once no scanner is running, False on timeout
+        """
+        with self._lock:
+            self._pauses += 1
+        return self._idle.wait(timeout)
+
+    def resume(self):
+        """Undo one pause(), scanning restarts once every pause has been resumed."""
+        with self._lock:
+            self._pauses = max(0, self._pauses - 1)
+
+    @contextlib.asynccontextmanager
+    async def paused(self):
+        """Async context manager pausing the scanner for its block, waiting for the scanner to stop without blocking the event loop."""
+        await asyncio.get_running_loop().run_in_executor(None, self.pause)
+        try:
+            yield
+        finally:
+            self.resume()
+
+    def devices(self):
+        """
+        The NPG devices heard from within ttl seconds.
+        Returns:
+            list: Cache entries (name, address, rssi, first_seen, last_seen as time.time()), strongest signal first
+        """
+        self.expire()
+        with self._lock:
+            entries = [dict(entry) for entry in self._entries.values()]
+        return sorted(entries, key=lambda entry: entry['rssi'] if entry['rssi'] is not None else -1000, reverse=True)
+
+    def device(self, address):
+        """
+        The BLEDevice of a cached address, to connect without scanning again.
+        Args:
+            address (str): Device address
+        Returns:
+            BLEDevice: The device as last advertised, None if it is not in the cache
+        """
+        self.expire()
+        with self._lock:
+            return self._ble_devices.get(address) if address in self._entries else None
+
+    def subscribe(self):
+        """
+        Receive an event whenever a device enters or leaves the cache.
+        Returns:
+            queue.Queue: Events {'type': 'found' or 'lost', 'device': cache entry}; pass it to unsubscribe() when done
+        """
+        events = queue.Queue()
+        with self._lock:
+            self._subscribers.append(events)
+        return events
+
+    def unsubscribe(self, events):
+        """Stop sending events to a queue returned by subscribe()."""
+        with self._lock:
+            if events in self._subscribers:
+                self._subscribers.remove(events)
+
+    def expire(self):
+        """Drop the devices not heard from for ttl seconds, telling the subscribers."""
+        now = time.time()
+        with self._lock:
+            expired = [address for address, entry in self._entries.items() if now - entry['last_seen'] > self.ttl]
+            for address in expired:
+                entry = self._entries.pop(address)
+                self._ble_devices.pop(address, None)
+                self._publish('lost', entry)
+
+    def detected(self, device, advertisement_data=None):
+        """
+        Detection callback of the scanner: cache an advertisement if it comes from an NPG device.
+        Args:
+            device (BLEDevice): Advertising device
+            advertisement_data (AdvertisementData, optional): Its advertisement, with local_name and rssi
+        """
+        name = getattr(advertisement_data, 'local_name', None) or device.name
+        if not name or not name.startswith(DEVICE_NAME_PREFIXES):
+            return
+        rssi = getattr(advertisement_data, 'rssi', None)
+        if rssi is None:
+            rssi = getattr(device, 'rssi', None)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(device.address)
+            if entry is None:
+                entry = self._entries[device.address] = {'name': name, 'address': device.address, 'rssi': rssi, 'first_seen': now, 'last_seen': now}
+                self._publish('found', entry)
+            else:
+                entry.update(name=name, rssi=rssi, last_seen=now)
+            self._ble_devices[device.address] = device
+
+    def _publish(self, kind, entry):
+        """Hand an event to every subscriber. Called with the lock held."""
+        event = {'type': kind, 'device': dict(entry)}
+        for events in self._subscribers:
+            events.put(event)
+
+    async def _run(self):
+        """Scanner loop: keep a scanner running until stopped, stopping it while paused and restarting it after failures."""
+        while not self._stop_event.is_set():
+            with self._lock:    # pause() either sees the scanner running or is seen here
+                paused = self._pauses > 0
+                if not paused:
+                    self._idle.clear()
+            if paused:
+                await asyncio.sleep(0.1)
+                continue
+            scanner = None
+            failed = False
+            try:
+                scanner = self.scanner_factory(self.detected)
+                await scanner.start()
+                self.scanning = True
+                self.error = None
+                cycle_end = time.monotonic() + 1
+                while not self._stop_event.is_set() and not self._pauses:
+                    await asyncio.sleep(0.1)    # Short sleeps so that a pause stops the scanner quickly
+                    if time.monotonic() >= cycle_end:
+                        self.expire()
+                        self._first_cycle.set()
+                        cycle_end += 1
+            except Exception as e:
+                if self.error != str(e):
+                    print(f"BLE scanner error: {str(e)}")
+                self.error = str(e)
+                failed = True
+                self._first_cycle.set()    # The error is the answer of the first cycle
+            finally:
+                if self.scanning and scanner is not None:
+                    try:
+                        await scanner.stop()
+                    except Exception:
+                        pass
+                self.scanning = False
+                self._idle.set()
+            if not failed:
+                continue    # Paused or stopped, no retry delay
+            deadline = time.monotonic() + self.retry_interval
+            while not self._stop_event.is_set() and time.monotonic() < deadline:
+                await asyncio.sleep(0.1)
@@ -4,11 +4,15 @@ This scripts scan and then connects to the selected devices via BLE, reads data
 
 # Importing necessary libraries
 import asyncio
+import contextlib
 from bleak import BleakScanner, BleakClient
 import time
 import sys
 import argparse
 import threading
+import numpy as np
+from chordspy.stream_stats import StreamStats
+from pylsl import local_clock
 
 class Chords_BLE:
     """
@@ -29,14 +33,23 @@ class Chords_BLE:
     
     # Packet parameters
     NUM_CHANNELS = 3  # Number of channels
+    SAMPLING_RATE = 500  # Sampling rate in Hz
     SINGLE_SAMPLE_LEN = (NUM_CHANNELS * 2) + 1        # (1 Counter + Num_Channels * 2 bytes)
     BLOCK_COUNT = 10
     NEW_PACKET_LEN = SINGLE_SAMPLE_LEN * BLOCK_COUNT  # Total length of a data packet
+    SAMPLE_DTYPE = np.dtype([('counter', np.uint8), ('channels', '>i2', (NUM_CHANNELS,))])    # One sample: counter byte, big-endian signed channels
 
-    def __init__(self):
+    def __init__(self, client_factory=None, resolve_device=None, pause_scanner=None):
         """
         Initialize the BLE client with default values and state variables.
+        Args:
+            client_factory (callable, optional): Creates the client of a device address. Defaults to bleak.BleakClient; chordspy.emulator.BleEmulator.client gives emulated devices.
+            resolve_device (callable, optional): Looks up an address in a scanner cache, e.g. BleScanner.device, returning a BLEDevice or None. A resolved device is connected without scanning for it first.
+            pause_scanner (callable, optional): Returns an async context manager stopping a background scanner for its block, e.g. BleScanner.paused, entered while the GATT connection is opened.
         """
+        self.client_factory = client_factory or BleakClient    # Client of a device address, called at every connection attempt
+        self.resolve_device = resolve_device
+        self.pause_scanner = pause_scanner
         self.prev_unrolled_counter = None          # Tracks the last sample counter value
         self.samples_received = 0                  # Count of received samples
         self.start_time = None                     # Timestamp when first sample is received
@@ -47,17 +60,28 @@ class Chords_BLE:
         self.monitor_task = None                   # Task for monitoring connection
         self.print_rate_task = None                # Task for printing sample rate
         self.running = False                       # Flag indicating if client is running
-        self.loop = None                           # Asyncio event loop
+        self.loop = None                           # Asyncio event loop owned by connect(), None when async_connect runs on a shared loop
         self.connection_event = threading.Event()  # Event for connection status
         self.stop_event = threading.Event()        # Event for stopping operations
+        self.stats = StreamStats(self.SAMPLING_RATE)  # Counter based loss and drift accounting
+        self.last_counters = []                    # Unwrapped counters of the samples in the last notification
+        self.last_samples = np.empty((0, self.NUM_CHANNELS), dtype=np.int16)    # Channel values of the samples in the last notification
+        self.last_read_time = None                 # local_clock() time at which the last notification was handled
 
     @classmethod
-    async def scan_devices(cls):
+    async def scan_devices(cls, scanner=None):
         """
         Scan for BLE devices with the NPG prefix.
+        Args:
+            scanner (BleScanner, optional): Running background scanner, whose cached devices are returned at once instead of scanning for 5 s
         Returns:
             list: A list of discovered devices matching the NPG prefix
         """
+        if scanner is not None:
+            cached = [scanner.device(entry['address']) for entry in scanner.devices()]
+            cached = [d for d in cached if d is not None]
+            if cached:
+                return cached
         print("Scanning for BLE devices...")
         devices = await BleakScanner.discover()
         filtered = [d for d in devices if d.name and d.name.startswith(cls.DEVICE_NAME_PREFIX)]    # Filter devices by name prefix
@@ -68,63 +92,46 @@ class Chords_BLE:
         
         return filtered
 
-    def process_sample(self, sample_data: bytearray):
+    def decode_notification(self, data):
         """
-        Process a single sample packet.
+        Decode a notification, a block of BLOCK_COUNT samples or a single sample, in one vectorized step: the counters
+        are unwrapped and checked for gaps by StreamStats, the channels come out of one np.frombuffer call.
         Args:
-            sample_data (bytearray): The raw sample data to process
+            data (bytearray): The received data packet
+        Returns:
+            tuple: (counters, samples) where counters are the unwrapped counters and samples is a (n, NUM_CHANNELS) int16 array, both empty for a packet of unexpected length
         """
+        self.last_read_time = local_clock()
         self.last_received_time = time.time()
-        
-        # Validate sample length
-        if len(sample_data) != self.SINGLE_SAMPLE_LEN:
-            print("Unexpected sample length:", len(sample_data))
-            return
+        if len(data) != self.NEW_PACKET_LEN and len(data) != self.SINGLE_SAMPLE_LEN:
+            print(f"Unexpected packet length: {len(data)} bytes")
+            self.last_counters = []
+            self.last_samples = self.last_samples[:0]
+            return self.last_counters, self.last_samples
 
-        # Extract and process sample counter
-        sample_counter = sample_data[0]
-        if self.prev_unrolled_counter is None:
-            self.prev_unrolled_counter = sample_counter
-        else:
-            last = self.prev_unrolled_counter % 256
-            if sample_counter < last:
-                current_unrolled = self.prev_unrolled_counter - last + sample_counter + 256
-            else:
-                current_unrolled = self.prev_unrolled_counter - last + sample_counter
-            
-            # Check for missing samples
-            if current_unrolled != self.prev_unrolled_counter + 1:
-                missing = current_unrolled - (self.prev_unrolled_counter + 1)
-                print(f"Missing {missing} sample(s)")
-                self.total_missing_samples += missing
-            
-            self.prev_unrolled_counter = current_unrolled
-                   
-        # Record start time if this is the first sample
+        records = np.frombuffer(data, dtype=self.SAMPLE_DTYPE)
+        missing = self.stats.missing_samples
+        counters = self.stats.update(records['counter'])
+        self.total_missing_samples += self.stats.missing_samples - missing    # Reported by StreamStats and the metrics, not printed per gap
+        self.prev_unrolled_counter = self.stats.last_counter
         if self.start_time is None:
-            self.start_time = time.time()
-        
-        # Extract channel data (2 bytes per channel, big-endian, signed)
-        channels = [int.from_bytes(sample_data[i:i+2], byteorder='big', signed=True) 
-            for i in range(1, len(sample_data), 2)]
-        
-        self.samples_received += 1
+            self.start_time = time.time()    # Record start time at the first sample
+
+        self.samples_received += len(records)
+        self.last_counters = counters
+        self.last_samples = records['channels'].astype(np.int16)    # Native byte order
+        return counters, self.last_samples
 
     def notification_handler(self, sender, data: bytearray):
         """
-        Handle incoming notifications from the BLE device.        
+        Handle incoming notifications from the BLE device. Connection replaces it with its own handler, which publishes
+        the samples decoded by decode_notification.
         Args:
             sender: The characteristic that sent the notification
             data (bytearray): The received data packet
         """
         try:
-            if len(data) == self.NEW_PACKET_LEN:     # Process data based on packet length
-                for i in range(0, self.NEW_PACKET_LEN, self.SINGLE_SAMPLE_LEN):   # Process a block of samples
-                    self.process_sample(data[i:i+self.SINGLE_SAMPLE_LEN])
-            elif len(data) == self.SINGLE_SAMPLE_LEN:
-                self.process_sample(data)    # Process a single sample
-            else:
-                print(f"Unexpected packet length: {len(data)} bytes")
+            self.decode_notification(data)
         except Exception as e:
             print(f"Error processing data: {e}")
 
@@ -165,8 +172,12 @@ class Chords_BLE:
         try:
             print(f"Attempting to connect to {device_address}...")
             
-            self.client = BleakClient(device_address)
-            await self.client.connect()
+            device = self.resolve_device(device_address) if self.resolve_device else None    # Fresh at every attempt, the cache expires devices out of range
+            self.client = self.client_factory(device or device_address)
+            async with contextlib.AsyncExitStack() as connecting:
+                if self.pause_scanner:
+                    await connecting.enter_async_context(self.pause_scanner())    # BlueZ connects slowly or fails while scanning
+                await self.client.connect()
             
             if not self.client.is_connected:
                 print("Failed to connect")
@@ -174,6 +185,7 @@ class Chords_BLE:
             
             print(f"Connected to {device_address}", flush=True)
             self.connection_event.set()
+            self.stats.restart()    # The counter of a reconnected device says nothing about the outage
             
             # Initialize monitoring tasks
             self.last_received_time = time.time()
@@ -191,7 +203,7 @@ class Chords_BLE:
             # Main loop
             self.running = True
             while self.running and not self.stop_event.is_set():
-                await asyncio.sleep(1)
+                await asyncio.sleep(0.1)
             
             return True
             
@@ -214,15 +226,17 @@ class Chords_BLE:
 
     def connect(self, device_address):
         """
-        Connect to a BLE device (wrapper for async_connect).
+        Connect to a BLE device (wrapper for async_connect). Blocks until the device goes away or stop() is called.
         Args:
             device_address (str): The MAC address of the device to connect to
+        Returns:
+            bool: True if the device was connected and streamed until it went away, False if the connection failed
         """
         self.loop = asyncio.new_event_loop()
         asyncio.set_event_loop(self.loop)
         
         try:
-            self.loop.run_until_complete(self.async_connect(device_address))
+            return self.loop.run_until_complete(self.async_connect(device_address))
         except Exception as e:
             print(f"Error in connection: {str(e)}")
             return False
@@ -231,7 +245,7 @@ class Chords_BLE:
                 self.loop.close()
 
     def stop(self):
-        """Stop all operations and clean up resources."""
+        """Stop all operations and clean up resources. A shared event loop is left running, async_connect notices stop_event and returns."""
         self.stop_event.set()
         self.running = False
         if self.loop and self.loop.is_running():
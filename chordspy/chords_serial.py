@@ -10,9 +10,17 @@ import serial
 import time
 import numpy as np
 import serial.tools.list_ports
+from serial.tools.list_ports_common import ListPortInfo
+import os
 import sys
 import signal
 import threading
+import json
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from chordspy.ring_buffer import RingBuffer
+from chordspy.stream_stats import StreamStats
+from pylsl import local_clock
 
 class Chords_USB:
     """
@@ -23,21 +31,33 @@ class Chords_USB:
         SYNC_BYTE2 (int): Second synchronization byte for packet identification
         END_BYTE (int): End byte marking the end of a packet
         HEADER_LENGTH (int): Length of the packet header (sync bytes + counter)
+        BAUDRATES (list): Baud rates tried during hardware detection
+        CACHE_FILE (pathlib.Path): File remembering the last connected port, VID:PID, baud rate and board
+        PORTS_ENV (str): Environment variable listing extra ports that comports() does not report
         supported_boards (dict): Dictionary of supported boards with their specifications
         ser (serial.Serial): Serial connection object
         buffer (bytearray): Buffer for incoming data
         retry_limit (int): Maximum connection retries
         packet_length (int): Expected packet length for current board
         num_channels (int): Number of channels for current board
-        data (numpy.ndarray): Array for storing channel data
+        data (RingBuffer): Rolling window of the latest 2000 samples per channel
         board (str): Detected board name
         streaming_active (bool): Streaming state flag
+        packet_dtype (numpy.dtype): Structured dtype of one packet for the current board
+        decoded_packets (int): Total number of packets decoded
+        rejected_packets (int): Total number of sync candidates rejected as invalid
+        stats (StreamStats): Packet counter based loss and drift statistics
+        last_counters (numpy.ndarray): Unwrapped counters of the samples returned by the last read_data call
+        last_read_time (float): local_clock() time at which the last read_data call got its bytes from the port
     """
     # Packet protocol constants
     SYNC_BYTE1 = 0xc7   # First synchronization byte
     SYNC_BYTE2 = 0x7c   # Second synchronization byte
     END_BYTE = 0x01     # End of packet marker
     HEADER_LENGTH = 3   # Length of packet header (sync bytes + counter)
+    BAUDRATES = [230400, 115200]    # Common baud rates to try with
+    CACHE_FILE = Path.home() / ".chordspy" / "usb_device.json"    # Last successfully connected device
+    PORTS_ENV = "CHORDSPY_SERIAL_PORTS"    # Extra ports to probe (e.g. emulator ptys), separated by os.pathsep
 
     # Supported boards with their sampling rate and Number of Channels
     supported_boards = {
@@ -65,9 +85,15 @@ class Chords_USB:
         self.retry_limit = 4          # Maximum connection retries
         self.packet_length = None     # Expected packet length for current board
         self.num_channels = None      # Number of data channels for current board
-        self.data = None              # Numpy array for storing channel data
+        self.data = None              # Ring buffer holding the latest samples per channel
         self.board = ""               # Detected board name
         self.streaming_active = False # Streaming state flag
+        self.packet_dtype = None      # Structured numpy dtype describing one packet
+        self.decoded_packets = 0      # Total packets decoded successfully
+        self.rejected_packets = 0     # Total sync candidates rejected (bad END_BYTE)
+        self.stats = None             # Loss and drift statistics, created once the board is known
+        self.last_counters = np.empty(0, dtype=np.int64)   # Unwrapped counters of the last decoded batch
+        self.last_read_time = None    # local_clock() time of the last serial read, before decoding
 
         # Only install signal handler in the main thread
         if threading.current_thread() is threading.main_thread():
@@ -89,53 +115,200 @@ class Chords_USB:
         3. Validates response against supported boards
         4. Configures parameters based on detected board
         """
+        result = self.probe_port(port, baudrate, timeout)
+        if result is None:
+            return False
+        self.configure_board(result[0], result[1])
+        print(f"{self.board} detected at {port} with baudrate {baudrate}")
+        return True
+
+    def probe_port(self, port, baudrate, timeout=1, cancel_event=None):
+        """
+        Open a port and ask the board to identify itself, without changing the state of this client.
+        Safe to run concurrently for different ports.
+        Args:
+            port (str): Serial port to probe
+            baudrate (int): Baud rate for serial communication
+            timeout (float, optional): Serial timeout in seconds. Defaults to 1.
+            cancel_event (threading.Event, optional): Stops retrying once set (another probe already succeeded)
+        Returns:
+            tuple: (serial.Serial, board name) with the port left open on success, None otherwise
+        """
+        ser = None
         try:
-            self.ser = serial.Serial(port, baudrate=baudrate, timeout=timeout)   # Initialize serial connection
+            ser = serial.Serial(port, baudrate=baudrate, timeout=timeout)   # Initialize serial connection
             retry_counter = 0
-            response = None
 
             while retry_counter < self.retry_limit:   # Try to identify the board with retries
-                self.ser.write(b'WHORU\n')            # Send identification command
+                if cancel_event is not None and cancel_event.is_set():
+                    break
+                ser.write(b'WHORU\n')                # Send identification command
                 try:
-                    response = self.ser.readline().strip().decode()
+                    response = ser.readline().strip().decode()
                 except UnicodeDecodeError:
                     response = None
 
                 if response in self.supported_boards:  # Board identified successfully
-                    self.board = response
-                    print(f"{response} detected at {port} with baudrate {baudrate}")
-                    self.num_channels = self.supported_boards[self.board]["Num_channels"]
-                    sampling_rate = self.supported_boards[self.board]["sampling_rate"]
-                    self.packet_length = (2 * self.num_channels) + self.HEADER_LENGTH + 1    # Calculate expected packet length: 2 bytes per channel + header + end byte
-                    self.data = np.zeros((self.num_channels, 2000))    # Initialize data buffer with 2000 samples per channel
-                    return True
+                    return ser, response
 
                 retry_counter += 1
 
             # Connection failed after retries
-            self.ser.close()
+            ser.close()
         except Exception as e:
             print(f"Connection Error: {e}")
-        return False
+            if ser is not None and ser.is_open:
+                ser.close()
+        return None
+
+    def configure_board(self, ser, board):
+        """
+        Adopt an identified serial connection and configure parameters based on the detected board. When the same board comes back after a reconnect its statistics are kept and restarted, so the session totals keep counting.
+        Args:
+            ser (serial.Serial): Open serial connection to the board
+            board (str): Board name from supported_boards
+        """
+        reconnected = self.stats is not None and board == self.board
+        self.ser = ser
+        self.board = board
+        self.num_channels = self.supported_boards[self.board]["Num_channels"]
+        sampling_rate = self.supported_boards[self.board]["sampling_rate"]
+        self.packet_length = (2 * self.num_channels) + self.HEADER_LENGTH + 1    # Calculate expected packet length: 2 bytes per channel + header + end byte
+        self.packet_dtype = self.make_packet_dtype(self.num_channels)             # Packet layout used by the batch decoder
+        if reconnected:
+            self.stats.restart()                                                  # The counter of a reconnected board says nothing about the outage
+        else:
+            self.stats = StreamStats(sampling_rate)                               # Counter based loss and drift accounting
+        self.data = RingBuffer(self.num_channels, 2000)    # Initialize data buffer with 2000 samples per channel
+        self.buffer.clear()
+
+    @staticmethod
+    def port_id(port):
+        """
+        Return the USB VID:PID of a port as a string.
+        Args:
+            port (serial.tools.list_ports_common.ListPortInfo): Port from comports()
+        Returns:
+            str: 'VVVV:PPPP' in hex, or None for ports without USB ids
+        """
+        if port.vid is None or port.pid is None:
+            return None
+        return f"{port.vid:04X}:{port.pid:04X}"
+
+    def load_device_cache(self):
+        """
+        Read the last successfully connected device from the cache file.
+        Returns:
+            dict: Cached port, vid_pid, baudrate and board, or None if there is no usable cache
+        """
+        try:
+            with open(self.CACHE_FILE, 'r') as f:
+                cache = json.load(f)
+            if isinstance(cache, dict) and cache.get('port') and cache.get('baudrate'):
+                return cache
+        except (OSError, ValueError):
+            pass
+        return None
+
+    def save_device_cache(self, port, vid_pid, baudrate):
+        """
+        Remember the connected device so the next detect_hardware() tries it first. Errors are ignored.
+        Args:
+            port (str): Serial port of the device
+            vid_pid (str): USB VID:PID of the port, may be None
+            baudrate (int): Baud rate the board answered on
+        """
+        try:
+            self.CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.CACHE_FILE, 'w') as f:
+                json.dump({'port': port, 'vid_pid': vid_pid, 'baudrate': baudrate, 'board': self.board}, f)
+        except OSError:
+            pass
+
+    @classmethod
+    def list_ports(cls):
+        """
+        List the serial ports to probe: the ports named in the PORTS_ENV environment variable (such as emulator pseudo-terminals) followed by everything comports() reports.
+        Returns:
+            list: serial.tools.list_ports_common.ListPortInfo objects
+        """
+        ports = list(serial.tools.list_ports.comports())
+        extra = [ListPortInfo(device, skip_link_detection=True) for device in os.environ.get(cls.PORTS_ENV, "").split(os.pathsep) if device]
+        return extra + [p for p in ports if all(p.device != e.device for e in extra)]
 
-    def detect_hardware(self, timeout=1):
+    def detect_hardware(self, timeout=1, max_workers=4, board=None):
         """
-        Automatically detect and connect to supported hardware.        
-        Scans available serial ports and tries common baud rates to find a supported CHORDS USB device.
+        Automatically detect and connect to supported hardware.
+        The last successfully connected device (from the cache file) is tried first. Otherwise all available serial ports are probed in parallel on a bounded thread pool, each port trying the common baud rates one after the other, and the first board that identifies itself wins.
         Args:
             timeout (float, optional): Serial timeout in seconds. Defaults to 1.
+            max_workers (int, optional): Maximum number of ports probed at the same time. Defaults to 4.
+            board (str, optional): Only accept this board, e.g. the one that was streaming before a reconnect. Other boards are released and neither adopted nor cached.
         Returns:
             bool: True if hardware was detected and connected, False otherwise
         """
-        baudrates = [230400, 115200]                # Common baud rates to try with
-        ports = serial.tools.list_ports.comports()  # Get list of available serial ports
+        ports = self.list_ports()                   # Get list of available serial ports
+        cache = self.load_device_cache()
+
+        def accept(result):
+            if result and board and result[1] != board:
+                print(f"Found {result[1]} instead of {board}, skipping it")
+                result[0].close()
+                return None
+            return result
 
-        # Try all ports and baud rates
-        for port in ports:
-            for baud in baudrates:
-                print(f"Trying {port.device} at {baud}...")
-                if self.connect_hardware(port.device, baud, timeout):
+        if cache:
+            # The device may come back under a different name, so also match it by VID:PID
+            candidates = [p for p in ports if p.device == cache['port']]
+            candidates += [p for p in ports if cache.get('vid_pid') and self.port_id(p) == cache['vid_pid'] and p not in candidates]
+            for port in candidates:
+                print(f"Trying last used device {port.device} at {cache['baudrate']}...")
+                result = accept(self.probe_port(port.device, cache['baudrate'], timeout))
+                if result:
+                    self.configure_board(*result)
+                    print(f"{self.board} detected at {port.device} with baudrate {cache['baudrate']}")
+                    self.save_device_cache(port.device, self.port_id(port), cache['baudrate'])
                     return True
+            ports = [p for p in ports if p not in candidates]
+
+        if ports:
+            found = threading.Event()
+
+            def probe(port):
+                for baud in self.BAUDRATES:
+                    if found.is_set():
+                        return None
+                    print(f"Trying {port.device} at {baud}...")
+                    result = accept(self.probe_port(port.device, baud, timeout, cancel_event=found))
+                    if result:
+                        return port, baud, result
+                return None
+
+            def release(future):
+                outcome = future.result()
+                if outcome:
+                    outcome[2][0].close()    # Another board answered after the winner, release its port
+
+            winner = None
+            pool = ThreadPoolExecutor(max_workers=min(max_workers, len(ports)))
+            pending = {pool.submit(probe, port) for port in ports}
+            for future in as_completed(pending):
+                pending.discard(future)
+                winner = future.result()
+                if winner:
+                    found.set()    # Tell the remaining probes to give up
+                    break
+            for future in pending:
+                if not future.cancel():
+                    future.add_done_callback(release)
+            pool.shutdown(wait=False)    # Do not wait for probes still blocked in a serial read
+
+            if winner:
+                port, baud, (ser, board) = winner
+                self.configure_board(ser, board)
+                print(f"{board} detected at {port.device} with baudrate {baud}")
+                self.save_device_cache(port.device, self.port_id(port), baud)
+                return True
 
         print("Unable to detect supported hardware.")
         return False
@@ -158,46 +331,119 @@ class Chords_USB:
             return response
         return None
 
+    @classmethod
+    def make_packet_dtype(cls, num_channels):
+        """
+        Build the structured numpy dtype of a single packet.
+        Args:
+            num_channels (int): Number of channels carried in each packet
+        Returns:
+            numpy.dtype: Packed dtype with sync, counter, big-endian channel and end fields
+        """
+        return np.dtype([
+            ('sync', np.uint8, (2,)),                 # SYNC_BYTE1, SYNC_BYTE2
+            ('counter', np.uint8),                    # Rolling packet counter
+            ('channels', '>u2', (num_channels,)),     # High byte first, low byte second
+            ('end', np.uint8),                        # END_BYTE
+        ])
+
+    def decode_packets(self, buffer):
+        """
+        Decode every complete and valid packet in a byte buffer in one vectorized pass.
+        Sync pairs are located with numpy, candidates are validated against END_BYTE, and each run of back-to-back packets is read with a single np.frombuffer call using the structured packet dtype.
+        Args:
+            buffer (bytes or bytearray): Raw bytes received from the serial port
+        Returns:
+            tuple: (counters, samples, consumed, rejected, resyncs) where counters is a (n_packets,) uint8 array, samples is a (n_packets, num_channels) float64 array, consumed is the number of leading bytes that can be discarded, rejected is the number of invalid sync candidates and resyncs is the number of places where bytes had to be skipped between packets
+        """
+        length = self.packet_length
+        empty = (np.empty(0, dtype=np.uint8), np.empty((0, self.num_channels)))
+        raw = np.frombuffer(buffer, dtype=np.uint8)
+        if len(raw) < 2:
+            return empty + (0, 0, 0)
+
+        # Every position where the two sync bytes appear back to back
+        candidates = np.flatnonzero((raw[:-1] == self.SYNC_BYTE1) & (raw[1:] == self.SYNC_BYTE2))
+        complete = candidates[candidates + length <= len(raw)]
+        valid_mask = raw[complete + length - 1] == self.END_BYTE
+        valid = complete[valid_mask]
+
+        # Sync bytes can show up inside a payload, keep only non-overlapping packets (greedy, like the byte-wise parser)
+        if len(valid) > 1 and np.any(np.diff(valid) < length):
+            accepted = []
+            next_free = 0
+            for position in valid.tolist():
+                if position >= next_free:
+                    accepted.append(position)
+                    next_free = position + length
+            valid = np.array(accepted, dtype=np.intp)
+
+        # Invalid candidates that are not covered by an accepted packet count as rejected
+        invalid = complete[~valid_mask]
+        if len(valid) and len(invalid):
+            owner = np.searchsorted(valid, invalid, side='right') - 1
+            inside = (owner >= 0) & (invalid < valid[np.maximum(owner, 0)] + length)
+            invalid = invalid[~inside]
+        rejected = len(invalid)
+
+        # Bytes up to the end of the last packet (and any junk before a trailing partial packet) can be dropped
+        consumed = int(valid[-1]) + length if len(valid) else 0
+        pending = candidates[(candidates >= consumed) & (candidates + length > len(raw))]
+        if len(pending):
+            consumed = int(pending[0])
+        elif raw[-1] == self.SYNC_BYTE1:
+            consumed = len(raw) - 1
+        else:
+            consumed = len(raw)
+
+        if not len(valid):
+            return empty + (consumed, rejected, int(rejected > 0))
+
+        # Read each run of contiguous packets with a single frombuffer call
+        breaks = np.flatnonzero(np.diff(valid) != length) + 1
+        runs = [(int(run[0]), len(run)) for run in np.split(valid, breaks)]
+        records = [np.frombuffer(buffer, dtype=self.packet_dtype, count=count, offset=offset) for offset, count in runs]
+        packets = records[0] if len(records) == 1 else np.concatenate(records)
+
+        counters = packets['counter'].copy()
+        samples = packets['channels'].astype(np.float64)
+        resyncs = len(runs) - 1 + int(valid[0] > 0)    # Gaps between runs, plus junk in front of the first packet
+        return counters, samples, consumed, rejected, resyncs
+
     def read_data(self):
         """
-        Read and process incoming data from the serial connection. Parses packets, validates them, and stores channel data in the data buffer.
+        Read and process incoming data from the serial connection. Decodes all complete packets in the buffer at once and stores channel data in the data buffer.
+        Returns:
+            numpy.ndarray: (n_packets, num_channels) array of the samples decoded by this call (may be empty)
         serial.SerialException raised: If serial port is disconnected or no data received
         """
         try:
             # Read available data or wait for at least 1 byte
             raw_data = self.ser.read(self.ser.in_waiting or 1)
+            self.last_read_time = local_clock()
             if raw_data == b'':
                 raise serial.SerialException("Serial port disconnected or No data received.")
             self.buffer.extend(raw_data)
 
-            # Process complete packets in the buffer
-            while len(self.buffer) >= self.packet_length:
-                sync_index = self.buffer.find(bytes([self.SYNC_BYTE1, self.SYNC_BYTE2]))   # Find synchronization bytes in buffer
-                if sync_index == -1:
-                    self.buffer.clear()    # No sync found, clear buffer
-                    continue
-
-                # Check if we have a complete packet
-                if len(self.buffer) >= sync_index + self.packet_length:
-                    packet = self.buffer[sync_index:sync_index + self.packet_length]
-                    # Validate packet structure
-                    if (packet[0] == self.SYNC_BYTE1 and packet[1] == self.SYNC_BYTE2 and packet[-1] == self.END_BYTE):
-                        channel_data = []    # Extract channel data
-
-                        for ch in range(self.num_channels):
-                            # Combine high and low bytes for each channel
-                            high_byte = packet[2 * ch + self.HEADER_LENGTH]
-                            low_byte = packet[2 * ch + self.HEADER_LENGTH + 1]
-                            value = (high_byte << 8) | low_byte
-                            channel_data.append(float(value))
-
-                        self.data = np.roll(self.data, -1, axis=1)    # Update data buffer (rolling window)
-                        self.data[:, -1] = channel_data
-                        del self.buffer[:sync_index + self.packet_length]    # Remove processed packet from buffer
-                    else:
-                        del self.buffer[:sync_index + 1]    # Invalid packet, skip the first sync byte
+            if len(self.buffer) < self.packet_length:
+                self.last_counters = self.last_counters[:0]
+                return np.empty((0, self.num_channels))
+
+            counters, samples, consumed, rejected, resyncs = self.decode_packets(self.buffer)
+            del self.buffer[:consumed]    # Remove processed packets and unusable bytes from buffer
+            self.decoded_packets += len(samples)
+            self.rejected_packets += rejected
+
+            if resyncs and self.stats.packets_received:    # Locking on to the stream the first time is not a resync
+                self.stats.record_resync(resyncs)
+            self.last_counters = self.stats.update(counters)
+
+            self.data.extend(samples)    # Update data buffer (ring buffer, O(1) per sample)
+            return samples
         except serial.SerialException:
             self.cleanup()
+            self.last_counters = self.last_counters[:0]
+            return np.empty((0, self.num_channels))
 
     def start_streaming(self):
         """
@@ -242,36 +488,29 @@ class Chords_USB:
         """
         Start the timer for packet counting and logging.
         """
-        global start_time, last_ten_minute_time, total_packet_count, cumulative_packet_count
         current_time = time.time()
         self.start_time = current_time            # Session start time
         self.last_ten_minute_time = current_time  # 10-minute interval start time
-        self.total_packet_count = 0               # Counter for packets in current second
-        self.cumulative_packet_count = 0          # Counter for all packets
+        if self.stats:
+            self.stats.reset()
 
     def log_one_second_data(self):
         """
         Log data for one second intervals and displays: Number of packets received in the last second, Number of missing samples (if any)
         """
-        global total_packet_count, samples_per_second, missing_samples
-        self.samples_per_second = total_packet_count
-        print(f"Data count for the last second: {total_packet_count} samples, "f"Missing samples: {missing_samples}")
-        self.total_packet_count = 0  # Reset for next interval
+        packets, missing = self.stats.take_interval()
+        self.samples_per_second = packets
+        print(f"Data count for the last second: {packets} samples, "f"Missing samples: {missing}")
 
     def log_ten_minute_data(self):
         """
         Log data for 10-minute intervals and displays: Total packets received, Actual sampling rate, Drift from expected rate
         """
-        global cumulative_packet_count, last_ten_minute_time, supported_boards, board
-        print(f"Total data count after 10 minutes: {self.cumulative_packet_count}")
-        sampling_rate = self.cumulative_packet_count / (10 * 60)    # Calculate actual sampling rate
-        print(f"Sampling rate: {sampling_rate:.2f} samples/second")
-        expected_sampling_rate = self.supported_boards[board]["sampling_rate"]
-        drift = ((sampling_rate - expected_sampling_rate) / expected_sampling_rate) * 3600    # Calculate drift from expected rate
+        print(f"Total data count after 10 minutes: {self.stats.packets_received}")
+        print(f"Sampling rate: {self.stats.measured_rate:.2f} samples/second")
+        drift = self.stats.drift_ppm * 3600 / 1e6    # Convert drift from ppm to seconds/hour
         print(f"Drift: {drift:.2f} seconds/hour")
-        
-        # Reset counters
-        self.cumulative_packet_count = 0
+        print(f"Missing samples: {self.stats.missing_samples}, Duplicate packets: {self.stats.duplicate_packets}, "f"Resync events: {self.stats.resync_events}")
         self.last_ten_minute_time = time.time()
 
 if __name__ == "__main__":
@@ -8,6 +8,8 @@ import time
 import sys
 import websocket
 import socket
+import numpy as np
+from chordspy.stream_stats import StreamStats
 
 class Chords_WIFI:
     """
@@ -28,6 +30,8 @@ class Chords_WIFI:
         last_data_time (float): Timestamp of last received data
         cleanup_done (bool): Flag indicating if cleanup was performed
         ws (websocket.WebSocket): WebSocket connection object
+        block_dtype (numpy.dtype): Structured dtype of one sample block
+        stats (StreamStats): Counter based loss and drift accounting
     """
     
     def __init__(self, stream_name='NPG', channels=3, sampling_rate=500, block_size=13, timeout_sec=1):
@@ -56,10 +60,20 @@ class Chords_WIFI:
         self.last_data_time = time.time()  # Track last received data
         self.cleanup_done = False
         self.ws = None
+        self.stats = StreamStats(sampling_rate)
+
+        # One block: counter byte, big-endian signed channels, then any unused bytes up to block_size
+        fields = [('counter', np.uint8), ('channels', '>i2', (channels,))]
+        if block_size > 1 + 2 * channels:
+            fields.append(('unused', np.uint8, (block_size - 1 - 2 * channels,)))
+        self.block_dtype = np.dtype(fields)
 
     def connect(self):
         """
         Establish WebSocket connection to the CHORDS device. It Attempts to resolve the hostname 'multi-emg.local' and connect to its WebSocket server.
+        Receiving then times out after timeout_sec without data, so a device that silently went away is noticed. Can be called again after cleanup() to reconnect.
+        Returns:
+            bool: True if connected, False otherwise
         """
         try:
             host_ip = socket.gethostbyname("multi-emg.local")    # Resolve hostname to IP address
@@ -67,11 +81,16 @@ class Chords_WIFI:
             # Create and connect WebSocket
             self.ws = websocket.WebSocket()
             self.ws.connect(f"ws://{host_ip}:81")
+            self.ws.settimeout(self.timeout_sec)    # recv() raises instead of waiting forever on a silent device
+            self.cleanup_done = False
+            self.last_data_time = time.time()
+            self.stats.restart()    # The counter of a reconnected device says nothing about the outage
             sys.stderr.write(f"{self.stream_name} WebSocket connected!\n")
+            return True
         except Exception as e:
             print(f"[ERROR] Could not connect to WebSocket: {e}")
             self.cleanup()
-            sys.exit(1)
+            return False
 
     def calculate_rate(self, size, elapsed_time):
         """
@@ -134,41 +153,7 @@ class Chords_WIFI:
 
                 # Process binary data
                 if isinstance(data, (bytes, list)):
-                    self.packet_size += 1
-                    # Process each block in the packet
-                    for i in range(0, len(data), self.block_size):
-                        self.sample_size += 1
-                        block = data[i:i + self.block_size]
-                        if len(block) < self.block_size:    # Skip incomplete blocks
-                            continue
-
-                        sample_number = block[0]  # Extract sample number (first byte)
-                        channel_data = []
-
-                        # Extract channel data (2 bytes per channel)
-                        for ch in range(self.channels):
-                            offset = 1 + ch * 2
-                            sample = int.from_bytes(block[offset:offset + 2], byteorder='big', signed=True)
-                            channel_data.append(sample)
-
-                        # Validate sample sequence
-                        if self.previous_sample_number == -1:
-                            self.previous_sample_number = sample_number
-                            self.previous_data = channel_data
-                        else:
-                            # Check for missing samples
-                            if sample_number - self.previous_sample_number > 1:
-                                print("\nError: Sample Lost")
-                                self.cleanup()
-                                sys.exit(1)
-                            # Check for duplicate samples
-                            elif sample_number == self.previous_sample_number:
-                                print("\nError: Duplicate Sample")
-                                self.cleanup()
-                                sys.exit(1)
-                            else:
-                                self.previous_sample_number = sample_number
-                                self.previous_data = channel_data
+                    self.process_packet(data)
 
         except KeyboardInterrupt:
             print("\nInterrupted by user")
@@ -177,6 +162,60 @@ class Chords_WIFI:
             print(f"\n[ERROR] {e}")
             self.cleanup()
 
+    def process_packet(self, data):
+        """
+        Decode and validate one binary WebSocket message made of fixed-size sample blocks.
+        Args:
+            data (bytes): Received message
+        """
+        self.packet_size += 1
+        # Process each block in the packet
+        for i in range(0, len(data), self.block_size):
+            self.sample_size += 1
+            block = data[i:i + self.block_size]
+            if len(block) < self.block_size:    # Skip incomplete blocks
+                continue
+
+            sample_number = block[0]  # Extract sample number (first byte)
+            channel_data = []
+
+            # Extract channel data (2 bytes per channel)
+            for ch in range(self.channels):
+                offset = 1 + ch * 2
+                sample = int.from_bytes(block[offset:offset + 2], byteorder='big', signed=True)
+                channel_data.append(sample)
+
+            # Validate sample sequence
+            if self.previous_sample_number == -1:
+                self.previous_sample_number = sample_number
+                self.previous_data = channel_data
+            else:
+                # Check for missing samples
+                if sample_number - self.previous_sample_number > 1:
+                    print("\nError: Sample Lost")
+                    self.cleanup()
+                    sys.exit(1)
+                # Check for duplicate samples
+                elif sample_number == self.previous_sample_number:
+                    print("\nError: Duplicate Sample")
+                    self.cleanup()
+                    sys.exit(1)
+                else:
+                    self.previous_sample_number = sample_number
+                    self.previous_data = channel_data
+
+    def decode_packet(self, data):
+        """
+        Decode all complete blocks of a binary WebSocket message in one vectorized step and account for their counters.
+        Args:
+            data (bytes): Received message
+        Returns:
+            tuple: (counters, samples) where counters are the unwrapped block counters and samples is a (n_blocks, channels) int16 array
+        """
+        blocks = np.frombuffer(data, dtype=self.block_dtype, count=len(data) // self.block_size)    # Incomplete trailing block is skipped
+        counters = self.stats.update(blocks['counter'])
+        return counters, blocks['channels'].astype(np.int16)
+
     def cleanup(self):
         """
         Clean up resources and close connections. It safely closes the WebSocket connection if it exists and ensures cleanup only happens once.
@@ -201,7 +240,8 @@ if __name__ == "__main__":
     client = None
     try:
         client = Chords_WIFI()   # Create and run WiFi client
-        client.connect()
+        if not client.connect():
+            sys.exit(1)
         client.process_data()
     except Exception as e:
         if client:
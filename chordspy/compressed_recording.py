@@ -0,0 +1,421 @@
+"""
+Lossless compressed recordings for long sessions.
+Adjacent EXG samples are strongly correlated, so each channel is replaced by its prediction residuals (first
+difference, or second order: x[i] - 2*x[i-1] + x[i-2]) before compression. Residuals are stored as int16 when they fit
+(int32 otherwise), byte-shuffled (all low bytes, then all high bytes) and compressed with zlib or lzma from the
+standard library. Samples are collected into chunks of chunk_samples; every chunk starts its prediction from zero, so
+it can be decoded on its own. A chunk is also closed at every break in the stream (a counter discontinuity or a
+timestamp gap, see BinaryWriter.run_breaks), so the first counter and timestamp of each chunk describe all its samples
+and gaps stay visible in the index. Prediction and compression run on the RecordingWriter thread.
+
+File layout (recording.zbin):
+- The binary recording header of chordspy.binary_recording, with codec, level, predictor and chunk_samples added
+- Chunks, each a CHUNK header (payload length, sample count, first device counter, first timestamp, residual
+  itemsize) followed by the compressed payload
+
+Index (recording.zidx, next to it): one INDEX_DTYPE record per chunk with its file offset, first sample, sample
+count, first counter and first timestamp, so a reader can seek to any time without decompressing the chunks before
+it. If the index is missing the reader rebuilds it by walking the chunk headers.
+Samples are kept in memory until their chunk is complete, so a crash loses at most the last chunk_samples samples.
+
+Usage:
+$ python -m chordspy.compressed_recording ChordsPy_20250101_120000.zbin
+$ python -m chordspy.compressed_recording ChordsPy_20250101_120000.zbin --to-bin
+"""
+
+# Importing necessary libraries
+import os
+import json
+import zlib
+import lzma
+import struct
+import argparse
+from collections import OrderedDict
+import numpy as np
+from chordspy import binary_recording
+from chordspy.binary_recording import BinaryWriter, BinaryRecording, pack_header, read_header, index_filename, write_csv
+
+CODECS = ('zlib', 'lzma')
+PREDICTORS = ('none', 'delta', 'order2')
+CHUNK = struct.Struct('<IIqdB')    # Payload length, sample count, first counter, first timestamp, residual itemsize
+INDEX_DTYPE = np.dtype([('offset', '<u8'), ('sample', '<u8'), ('count', '<u4'), ('counter', '<i8'), ('timestamp', '<f8')])
+INDEX_EXTENSION = '.zidx'
+
+def predict(samples, predictor):
+    """
+    Replace every channel by its prediction residuals.
+    Args:
+        samples (numpy.ndarray): (n, channels) integer samples
+        predictor (str): One of PREDICTORS
+    Returns:
+        numpy.ndarray: (n, channels) int64 residuals
+    """
+    samples = samples.astype(np.int64)
+    if predictor == 'delta':
+        return np.diff(samples, axis=0, prepend=0)
+    if predictor == 'order2':
+        return np.diff(samples, n=2, axis=0, prepend=np.zeros((2, samples.shape[1]), dtype=np.int64))
+    return samples
+
+def reconstruct(residuals, predictor):
+    """
+    Invert predict().
+    Args:
+        residuals (numpy.ndarray): (n, channels) residuals
+        predictor (str): One of PREDICTORS
+    Returns:
+        numpy.ndarray: (n, channels) int64 samples
+    """
+    residuals = residuals.astype(np.int64)
+    if predictor == 'delta':
+        return np.cumsum(residuals, axis=0)
+    if predictor == 'order2':
+        return np.cumsum(np.cumsum(residuals, axis=0), axis=0)
+    return residuals
+
+def encode_chunk(samples, predictor='order2', codec='zlib', level=6):
+    """
+    Predict, shuffle and compress one chunk.
+    Args:
+        samples (numpy.ndarray): (n, channels) integer samples
+        predictor (str, optional): One of PREDICTORS. Defaults to 'order2'.
+        codec (str, optional): One of CODECS. Defaults to 'zlib'.
+        level (int, optional): Compression level (zlib) or preset (lzma). Defaults to 6.
+    Returns:
+        tuple: (compressed payload bytes, residual itemsize)
+    """
+    residuals = predict(samples, predictor)
+    fits = residuals.size == 0 or (residuals.min() >= -32768 and residuals.max() <= 32767)
+    residuals = residuals.astype('<i2' if fits else '<i4')
+    shuffled = residuals.reshape(-1).view(np.uint8).reshape(-1, residuals.itemsize).T.tobytes()
+    payload = zlib.compress(shuffled, level) if codec == 'zlib' else lzma.compress(shuffled, preset=level)
+    return payload, residuals.itemsize
+
+def decode_chunk(payload, count, channels, itemsize, predictor='order2', codec='zlib'):
+    """
+    Invert encode_chunk().
+    Args:
+        payload (bytes): Compressed chunk
+        count (int): Samples in the chunk
+        channels (int): Channels per sample
+        itemsize (int): Residual itemsize, 2 or 4
+        predictor (str, optional): Predictor used by encode_chunk. Defaults to 'order2'.
+        codec (str, optional): Codec used by encode_chunk. Defaults to 'zlib'.
+    Returns:
+        numpy.ndarray: (count, channels) int64 samples
+    """
+    shuffled = zlib.decompress(payload) if codec == 'zlib' else lzma.decompress(payload)
+    raw = np.frombuffer(shuffled, dtype=np.uint8).reshape(itemsize, -1).T.copy()
+    residuals = raw.view('<i2' if itemsize == 2 else '<i4').reshape(count, channels)
+    return reconstruct(residuals, predictor)
+
+class CompressedWriter(BinaryWriter):
+    """
+    Writes sample blocks to a compressed recording on a background thread.
+    Attributes:
+        codec (str): 'zlib' or 'lzma'
+        level (int): Compression level or preset
+        predictor (str): 'none', 'delta' or 'order2'
+        chunk_samples (int): Samples per independently decodable chunk
+        chunks_written (int): Chunks written so far
+        raw_bytes (int): Size the written samples would have in an uncompressed binary recording
+    """
+    def __init__(self, filename, num_channels, sampling_rate=500, board=None, resolution=12, codec='zlib', level=6, predictor='order2', chunk_samples=5000, dtype='<i2', **options):
+        """
+        Initialize the writer. The files are opened by start().
+        Args:
+            filename (str): Path of the .zbin file
+            num_channels (int): Channels per sample
+            sampling_rate (float, optional): Nominal sampling rate in Hz. Defaults to 500.
+            board (str, optional): Board name stored in the header
+            resolution (int, optional): ADC resolution in bits. Defaults to 12.
+            codec (str, optional): One of CODECS. Defaults to 'zlib'.
+            level (int, optional): zlib level or lzma preset. Defaults to 6.
+            predictor (str, optional): One of PREDICTORS. Defaults to 'order2'.
+            chunk_samples (int, optional): Samples per chunk. Defaults to 5000 (10 s at 500 Hz).
+            dtype (str, optional): Integer type the samples are decoded to, see binary_recording.code_dtype. Defaults to '<i2'.
+            **options: max_samples, flush_interval and fsync, see RecordingWriter
+        """
+        if codec not in CODECS:
+            raise ValueError(f"Unknown codec: {codec}")
+        if predictor not in PREDICTORS:
+            raise ValueError(f"Unknown predictor: {predictor}")
+        if np.dtype(dtype).kind not in 'iu':
+            raise ValueError(f"Compressed recordings store integer samples, not {dtype}")
+        super().__init__(filename, num_channels, sampling_rate, board, resolution, dtype, **options)
+        self.codec = codec
+        self.level = level
+        self.predictor = predictor
+        self.chunk_samples = chunk_samples
+        self.chunks_written = 0
+        self.raw_bytes = 0
+        self._pending = []          # (samples, counters, timestamps) parts of the chunk being collected
+        self._pending_count = 0
+        self._offset = 0            # File position of the next chunk
+        self._chunk_start = 0       # Position of the first sample of the next chunk
+
+    def header(self):
+        """
+        Build the JSON header of the recording.
+        Returns:
+            dict: Recording metadata, including the compression settings
+        """
+        header = super().header()
+        header.update({'codec': self.codec, 'level': self.level, 'predictor': self.predictor, 'chunk_samples': self.chunk_samples})
+        return header
+
+    def open_files(self):
+        """Create the recording and its chunk index and write the header."""
+        header = pack_header(self.header())
+        data = open(self.filename, 'wb')
+        data.write(header)
+        self._offset = len(header)
+        self.files.append(data)
+        self.files.append(open(index_filename(self.filename, INDEX_EXTENSION), 'wb'))
+
+    def write_blocks(self, blocks):
+        """
+        Collect blocks and write every chunk that is complete, closing the current chunk at every break in the stream.
+        Returns:
+            int: Compressed bytes written
+        """
+        written = 0
+        for block in blocks:
+            counters, times, breaks, _ = self.run_breaks(block, self._chunk_start + self._pending_count)
+            edges = [i for i in breaks if i] + [len(counters)]
+            start = 0
+            for end in edges:
+                if start in breaks and self._pending_count:
+                    written += self.write_chunk(self._pending_count)    # The chunk so far ends before the break
+                if end > start:
+                    self._pending.append((block.samples[start:end], counters[start:end], times[start:end]))
+                    self._pending_count += end - start
+                while self._pending_count >= self.chunk_samples:
+                    written += self.write_chunk(self.chunk_samples)
+                start = end
+        return written
+
+    def write_chunk(self, count):
+        """
+        Encode and write the first count pending samples as one chunk.
+        Args:
+            count (int): Samples in the chunk
+        Returns:
+            int: Bytes written
+        """
+        samples = np.concatenate([part[0] for part in self._pending])
+        counters = np.concatenate([part[1] for part in self._pending])
+        times = np.concatenate([part[2] for part in self._pending])
+        counter = int(counters[0])
+        timestamp = float(times[0])
+
+        # Keep the samples that do not fit for the next chunk, with their own counters and timestamps
+        self._pending = [(samples[count:], counters[count:], times[count:])] if len(samples) > count else []
+        self._pending_count = len(samples) - count
+
+        payload, itemsize = encode_chunk(samples[:count], self.predictor, self.codec, self.level)
+        header = CHUNK.pack(len(payload), count, counter, timestamp, itemsize)
+        index = np.array([(self._offset, self._chunk_start, count, counter, timestamp)], dtype=INDEX_DTYPE)
+        self.files[0].write(header + payload)
+        self.files[1].write(index.tobytes())
+        self._offset += len(header) + len(payload)
+        self._chunk_start += count
+        self.chunks_written += 1
+        self.raw_bytes += count * self.num_channels * self.dtype.itemsize
+        return len(header) + len(payload)
+
+    def close_files(self):
+        """Write the last, partial chunk, then close the files."""
+        if self._pending_count and not self.error:
+            self.bytes_written += self.write_chunk(self._pending_count)
+            self._flush()
+        super().close_files()
+
+    def stats(self):
+        """
+        Snapshot of the writer counters.
+        Returns:
+            dict: RecordingWriter statistics plus chunks written and the compression ratio so far
+        """
+        stats = super().stats()
+        stats['chunks_written'] = self.chunks_written
+        stats['compression_ratio'] = self.raw_bytes / self.bytes_written if self.bytes_written else 0.0
+        return stats
+
+def scan_chunks(f, offset):
+    """
+    Rebuild the chunk index of a recording by walking its chunk headers.
+    Args:
+        f (file): Recording opened in binary mode
+        offset (int): Position of the first chunk
+    Returns:
+        numpy.ndarray: INDEX_DTYPE records of every complete chunk
+    """
+    size = f.seek(0, os.SEEK_END)
+    records = []
+    position, sample = offset, 0
+    while position + CHUNK.size <= size:
+        f.seek(position)
+        length, count, counter, timestamp, _ = CHUNK.unpack(f.read(CHUNK.size))
+        if position + CHUNK.size + length > size:    # Chunk cut short by a crash
+            break
+        records.append((position, sample, count, counter, timestamp))
+        position += CHUNK.size + length
+        sample += count
+    return np.array(records, dtype=INDEX_DTYPE)
+
+class CompressedRecording(BinaryRecording):
+    """
+    Read-only view of a compressed recording. Only the chunks that overlap a requested range are decompressed.
+    Attributes:
+        filename (str): Path of the .zbin file
+        header (dict): Recording metadata, including the compression settings
+        num_channels (int): Channels per sample
+        sampling_rate (float): Nominal sampling rate in Hz
+        index (numpy.ndarray): INDEX_DTYPE records, one per chunk
+        cache_chunks (int): Decoded chunks kept in memory for repeated reads
+    """
+    def __init__(self, filename, cache_chunks=4):
+        """
+        Open a recording. Only the header and the chunk index are read.
+        Args:
+            filename (str): Path of the .zbin file
+            cache_chunks (int, optional): Decoded chunks kept in memory. Defaults to 4.
+        """
+        self.filename = filename
+        self.cache_chunks = cache_chunks
+        self._cache = OrderedDict()
+        self._file = open(filename, 'rb')
+        self.header, offset = read_header(self._file)
+        if 'codec' not in self.header:
+            raise ValueError("Not a compressed recording, open it with chordspy.binary_recording.BinaryRecording")
+        self.num_channels = self.header['channels']
+        self.sampling_rate = self.header['sampling_rate']
+        self.dtype = np.dtype(self.header['dtype'])
+
+        path = index_filename(filename, INDEX_EXTENSION)
+        index = np.fromfile(path, dtype=INDEX_DTYPE) if os.path.exists(path) else scan_chunks(self._file, offset)
+        if len(index):
+            # Drop a last chunk whose payload did not make it to disk
+            self._file.seek(int(index['offset'][-1]))
+            length = CHUNK.unpack(self._file.read(CHUNK.size))[0]
+            if index['offset'][-1] + CHUNK.size + length > os.path.getsize(filename):
+                index = index[:-1]
+        self.set_index(index)
+        self._length = int(index['sample'][-1] + index['count'][-1]) if len(index) else 0
+
+    def __len__(self):
+        return self._length
+
+    def record_periods(self, index):
+        """
+        Seconds per sample in each chunk. A chunk never spans a break, so its samples follow its first one: at the rate measured up to the next chunk when the counters continue into it, at the nominal rate otherwise (before a gap, or in a decimated run).
+        Args:
+            index (numpy.ndarray): Chunk index records with timestamps
+        Returns:
+            numpy.ndarray: float64 period of every chunk
+        """
+        periods = np.full(len(index), 1.0 / self.sampling_rate)
+        if len(index) > 1:
+            samples = np.diff(index['sample'].astype(np.int64))
+            continuous = (index['counter'][:-1] >= 0) & (np.diff(index['counter']) == samples)
+            periods[:-1][continuous] = np.diff(self._times)[continuous] / samples[continuous]
+            if continuous[-1]:
+                periods[-1] = periods[-2]
+        return periods
+
+    def close(self):
+        """Close the recording file."""
+        self._file.close()
+
+    def chunk(self, number):
+        """
+        Decode one chunk, using the cache.
+        Args:
+            number (int): Chunk number
+        Returns:
+            numpy.ndarray: (count, num_channels) samples of the chunk
+        """
+        if number in self._cache:
+            self._cache.move_to_end(number)
+            return self._cache[number]
+        self._file.seek(int(self.index['offset'][number]))
+        length, count, _, _, itemsize = CHUNK.unpack(self._file.read(CHUNK.size))
+        samples = decode_chunk(self._file.read(length), count, self.num_channels, itemsize, self.header['predictor'], self.header['codec'])
+        samples = samples.astype(self.dtype)
+        self._cache[number] = samples
+        if len(self._cache) > self.cache_chunks:
+            self._cache.popitem(last=False)
+        return samples
+
+    def read(self, start=0, stop=None):
+        """
+        Samples by position. Only the chunks overlapping the range are decompressed.
+        Args:
+            start (int, optional): First sample index. Defaults to 0.
+            stop (int, optional): Sample index after the last one. Defaults to the end.
+        Returns:
+            numpy.ndarray: (n, num_channels) samples
+        """
+        start, stop, _ = slice(start, stop).indices(len(self))
+        if stop <= start:
+            return np.empty((0, self.num_channels), dtype=self.dtype)
+        first = np.searchsorted(self.index['sample'], start, side='right') - 1
+        last = np.searchsorted(self.index['sample'], stop - 1, side='right') - 1
+        samples = np.concatenate([self.chunk(i) for i in range(first, last + 1)])
+        base = int(self.index['sample'][first])
+        return samples[start - base:stop - base]
+
+def convert_to_binary(filename, bin_filename=None):
+    """
+    Decompress a recording into the memory-mappable binary format.
+    Args:
+        filename (str): Path of the .zbin file
+        bin_filename (str, optional): Output path. Defaults to the same name with the .bin extension.
+    Returns:
+        str: Path of the binary recording
+    """
+    recording = CompressedRecording(filename, cache_chunks=1)
+    bin_filename = bin_filename or os.path.splitext(filename)[0] + '.bin'
+    header = {k: v for k, v in recording.header.items() if k not in ('codec', 'level', 'predictor', 'chunk_samples')}
+    # A binary index is interpolated between consecutive records, so every chunk also gets a record for its last sample
+    chunks = recording.index
+    last = chunks['sample'] + chunks['count'].astype(np.uint64) - 1
+    index = np.zeros(2 * len(chunks), dtype=binary_recording.INDEX_DTYPE)
+    index['sample'][0::2], index['sample'][1::2] = chunks['sample'], last
+    index['counter'][0::2] = chunks['counter']
+    index['counter'][1::2] = np.where(chunks['counter'] >= 0, chunks['counter'] + chunks['count'] - 1, -1)
+    index['timestamp'][0::2] = chunks['timestamp']
+    index['timestamp'][1::2] = np.nan if np.isnan(chunks['timestamp']).any() else [recording.timestamps(int(p), int(p) + 1)[0] for p in last]
+    index = index[np.concatenate(([True], np.diff(index['sample'].astype(np.int64)) > 0))] if len(index) else index    # One-sample chunks
+    with open(bin_filename, 'wb') as f:
+        f.write(pack_header(header))
+        for number in range(len(recording.index)):
+            f.write(recording.chunk(number).astype(recording.dtype.newbyteorder('<')).tobytes())
+    index.tofile(index_filename(bin_filename))
+    recording.close()
+    return bin_filename
+
+def main():
+    """
+    Command line entry point: show a compressed recording's header and optionally convert it.
+    """
+    parser = argparse.ArgumentParser(description='Inspect or convert a ChordsPy compressed recording')
+    parser.add_argument('filename', help='Path of the .zbin recording')
+    parser.add_argument('--to-bin', nargs='?', const='', metavar='BIN', help='Decompress to a binary recording (default: same name with .bin)')
+    parser.add_argument('--to-csv', nargs='?', const='', metavar='CSV', help='Convert to CSV (default: same name with .csv)')
+    args = parser.parse_args()
+
+    recording = CompressedRecording(args.filename)
+    print(json.dumps(recording.header, indent=2))
+    stored = os.path.getsize(args.filename)
+    print(f"{len(recording)} samples, {recording.duration:.1f} s, {len(recording.index)} chunks, "
+          f"{len(recording) * recording.num_channels * recording.dtype.itemsize / max(stored, 1):.2f}x smaller than raw {recording.dtype.name}")
+    if args.to_bin is not None:
+        print(f"Binary recording written to {convert_to_binary(args.filename, args.to_bin or None)}")
+    if args.to_csv is not None:
+        print(f"CSV written to {write_csv(recording, args.to_csv or os.path.splitext(args.filename)[0] + '.csv')}")
+    recording.close()
+
+if __name__ == "__main__":
+    main()
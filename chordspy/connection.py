@@ -20,13 +20,24 @@ Typical Usage:
 # Importing necessary libraries
 from chordspy.chords_serial import Chords_USB    # USB protocol handler
 from chordspy.chords_wifi import Chords_WIFI     # WiFi protocol handler
-from chordspy.chords_ble import Chords_BLE       # BLE protocol handler
+from chordspy.sample_queue import SampleQueue, SampleBlock    # Bounded queue between readers and outputs
+from chordspy.sample_clock import SampleClock    # Counter-derived timestamps with drift correction
+from chordspy.csv_writer import CsvWriter        # Background batched CSV recording
+from chordspy.binary_recording import BinaryWriter, code_dtype    # Compact binary recording
+from chordspy.compressed_recording import CompressedWriter    # Compressed binary recording
+from chordspy.edf_writer import EdfWriter        # EDF+/BDF+ recording
+from chordspy.segmented_recording import SegmentedWriter    # Recordings rotated into segments
+from chordspy.sinks import SinkBus, LslSink       # Fan-out of sample blocks to LSL, recordings and other sinks
+from chordspy.shared_ring import SharedRingSink   # Shared-memory ring read by local apps
+from chordspy.metrics import REGISTRY, INTERVAL_BUCKETS    # Metrics served at /metrics
+from chordspy.latency import LatencyProbe, ReferenceConsumer    # Latency measurement mode
+from chordspy.reconnect import Backoff           # Delays between reconnect attempts
 import argparse                                  # For command-line argument parsing
 import time                                      # For timing operations and timestamps
 import asyncio                                   # For asynchronous BLE operations
-import csv                                       # For CSV file recording
 from datetime import datetime                    # For timestamp generation
 import threading                                 # For multi-threaded operations
+import concurrent.futures                        # For waiting on the BLE device sessions
 from collections import deque                    # For efficient rate calculation
 from pylsl import StreamInfo, StreamOutlet       # LSL streaming components
 from pylsl import StreamInlet, resolve_stream    # LSL stream resolution
@@ -46,15 +57,18 @@ class Connection:
     and manages their lifecycle. It implements thread-safe operations for concurrent
     data handling and provides clean shutdown procedures.
     """
-    def __init__(self):
+    def __init__(self, metrics=True):
         """
         Initialize the connection manager with default values.
+        Args:
+            metrics (bool, optional): Serve this connection's counters at /metrics. Defaults to True; the per-device connections of connect_ble_devices are reported by their parent instead.
         """
         # Protocol Connection Handlers
         self.ble_connection = None                 # BLE protocol handler
         self.wifi_connection = None                # WiFi protocol handler
         self.usb_connection = None                 # USB protocol handler
         self.lsl_connection = None                 # LSL stream outlet (created when streaming starts)
+        self.lsl_enabled = True                    # Publish the stream on LSL; False still feeds the recording and the other sinks
         
         # LSL Stream Configuration
         self.stream_name = "BioAmpDataStream"      # Default LSL stream name
@@ -62,16 +76,27 @@ class Connection:
         self.stream_format = "float32"             # Data format for LSL samples
         self.stream_id = "UDL"                     # Unique stream identifier
         self.resolution = 12                       # Resolution bit for stream
+        self.lsl_chunk_size = 0                    # StreamOutlet chunk_size (0 = push every chunk through as it comes)
+        self.lsl_max_buffered = 360                # StreamOutlet max_buffered, seconds of data kept for slow consumers
+        self.sample_clock = None                   # Maps device counters to LSL timestamps (created with the stream)
+        self.lsl_queue_size = 5000                 # Capacity of the LSL sink queue in samples
+        self.lsl_policy = None                     # Overflow policy of the LSL sink queue, None follows overload_policy
+        self.sinks = SinkBus()                     # Outputs receiving every delivered block: 'lsl', 'recording', ...
+        self.shared_ring_name = 'chordspy'         # Shared memory name of the ring read by local apps (None disables it)
+        self.shared_ring_seconds = 10              # Seconds of samples kept in the shared ring
+        self.latency_probe = None                  # LatencyProbe stamping every chunk from read to LSL push (latency measurement mode)
         
         # Data Tracking Systems
         self.last_sample = None                    # Stores the most recent sample received
         self.samples_received = 0                  # Total count of samples received
         self.start_time = time.time()              # Timestamp when connection was established
         
-        # CSV Recording Systems
-        self.csv_file = None                       # File handle for CSV output
-        self.csv_writer = None                     # CSV writer object
-        self.sample_counter = 0                    # Count of samples written to CSV
+        # Recording Systems
+        self.recorder = None                       # Background writer of the active recording (CsvWriter, BinaryWriter, CompressedWriter or EdfWriter)
+        self.recording_format = 'csv'              # Format of the active or last recording: 'csv', 'bin', 'zbin', 'edf' or 'bdf'
+        self.sample_counter = 0                    # Count of samples sent to the recording
+        self.board = None                          # Board name stored in binary recordings
+        self.recording_channels = None             # Record only the first N channels, None records all of them
 
         # Stream Parameters
         self.num_channels = 0                      # Number of data channels
@@ -82,18 +107,60 @@ class Connection:
         self.recording_active = False              # True when CSV recording is active
         
         # Thread Management
-        self.usb_thread = None                     # Thread for USB data handling
-        self.ble_thread = None                     # Thread for BLE data handling
-        self.wifi_thread = None                    # Thread for WiFi data handling
+        self.usb_thread = None                     # Thread for USB data handling (LSL/CSV consumer)
+        self.usb_reader_thread = None              # Thread for USB serial reads and packet decoding
+        self.sample_queue = None                   # Bounded queue of decoded sample blocks between reader and consumer
+        self.queue_size = 5000                     # Capacity of the sample queue in samples
+        self.overload_policy = 'drop-oldest'       # What happens when the outputs fall behind: 'block', 'drop-oldest', 'drop-newest' or 'decimate'
+        self.block_timeout = 0.5                   # Longest wait for room under 'block', at the sample queue (BLE callbacks never wait) and at each sink's queue, then the oldest samples are dropped
+        self.overload_reported = 0                 # Policy actions already reported on the console
+        self.ble_thread = None                     # Thread for BLE data handling (LSL/CSV consumer)
+        self.wifi_thread = None                    # Thread for WiFi data handling (LSL/CSV consumer)
+        self.wifi_reader_thread = None             # Thread for WiFi websocket reads and packet decoding
         self.running = False                       # Main system running flag
+
+        # Reconnection (the LSL outlet, the recording and every sink stay alive while the device is away)
+        self.auto_reconnect = True                 # Reconnect a lost device with exponential backoff instead of ending the session
+        self.reconnect_initial = 0.5               # Seconds before the first reconnect attempt
+        self.reconnect_max = 5.0                   # Largest delay between attempts, bounds the time to resume once the device is back
+        self.reconnects = 0                        # Outages bridged by a reconnection
+        self.gaps = []                             # Bridged outages: dicts with transport, start, end, seconds and missing_samples
+        self.disconnected_transport = None         # Transport that went away and is being reconnected, None while streaming
+        self.counter_offset = 0                    # Added to the transport's counters so that they keep counting across reconnects
+        self.last_block_counter = None             # Counter of the newest queued sample, after the offset
+        self.last_block_time = None                # local_clock() arrival time of the newest queued block
         
         # Rate Monitoring Systems
         self.sample_count = 0                      # Samples received in current interval
         self.rate_window = deque(maxlen=10)        # Window for rate calculation
         self.last_timestamp = time.perf_counter()  # Last rate calculation time
         self.rate_update_interval = 0.5            # Seconds between rate updates
+        self.show_rate = True                      # Print the sample rate line on the console
         self.ble_samples_received = 0              # Count of BLE-specific samples
 
+        # Multi-device BLE (connect_ble_devices)
+        self.ble_devices = {}                      # Address -> Connection of each device, with its own decode state, queue, timestamps and sinks
+        self.ble_sessions = {}                     # Address -> future of the device's connect/reconnect coroutine
+        self.ble_loop = None                       # BleLoop running every device on one event loop thread
+        self.ble_merger = None                     # BleMerger feeding this connection's stream in merged mode
+        self.ble_scanner = None                    # Running BleScanner: device selection lists its cache, connections reuse its resolved devices and pause it while connecting
+
+        # Metrics (hot path histograms and counters, everything else is read by collect_metrics at scrape time)
+        transports = ('usb', 'ble', 'wifi')
+        decode = REGISTRY.histogram('chordspy_decode_seconds', 'Time to read and decode one chunk of packets', ['transport'])
+        interarrival = REGISTRY.histogram('chordspy_block_interarrival_seconds', 'Time between the arrival of consecutive sample blocks', ['transport'], INTERVAL_BUCKETS)
+        jitter = REGISTRY.histogram('chordspy_arrival_jitter_seconds', 'Distance between the arrival of a block and the counter-derived timestamp of its newest sample', ['transport'], INTERVAL_BUCKETS)
+        delivered = REGISTRY.counter('chordspy_samples_delivered_total', 'Samples stamped and published to the sinks', ['transport'])
+        delivery_errors = REGISTRY.counter('chordspy_delivery_errors_total', 'Blocks dropped by the consumer stage because stamping or publishing them raised', ['transport'])
+        self.decode_seconds = {t: decode.labels(transport=t) for t in transports}
+        self.interarrival_seconds = interarrival    # Families, labelled per transport by deliver_samples
+        self.arrival_jitter_seconds = jitter
+        self.samples_delivered = delivered
+        self.delivery_errors = delivery_errors
+        self.delivery_error = None                 # Message of the last block the consumer stage had to drop, None while healthy
+        if metrics:
+            REGISTRY.add_collector('connection', self.collect_metrics)
+
     async def get_ble_device(self):
         """
         Scan for and select a BLE device interactively.
@@ -101,7 +168,8 @@ class Connection:
         Returns:
             Device: The selected BLE device object or None if no devices found, invalid selection, user cancellation.
         """
-        devices = await Chords_BLE.scan_devices()    # Scan for available BLE devices
+        from chordspy.chords_ble import Chords_BLE    # bleak is only loaded when BLE is used
+        devices = await Chords_BLE.scan_devices(self.ble_scanner)    # Scan for available BLE devices
         
         # Handle case where no devices are found
         if not devices:
@@ -122,14 +190,21 @@ class Connection:
             print("\nCancelled.")       # Handle invalid input or user cancellation
             return None
 
-    def setup_lsl(self, num_channels, sampling_rate):
+    def setup_lsl(self, num_channels, sampling_rate, chunk_size=None, max_buffered=None):
         """
         Set up LSL (Lab Streaming Layer) stream outlet.
-        This method: creates a new LSL stream info object, initializes the LSL outlet, updates stream parameters, sets streaming state flag.
+        This method: creates a new LSL stream info object, initializes the LSL outlet and the shared-memory ring for local apps, updates stream parameters, sets streaming state flag.
         Args:
             num_channels (int): Number of data channels in stream
             sampling_rate (float): Sampling rate in Hz
+            chunk_size (int, optional): Preferred number of samples per transmitted chunk, 0 lets each pushed block through as is. Defaults to lsl_chunk_size.
+            max_buffered (int, optional): Maximum seconds of data buffered for each consumer. Defaults to lsl_max_buffered.
         """
+        if chunk_size is not None:
+            self.lsl_chunk_size = chunk_size
+        if max_buffered is not None:
+            self.lsl_max_buffered = max_buffered
+
         # Create LSL stream info with configured parameters
         info = StreamInfo(self.stream_name, self.stream_type, num_channels, sampling_rate, self.stream_format, self.stream_id)
         
@@ -139,96 +214,221 @@ class Connection:
         resolution = getattr(self, 'resolution', 12)
         resinfo.append_child_value("resolution", str(resolution))
         
-        self.lsl_connection = StreamOutlet(info)
-        print(f"LSL stream started: {num_channels} channels at {sampling_rate}Hz with {resolution}-bit resolution")
+        if self.lsl_enabled:
+            self.lsl_connection = StreamOutlet(info, self.lsl_chunk_size, self.lsl_max_buffered)
+            self.sinks.attach(LslSink(self.lsl_connection, max_samples=self.lsl_queue_size, policy=self.lsl_policy or self.overload_policy, probe=self.latency_probe))
+        if self.shared_ring_name:
+            try:
+                capacity = int(self.shared_ring_seconds * sampling_rate)
+                self.sinks.attach(SharedRingSink(num_channels, sampling_rate, capacity, self.shared_ring_name))
+            except Exception as e:
+                print(f"Shared memory ring not available: {str(e)}")
+        self.sample_clock = SampleClock(sampling_rate)
+        print(f"{'LSL stream' if self.lsl_enabled else 'Stream (LSL disabled)'} started: {num_channels} channels at {sampling_rate}Hz with {resolution}-bit resolution")
         self.stream_active = True
         self.num_channels = num_channels
         self.sampling_rate = sampling_rate
 
-    def start_csv_recording(self, filename=None):
+    def push_block(self, samples, timestamp=0.0):
         """
-        Start CSV recording session.
-        This method: Verify recording isn't already active, generates filename, opens CSV file and initializes writer, writes column headers, sets recording state flag.
+        Push a block of samples to LSL with a single push_chunk call instead of one push_sample per sample, on the caller's thread. Streaming goes through the 'lsl' sink.
+        Args:
+            samples (array-like): (n_samples, num_channels) block, oldest sample first
+            timestamp (float or numpy.ndarray, optional): Either one timestamp per sample, or the local_clock() capture time of the newest sample from which LSL derives the others at the nominal rate. Defaults to 0.0 (now).
+        """
+        if not self.lsl_connection or not len(samples):
+            return
+        chunk = np.ascontiguousarray(samples, dtype=np.float32)    # push_chunk reads a C-contiguous float32 array directly
+        if isinstance(timestamp, np.ndarray):
+            timestamp = timestamp.tolist()
+        self.lsl_connection.push_chunk(chunk, timestamp)
+
+    def sample_timestamps(self, counters, arrival_time):
+        """
+        Timestamp a block of samples from their unwrapped device counters instead of their host arrival time.
+        Args:
+            counters (array-like): Unwrapped counters of the block's samples
+            arrival_time (float): local_clock() time at which the block was received
+        Returns:
+            numpy.ndarray: One local_clock() timestamp per sample
+        """
+        if self.sample_clock is None:
+            self.sample_clock = SampleClock(self.sampling_rate or 500)
+        return self.sample_clock.timestamps(counters, arrival_time)
+
+    def create_writer(self, filename, format, **options):
+        """
+        Create the background writer of a recording format, without starting it.
+        Args:
+            filename (str): Path of the output file
+            format (str): 'csv', 'bin', 'zbin', 'edf' or 'bdf'
+            **options: Passed to the writer
+        Returns:
+            RecordingWriter: The writer
+        """
+        num_channels = self.recorded_channels()
+        if format in ('edf', 'bdf'):
+            options.setdefault('code_range', self.code_range())
+            return EdfWriter(filename, num_channels, self.sampling_rate or 500, self.board, self.resolution, bdf=format == 'bdf', **options)
+        if format == 'zbin':
+            options.setdefault('dtype', code_dtype(*self.code_range()))
+            return CompressedWriter(filename, num_channels, self.sampling_rate or 500, self.board, self.resolution, **options)
+        if format == 'bin':
+            options.setdefault('dtype', code_dtype(*self.code_range()))
+            return BinaryWriter(filename, num_channels, self.sampling_rate or 500, self.board, self.resolution, **options)
+        return CsvWriter(filename, num_channels, **options)
+
+    def code_range(self):
+        """
+        Range of the ADC codes the device sends. Every CHORDS transport carries unsigned codes of the board's resolution, the NPG BLE and WiFi devices included (their 16-bit fields are decoded as int16, but never exceed 2^resolution - 1).
+        Returns:
+            tuple: (lowest, highest) code
+        """
+        return 0, (1 << (self.resolution or 12)) - 1
+
+    def recorded_channels(self):
+        """Number of channels a new recording keeps: recording_channels if set, never more than the stream has."""
+        return min(self.recording_channels or self.num_channels, self.num_channels)
+
+    def start_recording(self, filename=None, format='csv', segment_seconds=None, segment_bytes=None, **options):
+        """
+        Start a recording session.
+        This method: Verify recording isn't already active, generates filename, starts the background writer of the requested format (which writes the file header), sets recording state flag.
         Args:
             filename (str, optional): Custom filename without extension
+            format (str, optional): 'csv' for the CSV layout, 'bin' for the binary format of chordspy.binary_recording, 'zbin' for the compressed format of chordspy.compressed_recording, 'edf' or 'bdf' for EDF+ (16-bit) or BDF+ (24-bit). Defaults to 'csv'. A merged BLE stream (connect_ble_devices) is recorded as CSV only, see BleMerger.
+            segment_seconds (float, optional): Split the recording into segments of this many seconds, see chordspy.segmented_recording
+            segment_bytes (int, optional): Split the recording into segments of about this many bytes
+            **options: Passed to the writer, e.g. codec='lzma' or predictor='delta' for 'zbin', or policy to override overload_policy for the recording
         Returns:
             bool: True if recording started successfully, False otherwise
         """
         # Check if recording is already active
         if self.recording_active:
             return False
+        if format not in ('csv', 'bin', 'zbin', 'edf', 'bdf'):
+            print(f"Unknown recording format: {format}")
+            return False
+        if self.ble_merger and format != 'csv':
+            print(f"{format.upper()} stores integer ADC codes and cannot hold the NaN of a device missing from the merged stream, record it as CSV")
+            return False
         
+        options.setdefault('policy', self.overload_policy)
         try:
             # Generate filename if not provided
+            extension = '.' + format
             if not filename:
                 timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                filename = f"ChordsPy_{timestamp}.csv"
-            elif not filename.endswith('.csv'):
-                filename += '.csv'
+                filename = f"ChordsPy_{timestamp}{extension}"
+            elif not filename.endswith(extension):
+                filename += extension
                 
-            self.csv_file = open(filename, 'w', newline='')         # Open CSV file and initialize writer
-            headers = ['Counter'] + [f'Channel{i+1}' for i in range(self.num_channels)]    # Create column headers
-            self.csv_writer = csv.writer(self.csv_file)
-            self.csv_writer.writerow(headers)
+            # Open the file, write its header and start the writer thread
+            if segment_seconds or segment_bytes:
+                queue_options = {key: options.pop(key) for key in ('max_samples', 'flush_interval', 'fsync', 'policy') if key in options}
+                def segment(path, first_sample, first_counter):
+                    numbering = {}
+                    if format == 'csv':    # CSV counters continue across segments, from the session's first device counter once known
+                        numbering = {'first_row': first_sample + 1} if first_counter is None else {'first_counter': first_counter}
+                    return self.create_writer(path, format, **numbering, **options)
+                self.recorder = SegmentedWriter(filename, self.recorded_channels(), segment, format, self.sampling_rate or 500, segment_seconds, segment_bytes, **queue_options)
+            else:
+                self.recorder = self.create_writer(filename, format, **options)
+            self.sinks.attach(self.recorder)    # Opens the files and starts the writer thread
+            self.recording_format = format
             self.recording_active = True     # Update state
             self.sample_counter = 0
-            print(f"CSV recording started: {filename}")
+            print(f"{format.upper()} recording started: {filename}")
             return True
         except Exception as e:
-            print(f"Error starting CSV recording: {str(e)}")    # Handle file operation errors
+            print(f"Error starting {format.upper()} recording: {str(e)}")    # Handle file operation errors
+            self.recorder = None
             return False
 
-    def stop_csv_recording(self):
+    def stop_recording(self):
         """
-        Stop CSV recording session.
-        This method: Validates recording is active, closes CSV file, cleans up resources, resets recording state.
+        Stop the recording session.
+        This method: Validates recording is active, waits for the writer to drain every queued sample and close its files, resets recording state.
         Returns:
-            bool: True if recording stopped successfully, False otherwise
+            bool: True if recording stopped and every sample was written, False otherwise
         """
         # Check if recording is inactive
         if not self.recording_active:
             return False
         
-        try:
-            # Close file and clean up
-            if self.csv_file:
-                self.csv_file.close()
-                self.csv_file = None
-                self.csv_writer = None
-            self.recording_active = False   # Update state
-            print("CSV recording stopped")
-            return True
-        except Exception as e:
-            print(f"Error stopping CSV recording: {str(e)}")   # Handle file closing errors
+        self.recording_active = False   # Update state first so no more samples are queued
+        writer, self.recorder = self.recorder, None
+        if writer and self.sinks.get(writer.name) is writer:
+            self.sinks.detach(writer.name)    # Drains the writer's queue and closes its files
+        if writer and not writer.close():
+            print(f"Error stopping recording: {writer.error or 'writer did not finish'}")   # Handle file writing errors
             return False
+        print(f"{self.recording_format.upper()} recording stopped")
+        return True
 
-    def log_to_csv(self, sample_data):
+    def start_csv_recording(self, filename=None):
+        """
+        Start CSV recording session, see start_recording.
+        Args:
+            filename (str, optional): Custom filename without extension
+        Returns:
+            bool: True if recording started successfully, False otherwise
         """
-        Log a sample to CSV file.
-        This method: Validates recording is active, formats sample data, writes to CSV, handles write errors.
+        return self.start_recording(filename, 'csv')
+
+    def stop_csv_recording(self):
+        """
+        Stop the recording session, see stop_recording.
+        Returns:
+            bool: True if recording stopped and every sample was written, False otherwise
+        """
+        return self.stop_recording()
+
+    def record_block(self, samples, counters=None, timestamp=None):
+        """
+        Hand a block of samples to the background writer of the active recording.
         Args:
-            sample_data (list): List of channel values to record
+            samples (array-like): (n, num_channels) samples, or the channel values of one sample
+            counters (array-like, optional): Unwrapped device counters of the samples
+            timestamp (float, optional): local_clock() timestamp of the first sample
         """
         # Check if recording is inactive
-        if not self.recording_active or not self.csv_writer:
+        writer = self.recorder
+        if not self.recording_active or not writer:
             return
             
-        try:
-            # Format and write sample
-            self.sample_counter += 1
-            row = [self.sample_counter] + sample_data
-            self.csv_writer.writerow(row)
-        except Exception as e:
-            print(f"Error writing to CSV: {str(e)}")     # Handle write errors and stop recording
-            self.stop_csv_recording()
+        samples = np.asarray(samples)
+        if writer.write(samples, counters, timestamp):
+            self.sample_counter += 1 if samples.ndim == 1 else len(samples)
+        elif writer.error:
+            self.stop_recording()     # Handle write errors and stop recording
+
+    def log_to_csv(self, sample_data):
+        """
+        Log a sample, or a block of samples, to the active recording.
+        Args:
+            sample_data (list or numpy.ndarray): Channel values of one sample, or (n, num_channels) samples
+        """
+        self.record_block(sample_data)
 
-    def update_sample_rate(self):
+    def recording_stats(self):
+        """
+        Return the backpressure statistics of the active recording.
+        Returns:
+            dict: Writer queue depth, overflow, rows written and worst write/flush times, or an empty dict if not recording
+        """
+        writer = self.recorder
+        return writer.stats() if writer else {}
+
+    def update_sample_rate(self, count=1):
         """
         Update and display current sample rate. It calculates rate over a moving window and prints to console. It uses perf_counter() for highest timing precision.
+        Args:
+            count (int, optional): Number of samples delivered since the last call. Defaults to 1.
         """
         now = time.perf_counter()              # Get current high-resolution timestamp
         elapsed = now - self.last_timestamp    # Calculate time elapsed since last calculation
-        self.sample_count += 1                 # Increment sample counter for this interval
+        self.sample_count += count             # Increment sample counter for this interval
         
         # Only update display if we've collected enough time (default 0.5s)
         if elapsed >= self.rate_update_interval:
@@ -237,11 +437,165 @@ class Connection:
             
             # Print average rate
             avg_rate = sum(self.rate_window) / len(self.rate_window)
-            print(f"\rCurrent sampling rate: {avg_rate:.2f} Hz", end="", flush=True)   # Using \r to overwrite previous line
+            if self.show_rate:
+                print(f"\rCurrent sampling rate: {avg_rate:.2f} Hz", end="", flush=True)   # Using \r to overwrite previous line
             
             # Reset counters for next interval
             self.sample_count = 0
             self.last_timestamp = now
+            self.report_overload()
+
+    def stream_stats(self):
+        """
+        Return the packet loss and drift statistics of the active transport. It only reads plain attributes written by the acquisition thread, so it is safe to call from any thread without locks.
+        Returns:
+            dict: Received packets, missing samples, duplicates, resync events, measured rate, drift in ppm, the drift estimated by the timestamp fit and the reconnection counters, or an empty dict if no statistics are available
+        """
+        for handler in (self.usb_connection, self.ble_connection, self.wifi_connection):
+            stats = getattr(handler, 'stats', None)
+            if stats is not None:
+                report = stats.as_dict()
+                if self.sample_clock:
+                    report['clock_drift_ppm'] = self.sample_clock.drift_ppm    # Drift from the timestamp fit
+                report['reconnects'] = self.reconnects
+                report['reconnecting'] = self.disconnected_transport is not None
+                report['outage_seconds'] = sum(gap['seconds'] for gap in self.gaps)
+                report['outage_missing_samples'] = sum(gap['missing_samples'] for gap in self.gaps)
+                return report
+        return {}
+
+    def queue_stats(self):
+        """
+        Return the depth and overflow counters of the sample queue between the reader and the outputs.
+        Returns:
+            dict: SampleQueue.stats() of the active queue, or an empty dict if none is running
+        """
+        return self.sample_queue.stats() if self.sample_queue else {}
+
+    def overload_stats(self):
+        """
+        Every action taken by the overload policies: at the boundary between the transport and the outputs, and in the queue of each sink.
+        Returns:
+            dict: 'policy' and, for 'boundary' and every sink name, the policy with its dropped, rejected and decimated samples, blocked seconds and block timeouts
+        """
+        queues = {'boundary': self.sample_queue} if self.sample_queue else {}
+        queues.update((name, sink.queue) for name, sink in self.sinks.sinks.items() if hasattr(sink, 'queue'))
+        report = {'policy': self.overload_policy}
+        for name, queue in queues.items():
+            report[name] = {
+                'policy': queue.policy,
+                'dropped_samples': queue.overflow_samples,
+                'rejected_samples': queue.rejected_samples,
+                'decimated_samples': queue.decimated_samples,
+                'blocked_seconds': queue.blocked_seconds,
+                'block_timeouts': queue.block_timeouts,
+            }
+        return report
+
+    def report_overload(self):
+        """
+        Print a console notice whenever an overload policy took new actions since the last notice, so that overload is never silent.
+        """
+        report = self.overload_stats()
+        places = {name: stats for name, stats in report.items() if name != 'policy'}
+        lost = lambda stats: stats['dropped_samples'] + stats['rejected_samples'] + stats['decimated_samples']
+        actions = sum(lost(stats) + stats['block_timeouts'] for stats in places.values())
+        if actions > self.overload_reported:
+            details = ", ".join(f"{name} ({stats['policy']}): {lost(stats)} samples lost, {stats['blocked_seconds']:.1f}s blocked"
+                                for name, stats in places.items() if lost(stats) or stats['blocked_seconds'])
+            print(f"\nOverload - outputs falling behind: {details}")
+        self.overload_reported = actions
+
+    def attach_sink(self, sink):
+        """
+        Attach an output that receives every delivered block from now on, see chordspy.sinks.
+        Args:
+            sink (Sink): The sink, started by the bus. A sink with the same name is replaced.
+        Returns:
+            Sink: The attached sink
+        """
+        return self.sinks.attach(sink)
+
+    def detach_sink(self, name):
+        """
+        Detach an output after it has handled everything queued for it.
+        Args:
+            name (str): Name of the sink
+        Returns:
+            Sink: The detached sink, or None if no sink has that name
+        """
+        return self.sinks.detach(name)
+
+    def sink_stats(self):
+        """
+        Return the lag and drop counters of every attached sink.
+        Returns:
+            dict: Sink name -> queue depth (lag in samples), lag in seconds, overflow/decimation counters and errors
+        """
+        return self.sinks.stats()
+
+    def collect_metrics(self):
+        """
+        Metrics read from the transport, queue and sink counters when /metrics is scraped, see chordspy.metrics.
+        Returns:
+            list: (name, kind, help, [(labels, value), ...]) tuples
+        """
+        stream = self.stream_stats()
+        queue = self.queue_stats()
+        sinks = self.sink_stats()
+        metrics = [
+            ('chordspy_stream_active', 'gauge', 'Whether the LSL stream is running', [({}, int(self.stream_active))]),
+            ('chordspy_sample_rate_hz', 'gauge', 'Delivered samples per second, averaged over the last few seconds', [({}, np.mean(self.rate_window) if self.rate_window else 0)]),
+        ]
+        if stream:
+            metrics += [
+                ('chordspy_packets_received_total', 'counter', 'Packets accepted by the transport decoder', [({}, stream['packets_received'])]),
+                ('chordspy_missing_samples_total', 'counter', 'Samples lost, from gaps in the device counter', [({}, stream['missing_samples'])]),
+                ('chordspy_duplicate_samples_total', 'counter', 'Packets repeating the counter of their predecessor', [({}, stream['duplicate_packets'])]),
+                ('chordspy_resync_events_total', 'counter', 'Times the decoder had to re-synchronise on the byte stream', [({}, stream['resync_events'])]),
+                ('chordspy_clock_drift_ppm', 'gauge', 'Device clock drift against the host clock', [({}, stream.get('clock_drift_ppm', stream['drift_ppm']))]),
+                ('chordspy_reconnects_total', 'counter', 'Device outages bridged by reconnecting the transport', [({}, stream['reconnects'])]),
+                ('chordspy_reconnecting', 'gauge', 'Whether the transport is down and being reconnected', [({}, int(stream['reconnecting']))]),
+                ('chordspy_outage_seconds_total', 'counter', 'Time spent without a device between bridged outages', [({}, stream['outage_seconds'])]),
+            ]
+        if queue:
+            metrics += [
+                ('chordspy_samples_in_total', 'counter', 'Decoded samples queued by the transport reader', [({}, queue['samples_in'])]),
+                ('chordspy_queue_depth_samples', 'gauge', 'Samples waiting between the transport reader and the sinks', [({}, queue['depth'])]),
+                ('chordspy_queue_overflow_samples_total', 'counter', 'Samples dropped by the full transport queue', [({}, queue['overflow_samples'])]),
+                ('chordspy_queue_rejected_samples_total', 'counter', 'Incoming samples refused by the full transport queue (drop-newest)', [({}, queue['rejected_samples'])]),
+                ('chordspy_queue_decimated_samples_total', 'counter', 'Samples left out by the decimating transport queue', [({}, queue['decimated_samples'])]),
+                ('chordspy_queue_blocked_seconds_total', 'counter', 'Time the transport reader waited for room (block)', [({}, queue['blocked_seconds'])]),
+                ('chordspy_queue_block_timeouts_total', 'counter', 'Waits for room that ran out and dropped the oldest samples', [({}, queue['block_timeouts'])]),
+            ]
+        devices = {address: stats for address, stats in self.ble_device_stats().items() if address != 'merged'}
+        if devices:
+            per_device = lambda key: [({'device': address}, stats.get(key, 0)) for address, stats in devices.items()]
+            metrics += [
+                ('chordspy_ble_device_connected', 'gauge', 'Whether each BLE device of a multi-device session is connected', [({'device': a}, int(s['connected'])) for a, s in devices.items()]),
+                ('chordspy_ble_device_packets_received_total', 'counter', 'Samples accepted from each BLE device', per_device('packets_received')),
+                ('chordspy_ble_device_missing_samples_total', 'counter', 'Samples lost by each BLE device, from gaps in its counter', per_device('missing_samples')),
+                ('chordspy_ble_device_reconnects_total', 'counter', 'Outages of each BLE device bridged by reconnecting', per_device('reconnects')),
+            ]
+        if self.ble_merger:
+            merged = self.ble_merger.stats()
+            metrics += [
+                ('chordspy_ble_merge_late_samples_total', 'counter', 'Device samples that reached the merged stream after their row was published', [({}, merged['late_samples'])]),
+                ('chordspy_ble_merge_filled_samples_total', 'counter', 'Device samples published as NaN in the merged stream while the device was away', [({}, merged['filled_samples'])]),
+            ]
+        if sinks:
+            per_sink = lambda key: [({'sink': name}, stats[key]) for name, stats in sinks.items()]
+            metrics += [
+                ('chordspy_sink_samples_out_total', 'counter', 'Samples handed to each sink', per_sink('samples_out')),
+                ('chordspy_sink_queue_depth_samples', 'gauge', 'Samples waiting for each sink (lag)', per_sink('lag_samples')),
+                ('chordspy_sink_lag_seconds', 'gauge', 'Age of the last block when the sink got to it', per_sink('last_lag_seconds')),
+                ('chordspy_sink_dropped_samples_total', 'counter', 'Samples dropped by the full queue of each sink', per_sink('overflow_samples')),
+                ('chordspy_sink_rejected_samples_total', 'counter', 'Incoming samples refused by the full queue of each sink (drop-newest)', per_sink('rejected_samples')),
+                ('chordspy_sink_blocked_seconds_total', 'counter', 'Time the publisher waited for room in each sink (block)', per_sink('blocked_seconds')),
+                ('chordspy_sink_decimated_samples_total', 'counter', 'Samples left out by decimating sinks', per_sink('decimated_samples')),
+                ('chordspy_sink_errors_total', 'counter', 'Errors raised by each sink', per_sink('errors')),
+            ]
+        return metrics
 
     def lsl_rate_checker(self, duration=1.0):
         """
@@ -278,131 +632,233 @@ class Connection:
         except Exception as e:
             print(f"Error in LSL rate check: {str(e)}")
 
-    def ble_data_handler(self):
+    def deliver_samples(self, source):
         """
-        BLE-specific data handler with precise timing control.
-        The handler ensures:
-        1. Precise sample timing using local_clock()
-        2. Constant sampling rate regardless of BLE packet timing
-        3. Graceful handling of buffer overflows
-        4. Thread-safe operation with the main controller
+        Consumer stage shared by every transport. It sleeps on the sample queue until a decoded block is published, stamps it and publishes it once to the sink bus, so an idle stream costs no CPU.
+        Samples are stamped from their device counters by the drift-corrected sample clock; LSL, the active recording and any other attached sink each get the block on their own queue and thread, so a slow sink does not hold up the others.
+        A block that cannot be stamped or published is dropped and counted in chordspy_delivery_errors_total, the stage carries on with the next one.
+        Args:
+            source (str): Transport name used in error messages
         """
-        # Target specifications for the BLE stream
-        SAMPLE_INTERVAL = 1.0 / self.sampling_rate     # Time between samples in seconds
-        next_sample_time = local_clock()               # Initialize timing baseline
-        
-        # Main processing loop - runs while system is active and BLE connected
-        while self.running and self.ble_connection:
+        transport = source.lower()
+        interarrival = self.interarrival_seconds.labels(transport=transport)
+        jitter = self.arrival_jitter_seconds.labels(transport=transport)
+        delivered = self.samples_delivered.labels(transport=transport)
+        errors = self.delivery_errors.labels(transport=transport)
+        last_arrival = None
+        while True:
+            block = self.sample_queue.get(timeout=0.5)
+            if block is None:
+                if self.sample_queue.closed or not self.running:
+                    break
+                continue
             try:
-                # Check if new BLE data is available
-                if hasattr(self.ble_connection, 'data_available') and self.ble_connection.data_available:
-                    current_time = local_clock()  # Get precise current timestamp
-                    
-                    # Only process if we've reached the next scheduled sample time
-                    if current_time >= next_sample_time:
-                        sample = self.ble_connection.get_latest_sample()
-                        if sample:
-                            channel_data = sample[:self.num_channels]   # Extract channel data
-                            
-                            # Calculate precise timestamp
-                            sample_time = next_sample_time
-                            next_sample_time += SAMPLE_INTERVAL     # Schedule next sample time
-                            
-                            # If we're falling behind, skip samples to catch up
-                            if current_time > next_sample_time + SAMPLE_INTERVAL:
-                                next_sample_time = current_time + SAMPLE_INTERVAL
-                            
-                            # Stream to LSL if enabled
-                            if self.lsl_connection:
-                                self.lsl_connection.push_sample(channel_data, timestamp=sample_time)
-
-                            # Update rate display
-                            self.update_sample_rate()
-
-                            # Log to CSV if recording
-                            if self.recording_active:
-                                self.log_to_csv(channel_data)
+                timestamps = self.sample_timestamps(block.counters, block.timestamp)
+                if self.latency_probe:
+                    self.latency_probe.published(block, timestamps)    # Before the sinks, which stamp the push
+                self.sinks.publish(SampleBlock(block.samples, block.counters, timestamps[0], timestamps), self.block_timeout)
+                delivered.inc(len(block.samples))
+                if last_arrival is not None:
+                    interarrival.observe(block.timestamp - last_arrival)
+                jitter.observe(abs(block.timestamp - timestamps[-1]))
+                last_arrival = block.timestamp
+
+                if self.recording_active:
+                    self.sample_counter += len(block.samples)
+                    if self.recorder and self.recorder.error:
+                        self.stop_recording()     # Handle write errors and stop recording
+                self.update_sample_rate(len(block.samples))
             except Exception as e:
-                print(f"BLE data handler error: {str(e)}")
-                break
+                errors.inc()
+                if self.delivery_error != str(e):    # Once per distinct error, not once per block
+                    print(f"\n{source} data handler error, dropping the block: {str(e)}")
+                self.delivery_error = str(e)
 
-    def wifi_data_handler(self):
+    def queue_block(self, samples, counters, arrival_time, wait=True):
         """
-        WiFi-specific data handler with network-optimized timing.
+        Publish a decoded block to the sample queue, the boundary between the transport and the outputs, where overload_policy applies. Shared by the reader stages of every transport.
+        Counters keep counting across reconnects: the first block after an outage is placed as many samples after the last one as the device produced in the meantime, so the timestamps keep following the device clock and the outage shows up as a gap in the counters of the recording (an EDF+ 'Missing N samples' annotation, a jump in the binary index).
+        Args:
+            samples (numpy.ndarray): (n, num_channels) decoded samples
+            counters (array-like): Unwrapped counters of the samples from the transport
+            arrival_time (float): local_clock() time at which the block was read
+            wait (bool, optional): Whether the caller may wait up to block_timeout for room under the 'block' policy. Pass False from I/O callbacks. Defaults to True.
         """
-        SAMPLE_INTERVAL = 1.0 / self.sampling_rate     # Time between samples in seconds
-        next_sample_time = local_clock()               # Initialize timing baseline
-        
-        while self.running and self.wifi_connection:
+        counters = np.asarray(counters, dtype=np.int64)
+        if self.disconnected_transport and len(counters) and self.last_block_counter is not None:
+            self.bridge_gap(counters, arrival_time)
+        counters = counters + self.counter_offset
+        if len(counters):
+            self.last_block_counter = int(counters[-1])
+            self.last_block_time = arrival_time
+        self.sample_queue.put(SampleBlock(samples, counters, arrival_time), self.block_timeout if wait else 0)
+
+    def bridge_gap(self, counters, arrival_time):
+        """
+        Continue the counters of the first block after a reconnect and record the outage.
+        Args:
+            counters (numpy.ndarray): Counters of the block as reported by the reconnected transport
+            arrival_time (float): local_clock() time at which the block was read
+        """
+        elapsed = max(0.0, arrival_time - self.last_block_time)
+        produced = max(len(counters), int(round(elapsed * self.sampling_rate)))    # Samples since the newest one before the outage
+        self.counter_offset = self.last_block_counter + produced - int(counters[-1])
+        missing = produced - len(counters)
+        self.gaps.append({'transport': self.disconnected_transport, 'start': self.last_block_time, 'end': arrival_time,
+                          'seconds': elapsed, 'missing_samples': missing})
+        print(f"\n{self.disconnected_transport} resumed after {elapsed:.1f}s ({missing} samples missing)")
+        self.reconnects += 1
+        self.disconnected_transport = None
+
+    def reconnect(self, transport, connect):
+        """
+        Supervised reconnect loop: retry connect() with exponential backoff until it succeeds or the connection is cleaned up. The LSL outlet, the recording and every sink are left alone, so consumers see a gap in the stream instead of a new stream.
+        Args:
+            transport (str): Transport name used in messages
+            connect (callable): One reconnect attempt, returns True once the device streams again
+        Returns:
+            bool: True if the transport is back, False if auto_reconnect is off or cleanup() was called
+        """
+        if not (self.running and self.auto_reconnect):
+            return False
+        self.disconnected_transport = transport
+        backoff = Backoff(self.reconnect_initial, self.reconnect_max)
+        while backoff.wait(lambda: self.running):
+            print(f"\nReconnecting {transport} (attempt {backoff.attempts})...")
             try:
-                # Verify WiFi data is available
-                if hasattr(self.wifi_connection, 'data_available') and self.wifi_connection.data_available:
-                    current_time = local_clock()
-                    
-                    # Timing gate ensures precise sample rate
-                    if current_time >= next_sample_time:
-                        sample = self.wifi_connection.get_latest_sample()
-                        if sample:
-                            channel_data = sample[:self.num_channels]
-                            
-                            # Calculate precise timestamp
-                            sample_time = next_sample_time
-                            next_sample_time += SAMPLE_INTERVAL
-                            
-                            # If we're falling behind, skip samples to catch up
-                            if current_time > next_sample_time + SAMPLE_INTERVAL:
-                                next_sample_time = current_time + SAMPLE_INTERVAL
-                            
-                            if self.lsl_connection:
-                                self.lsl_connection.push_sample(channel_data, timestamp=sample_time)
-
-                            self.update_sample_rate()
-
-                            if self.recording_active:
-                                self.log_to_csv(channel_data)
+                if connect():
+                    return True
+            except Exception as e:
+                print(f"{transport} reconnect failed: {str(e)}")
+        return False
+
+    def reopen_usb(self):
+        """
+        One reconnect attempt of the USB transport: detect the board again (the last used port first) and restart streaming. Only the same board is accepted, since the layout of the LSL stream and of the recording cannot change.
+        Returns:
+            bool: True if the board streams again
+        """
+        usb = self.usb_connection
+        if usb is None:
+            return False
+        try:
+            if usb.ser and usb.ser.is_open:
+                usb.ser.close()
+        except Exception:
+            pass
+        if not usb.detect_hardware(board=self.board):    # Another board is skipped before it replaces the cached device
+            return False
+        usb.send_command('START')
+        return True
+
+    def reopen_wifi(self):
+        """
+        One reconnect attempt of the WiFi transport: close the websocket and open a new one.
+        Returns:
+            bool: True if the websocket is connected again
+        """
+        if self.wifi_connection is None:
+            return False
+        self.wifi_connection.cleanup()
+        return self.wifi_connection.connect()
+
+    def usb_reader(self):
+        """
+        USB reader stage. It owns the serial port: reads bytes, decodes every complete packet and queues the decoded blocks. It never waits on LSL or CSV output, so bursts from the board are not dropped.
+        """
+        while self.running and self.usb_connection:
+            try:
+                # Verify USB port is open and active, reconnect otherwise
+                if not (self.usb_connection.ser and self.usb_connection.ser.is_open):
+                    if self.reconnect("USB", self.reopen_usb):
+                        continue
+                    break
+                start = time.perf_counter()
+                samples = self.usb_connection.read_data()     # Read and decode all complete packets
+                if len(samples):
+                    self.decode_seconds['usb'].observe(time.perf_counter() - start)
+                    self.queue_block(samples, self.usb_connection.last_counters, self.usb_connection.last_read_time)    # Arrival = serial read, before decoding
             except Exception as e:
-                print(f"WiFi data handler error: {str(e)}")
+                print(f"\nUSB reader error: {str(e)}")
+                if self.reconnect("USB", self.reopen_usb):
+                    continue
                 break
+        self.sample_queue.close()    # Let the consumer drain what is left and exit
 
     def usb_data_handler(self):
         """
-        USB data handler with serial port optimization.
+        USB consumer stage, see deliver_samples.
         """
-        SAMPLE_INTERVAL = 1.0 / self.sampling_rate     # Time between samples in seconds
-        next_sample_time = local_clock()               # Initialize timing baseline
-        
-        while self.running and self.usb_connection:
+        self.deliver_samples("USB")
+
+    def ble_data_handler(self):
+        """
+        BLE consumer stage, see deliver_samples. Notifications are decoded and queued by handle_ble_notification on the BLE event loop.
+        """
+        self.deliver_samples("BLE")
+
+    def wifi_data_handler(self):
+        """
+        WiFi consumer stage, see deliver_samples. Messages are decoded and queued by wifi_reader.
+        """
+        self.deliver_samples("WiFi")
+
+    def handle_ble_notification(self, sender, data):
+        """
+        Handle one BLE notification: decode it once with Chords_BLE.decode_notification and publish its samples to the sample queue.
+        Args:
+            sender: The characteristic that sent the notification
+            data (bytearray): The received data packet
+        """
+        start = time.perf_counter()
+        try:
+            counters, samples = self.ble_connection.decode_notification(data)
+        except Exception as e:
+            print(f"\nBLE decode error: {str(e)}")
+            return
+        if not len(samples):
+            return
+        if not self.stream_active:
+            self.setup_lsl(num_channels=self.ble_connection.NUM_CHANNELS, sampling_rate=self.ble_connection.SAMPLING_RATE)
+        self.last_sample = samples[-1]
+        self.ble_samples_received += len(samples)
+        self.decode_seconds['ble'].observe(time.perf_counter() - start)
+        self.queue_block(samples, counters, self.ble_connection.last_read_time, wait=False)    # Never hold up the bleak callback
+
+    def handle_wifi_packet(self, data, arrival_time=None):
+        """
+        Decode one binary WebSocket message into samples and publish them to the sample queue.
+        Args:
+            data (bytes): Received message made of fixed-size sample blocks
+            arrival_time (float, optional): local_clock() time the message was received. Defaults to now.
+        """
+        if arrival_time is None:
+            arrival_time = local_clock()
+        start = time.perf_counter()
+        counters, samples = self.wifi_connection.decode_packet(data)
+        self.decode_seconds['wifi'].observe(time.perf_counter() - start)
+        if len(samples):
+            self.queue_block(samples, counters, arrival_time)
+
+    def wifi_reader(self):
+        """
+        WiFi reader stage. It owns the websocket: waits in recv() for the next message, decodes it and queues the samples.
+        """
+        while self.running and self.wifi_connection:
             try:
-                # Verify USB port is open and active
-                if hasattr(self.usb_connection, 'ser') and self.usb_connection.ser.is_open:
-                    self.usb_connection.read_data()     # Read raw data from serial port
-                    
-                    # Process if new data exists
-                    if hasattr(self.usb_connection, 'data'):
-                        current_time = local_clock()
-                        
-                        if current_time >= next_sample_time:
-                            sample = self.usb_connection.data[:, -1]  # Get most recent sample from numpy array
-                            channel_data = sample.tolist()            # Convert to list format
-
-                            # Calculate precise timestamp
-                            sample_time = next_sample_time
-                            next_sample_time += SAMPLE_INTERVAL
-                            
-                            # USB-specific overflow handling
-                            if current_time > next_sample_time + SAMPLE_INTERVAL:
-                                next_sample_time = current_time + SAMPLE_INTERVAL
-                            
-                            if self.lsl_connection:
-                                self.lsl_connection.push_sample(channel_data, timestamp=sample_time)
-
-                            self.update_sample_rate()
-
-                            if self.recording_active:
-                                self.log_to_csv(channel_data)
+                data = self.wifi_connection.ws.recv()        # Blocks until the device sends a message
+                arrival_time = local_clock()
+
+                # Handle both binary and text-formatted data
+                if isinstance(data, (bytes, list)):
+                    self.handle_wifi_packet(data, arrival_time)
             except Exception as e:
-                print(f"\nUSB data handler error: {str(e)}")
+                if self.running:
+                    print(f"\nWiFi reader error: {str(e)}")
+                    if self.reconnect("WiFi", self.reopen_wifi):
+                        continue
                 break
+        self.sample_queue.close()    # Let the consumer drain what is left and exit
 
     def connect_ble(self, device_address=None):
         """
@@ -416,120 +872,194 @@ class Connection:
             device_address (str, optional): MAC address in "XX:XX:XX:XX:XX:XX" format. If None, initiates interactive device selection.
         Returns:
             bool: True if connection succeeds, False on failure
-        Workflow: Initialize BLE handler instance -> Configure custom data notification handler -> Establish connection (direct or interactive) -> Set up data processing pipeline -> Maintain connection until termination.
+        Workflow: Initialize BLE handler instance -> Configure custom data notification handler -> Establish connection (direct or interactive) -> Set up data processing pipeline -> Maintain connection until termination, reconnecting with exponential backoff whenever the device goes away.
         """
-        # Initialize BLE protocol handler
-        self.ble_connection = Chords_BLE()
-        original_notification_handler = self.ble_connection.notification_handler
+        # Initialize BLE protocol handler and route its notifications through this manager
+        from chordspy.chords_ble import Chords_BLE    # bleak is only loaded when BLE is used
+        scanner = self.ble_scanner
+        self.ble_connection = Chords_BLE(resolve_device=scanner.device if scanner else None, pause_scanner=scanner.paused if scanner else None)
+        self.ble_connection.notification_handler = self.handle_ble_notification
 
-        def notification_handler(sender, data):
-            if len(data) == self.ble_connection.NEW_PACKET_LEN:
-                if not self.lsl_connection:
-                    self.setup_lsl(num_channels=3, sampling_rate=500)
-                
-                original_notification_handler(sender, data)
-                
-                for i in range(0, self.ble_connection.NEW_PACKET_LEN, self.ble_connection.SINGLE_SAMPLE_LEN):
-                    sample_data = data[i:i+self.ble_connection.SINGLE_SAMPLE_LEN]
-                    if len(sample_data) == self.ble_connection.SINGLE_SAMPLE_LEN:
-                        channels = [
-                            int.from_bytes(sample_data[i:i + 2], byteorder='big', signed=True)
-                            for i in range(1, len(sample_data), 2)
-                        ]
-                        self.last_sample = channels
-                        self.ble_samples_received += 1
-                
-                        if self.lsl_connection:             # Push to LSL
-                            self.lsl_connection.push_sample(channels)
-                        if self.recording_active:
-                            self.log_to_csv(channels)
-            
-        self.ble_connection.notification_handler = notification_handler
+        # Start the data handler before connecting: Chords_BLE.connect() runs the BLE event loop until disconnection
+        self.running = True
+        self.sample_queue = SampleQueue(self.queue_size, self.overload_policy)
+        self.ble_thread = threading.Thread(target=self.ble_data_handler)
+        self.ble_thread.daemon = True
+        self.ble_thread.start()
         
         try:
             if device_address:
                 print(f"Connecting to BLE device: {device_address}")
-                self.ble_connection.connect(device_address)
             else:
                 selected_device = asyncio.run(self.get_ble_device())
                 if not selected_device:
                     return False
                 print(f"Connecting to BLE device: {selected_device.name}")
-                self.ble_connection.connect(selected_device.address)
+                device_address = selected_device.address
 
-            self.running = True
-            self.ble_thread = threading.Thread(target=self.ble_data_handler)
-            self.ble_thread.daemon = True
-            self.ble_thread.start()
-            threading.Thread(target=self.lsl_rate_checker, daemon=True).start()    # Start independent rate monitoring
+            if self.lsl_enabled:
+                threading.Thread(target=self.lsl_rate_checker, daemon=True).start()    # Start independent rate monitoring
+            backoff = Backoff(self.reconnect_initial, self.reconnect_max)
+            keep_waiting = lambda: self.running and not self.ble_connection.stop_event.is_set()
+            while True:
+                if self.ble_connection.connect(device_address):    # Runs the BLE event loop until the device goes away
+                    backoff.reset()
+                if not (self.auto_reconnect and keep_waiting()):
+                    break
+                self.disconnected_transport = "BLE"    # Supervised reconnect, LSL and the recording stay up
+                if not backoff.wait(keep_waiting):
+                    break
+                print(f"\nReconnecting BLE (attempt {backoff.attempts})...")
             return True
         except Exception as e:
             print(f"BLE connection failed: {str(e)}")
             return False
+        finally:
+            self.running = False
+            self.sample_queue.close()    # Let the consumer drain what is left and exit
+
+    def connect_ble_devices(self, addresses, merged=False, client_factory=None):
+        """
+        Stream several BLE devices at once, all on one asyncio event loop thread (see chordspy.ble_devices).
+        Every device gets its own Connection in ble_devices, with its own Chords_BLE decode state and counters, sample queue, timestamps and reconnect loop, so a device that goes away is reconnected without touching the others.
+        Without merged, each device publishes its own LSL outlet, named after stream_name and the device address. With merged, the devices are lined up by sample counter into one outlet of NUM_CHANNELS channels per device, in the order of addresses, which this connection publishes like any other stream and records as CSV (a device that is away is NaN, which the integer formats cannot store).
+        Args:
+            addresses (list): Device addresses in "XX:XX:XX:XX:XX:XX" format
+            merged (bool, optional): Publish one merged stream instead of one stream per device. Defaults to False.
+            client_factory (callable, optional): Creates the BLE client of an address. Defaults to bleak.BleakClient; chordspy.emulator.BleEmulator.client emulates the devices.
+        Returns:
+            bool: True once every device's session has been started, devices connect and reconnect in the background
+        """
+        from chordspy.chords_ble import Chords_BLE    # bleak is only loaded when BLE is used
+        from chordspy.ble_devices import BleLoop, BleMerger, MergeSink
+        if not addresses or self.ble_devices:
+            return False
+
+        scanner = self.ble_scanner    # Resolves the devices and is paused while each of them connects
+        self.running = True
+        self.ble_loop = BleLoop().start()
+        if merged:
+            self.setup_lsl(len(addresses) * Chords_BLE.NUM_CHANNELS, Chords_BLE.SAMPLING_RATE)
+            self.sample_queue = SampleQueue(self.queue_size, self.overload_policy)
+            self.ble_merger = BleMerger(len(addresses), Chords_BLE.NUM_CHANNELS, Chords_BLE.SAMPLING_RATE, self.queue_block)
+            self.ble_thread = threading.Thread(target=self.ble_data_handler, daemon=True)
+            self.ble_thread.start()
+
+        for index, address in enumerate(addresses):
+            device = Connection(metrics=False)
+            device.stream_name = f"{self.stream_name}_{address.replace(':', '')}"
+            device.stream_id = f"{self.stream_id}_{address.replace(':', '')}"
+            device.lsl_enabled = self.lsl_enabled and not merged
+            device.shared_ring_name = None     # The ring is fed by the merged stream only
+            device.show_rate = False           # One rate line per device would overwrite each other
+            for option in ('queue_size', 'overload_policy', 'block_timeout', 'lsl_queue_size', 'lsl_policy',
+                           'auto_reconnect', 'reconnect_initial', 'reconnect_max'):
+                setattr(device, option, getattr(self, option))
+            if merged:
+                device.sinks.attach(MergeSink(self.ble_merger, index, max_samples=self.queue_size, policy=self.overload_policy))
+            device.ble_connection = Chords_BLE(client_factory, scanner.device if scanner else None, scanner.paused if scanner else None)
+            device.ble_connection.notification_handler = device.handle_ble_notification
+            device.running = True
+            device.sample_queue = SampleQueue(device.queue_size, device.overload_policy)
+            device.ble_thread = threading.Thread(target=device.ble_data_handler, daemon=True)
+            device.ble_thread.start()
+            self.ble_devices[address] = device
+            self.ble_sessions[address] = self.ble_loop.submit(device.run_ble_device(address))
+        print(f"Streaming {len(addresses)} BLE devices{' into one merged stream' if merged else ''}")
+        return True
+
+    async def run_ble_device(self, address):
+        """
+        Session of one device of connect_ble_devices, on the shared event loop: connect, stream until the device goes away, then reconnect with exponential backoff until cleanup.
+        Args:
+            address (str): Device address
+        """
+        ble = self.ble_connection
+        backoff = Backoff(self.reconnect_initial, self.reconnect_max)
+        keep_waiting = lambda: self.running and not ble.stop_event.is_set()
+        try:
+            while keep_waiting():
+                if await ble.async_connect(address):    # Streams until the device goes away
+                    backoff.reset()
+                if not (self.auto_reconnect and keep_waiting()):
+                    break
+                self.disconnected_transport = "BLE"    # Supervised reconnect, this device's stream stays up
+                if not await backoff.async_wait(keep_waiting):
+                    break
+                print(f"\nReconnecting BLE {address} (attempt {backoff.attempts})...")
+        finally:
+            self.sample_queue.close()    # Let the device's data handler drain what is left and exit
+
+    def stop_ble_devices(self, timeout=3.0):
+        """
+        Stop every device of connect_ble_devices: end their sessions, let their blocks reach the sinks (and the merged stream), then stop the shared event loop.
+        Args:
+            timeout (float, optional): Seconds to wait for the sessions to disconnect. Defaults to 3.
+        """
+        for device in self.ble_devices.values():
+            device.running = False
+            device.ble_connection.stop()
+        concurrent.futures.wait(list(self.ble_sessions.values()), timeout)
+        for device in self.ble_devices.values():
+            device.cleanup()
+        if self.ble_merger:
+            self.ble_merger.flush()    # Rows some device never reached, published with NaN for it
+        if self.ble_loop:
+            self.ble_loop.stop()
+        self.ble_devices = {}
+        self.ble_sessions = {}
+        self.ble_loop = None
+
+    def ble_device_stats(self):
+        """
+        Return the loss, drift and reconnection statistics of every device of connect_ble_devices.
+        Returns:
+            dict: Address -> stream_stats() of the device plus its stream name and whether it is connected, and 'merged' with the BleMerger counters in merged mode
+        """
+        report = {}
+        for address, device in self.ble_devices.items():
+            stats = device.stream_stats()
+            ble = device.ble_connection
+            stats['stream'] = device.stream_name
+            stats['connected'] = bool(ble and ble.client and ble.client.is_connected)
+            report[address] = stats
+        if self.ble_merger:
+            report['merged'] = self.ble_merger.stats()
+        return report
 
     def connect_wifi(self):
         """
         Manages WiFi connection and data streaming for CHORDS devices.
-        Implements a persistent connection loop that:
-        - Maintains websocket connection
-        - Validates incoming data blocks
-        - Handles data conversion and distribution
-        - Provides graceful shutdown on interrupt
-        The method runs continuously until KeyboardInterrupt, automatically cleaning up resources on exit.
+        Connects the websocket, then starts a reader thread that receives and decodes messages and a data handler thread that sends them to LSL and CSV.
+        Returns:
+            bool: True once streaming has started, False if the websocket could not be connected
         """
         # Initialize WiFi handler and establish connection
         self.wifi_connection = Chords_WIFI()
-        self.wifi_connection.connect()
+        if not self.wifi_connection.connect():
+            return False
 
         # Configure stream parameters from device
         self.num_channels = self.wifi_connection.channels
         sampling_rate = self.wifi_connection.sampling_rate
 
         # Initialize LSL stream if needed
-        if not self.lsl_connection:
+        if not self.stream_active:
             self.setup_lsl(self.num_channels, sampling_rate)
 
-        # Start the data handler thread
+        # Start the reader and the data handler threads, connected by a bounded sample queue
         self.running = True
+        self.sample_queue = SampleQueue(self.queue_size, self.overload_policy)
+        self.wifi_reader_thread = threading.Thread(target=self.wifi_reader)
+        self.wifi_reader_thread.daemon = True
+        self.wifi_reader_thread.start()
         self.wifi_thread = threading.Thread(target=self.wifi_data_handler)
         self.wifi_thread.daemon = True
         self.wifi_thread.start()
-        threading.Thread(target=self.lsl_rate_checker, daemon=True).start()    # Start independent rate monitoring
-        
-        try:
-            print("\nConnected! (Press Ctrl+C to stop)")
-            while True:
-                data = self.wifi_connection.ws.recv()        # Receive data via websocket
-                
-                # Handle both binary and text-formatted data
-                if isinstance(data, (bytes, list)):
-                    # Process data in protocol-defined blocks
-                    block_size = self.wifi_connection.block_size
-                    for i in range(0, len(data), block_size):
-                        block = data[i:i + block_size]
-                        
-                        # Skip partial blocks
-                        if len(block) < block_size:
-                            continue
-                        
-                        # Extract and convert channel samples
-                        channel_data = []
-                        for ch in range(self.wifi_connection.channels):
-                            offset = 1 + ch * 2        # Calculate byte offset for each channel
-                            sample = int.from_bytes(block[offset:offset + 2], byteorder='big', signed=True)
-                            channel_data.append(sample)
-                        
-                        if self.lsl_connection:                   # Push to LSL
-                            self.lsl_connection.push_sample(channel_data)
-                            
-                        # Record to CSV
-                        if self.recording_active:
-                            self.log_to_csv(channel_data)
-                    
-        except KeyboardInterrupt:
-            print("\nDisconnected")
-        finally:
-            self.stop_csv_recording()            # Ensure resources are released
+        if self.lsl_enabled:
+            threading.Thread(target=self.lsl_rate_checker, daemon=True).start()    # Start independent rate monitoring
+        print("\nConnected! (Press Ctrl+C to stop)")
+        return True
 
     def connect_usb(self):
         """
@@ -551,6 +1081,7 @@ class Connection:
         
         # Get resolution from board config (with fallback to 12)
         self.resolution = board_config.get("resolution", 12)
+        self.board = self.usb_connection.board
         
         # Initialize LSL stream
         self.setup_lsl(self.num_channels, self.sampling_rate)
@@ -558,43 +1089,59 @@ class Connection:
         # Start the USB streaming command
         self.usb_connection.send_command('START')
         
-        # Start the data handler thread
+        # Start the reader and the data handler threads, connected by a bounded sample queue
         self.running = True
+        self.sample_queue = SampleQueue(self.queue_size, self.overload_policy)
+        self.usb_reader_thread = threading.Thread(target=self.usb_reader)
+        self.usb_reader_thread.daemon = True
+        self.usb_reader_thread.start()
         self.usb_thread = threading.Thread(target=self.usb_data_handler)
         self.usb_thread.daemon = True
         self.usb_thread.start()
 
         # Start independent rate monitoring
-        threading.Thread(target=self.lsl_rate_checker, daemon=True).start()
+        if self.lsl_enabled:
+            threading.Thread(target=self.lsl_rate_checker, daemon=True).start()
         return True
 
     def cleanup(self):
         """
         Clean up all resources and connections in a safe and orderly manner.
-        The cleanup process follows this sequence: First stop data recording -> Then stop LSL streaming -> Next terminate all threads -> Finally close all hardware connections.
+        The cleanup process follows this sequence: First stop the threads, letting the data handlers deliver what is still queued -> Then stop data recording -> Then stop LSL streaming -> Finally close all hardware connections.
+        Every sample read before cleanup is therefore written to the recording before its files are closed.
         """
+        if self.ble_devices:
+            self.stop_ble_devices()  # Devices first, their last blocks still reach the merged stream
         self.running = False         # Signal all threads to stop
-        self.stop_csv_recording()    # Stop CSV recording if active
-
-        # Clean up LSL stream if active
-        if self.lsl_connection:
-            self.lsl_connection = None
-            self.stream_active = False
-            print("\nLSL stream stopped")
+        if self.sample_queue:
+            self.sample_queue.close()    # Wake up consumers blocked on the sample queue, they drain it and exit
         
         # Collect all active threads
         threads = []
+        if self.usb_reader_thread and self.usb_reader_thread.is_alive():
+            threads.append(self.usb_reader_thread)
         if self.usb_thread and self.usb_thread.is_alive():
             threads.append(self.usb_thread)
         if self.ble_thread and self.ble_thread.is_alive():
             threads.append(self.ble_thread)
         if self.wifi_thread and self.wifi_thread.is_alive():
             threads.append(self.wifi_thread)
+        if self.wifi_reader_thread and self.wifi_reader_thread.is_alive():
+            threads.append(self.wifi_reader_thread)
             
         # Wait for threads to finish (with timeout to prevent hanging)
         for t in threads:
             t.join(timeout=1)  # 1 second timeout per thread
         
+        self.stop_recording()        # Stop recording if active
+
+        # Clean up LSL stream if active
+        self.sinks.close()           # Let every sink push or write what it still holds
+        if self.lsl_connection:
+            self.lsl_connection = None
+            self.stream_active = False
+            print("\nLSL stream stopped")
+        
         # Clean up USB connection
         if self.usb_connection:
             try:
@@ -631,6 +1178,10 @@ class Connection:
         # Reset all state flags
         self.stream_active = False
         self.recording_active = False
+        self.disconnected_transport = None
+        self.counter_offset = 0
+        self.last_block_counter = None
+        self.last_block_time = None
 
     def __del__(self):
         """
@@ -648,6 +1199,8 @@ def main():
     $ python chords_connection.py --protocol wifi
     $ python chords_connection.py --protocol ble
     $ python chords_connection.py --protocol ble --ble-address AA:BB:CC:DD:EE:FF
+    $ python chords_connection.py --protocol ble --ble-address AA:BB:CC:DD:EE:01 AA:BB:CC:DD:EE:02 --merge-ble
+    $ python chords_connection.py --protocol usb --latency --latency-poll 0.01
 
     The main execution flow:
     1. Parse command line arguments
@@ -659,10 +1212,17 @@ def main():
     # Set up command line argument parser
     parser = argparse.ArgumentParser(description='Connect to device')
     parser.add_argument('--protocol', choices=['usb', 'wifi', 'ble'], required=True, help='Connection protocol to use (usb|wifi|ble)')
-    parser.add_argument('--ble-address', help='Direct BLE device address')
+    parser.add_argument('--ble-address', nargs='+', help='Direct BLE device address, several addresses stream the devices concurrently')
+    parser.add_argument('--merge-ble', action='store_true', help='Publish the BLE devices as one merged stream instead of one stream each')
+    parser.add_argument('--latency', action='store_true', help='Stamp every chunk from read to an LSL consumer and print p50/p95/p99 per stage on exit')
+    parser.add_argument('--latency-poll', type=float, default=0.0, help='Polling interval of the reference LSL consumer in seconds, like an app timer (0 = every chunk)')
     
     args = parser.parse_args()  # Parse command line arguments
     manager = Connection()      # Create connection manager instance
+    consumer = None             # Reference LSL consumer of the latency measurement mode
+    if args.latency:
+        manager.latency_probe = LatencyProbe()
+        consumer = ReferenceConsumer(manager.latency_probe, manager.stream_name, args.latency_poll).start()
 
     try:
         # USB Protocol Handling
@@ -679,7 +1239,12 @@ def main():
                     
         # BLE Protocol Handling
         elif args.protocol == 'ble':
-            if manager.connect_ble(args.ble_address):  # Attempt BLE connection
+            addresses = args.ble_address or []
+            if len(addresses) > 1 or args.merge_ble:
+                if manager.connect_ble_devices(addresses, args.merge_ble):    # Every device on one event loop thread
+                    while manager.running:
+                        time.sleep(1)
+            elif manager.connect_ble(addresses[0] if addresses else None):    # Attempt BLE connection
                 while manager.running:                 # Main execution loop
                     time.sleep(1)                      # Prevent CPU overutilization
                     
@@ -688,7 +1253,11 @@ def main():
     except Exception as e:
         print(f"\nError: {str(e)}")
     finally:
+        if consumer:
+            consumer.stop()
         manager.cleanup()    # Ensure cleanup always runs
+        if manager.latency_probe:
+            print(manager.latency_probe.format_report())
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
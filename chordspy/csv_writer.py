@@ -0,0 +1,107 @@
+"""
+Background CSV writer for Connection recordings.
+Formatting numbers as text and writing them to disk used to happen one writerow() per sample on the thread that also
+delivers samples to LSL, so a slow disk or a long fsync showed up as acquisition gaps. CsvWriter is a RecordingWriter:
+blocks are queued and a dedicated thread formats everything waiting in one go (a single string format for integer ADC
+codes, writerows otherwise) and writes it through a large file buffer, flushing and fsyncing periodically.
+The Counter column is numbered from the device counters carried by every block, so samples lost on the way (by the
+device link or by an overload policy) leave a gap in it.
+"""
+
+# Importing necessary libraries
+import io
+import csv
+import numpy as np
+from chordspy.recording import RecordingWriter
+
+def csv_headers(num_channels):
+    """
+    Column headers of a ChordsPy CSV recording.
+    Args:
+        num_channels (int): Channels per sample
+    Returns:
+        list: 'Counter' followed by 'Channel1' ... 'ChannelN'
+    """
+    return ['Counter'] + [f'Channel{i+1}' for i in range(num_channels)]
+
+def format_rows(counters, samples):
+    """
+    Format rows of a ChordsPy CSV recording in bulk.
+    Args:
+        counters (numpy.ndarray): Row counters
+        samples (numpy.ndarray): (n, num_channels) samples
+    Returns:
+        str: The rows with csv.writer's default '\\r\\n' line terminator
+    """
+    if samples.dtype.kind not in 'iu' and not np.array_equal(samples, np.rint(samples)):
+        buffer = io.StringIO()    # Fractional values keep csv.writer's float formatting
+        csv.writer(buffer).writerows([counter] + row for counter, row in zip(counters.tolist(), samples.tolist()))
+        return buffer.getvalue()
+    rows = np.empty((len(samples), samples.shape[1] + 1), dtype=np.int64)
+    rows[:, 0] = counters
+    rows[:, 1:] = samples
+    row_format = ",".join(["%d"] * rows.shape[1]) + "\r\n"
+    return (row_format * len(rows)) % tuple(rows.ravel().tolist())
+
+class CsvWriter(RecordingWriter):
+    """
+    Writes sample blocks to a CSV file on a background thread.
+    Attributes:
+        buffer_size (int): Size of the file buffer in bytes
+        first_row (int): Counter of the first row
+        first_counter (int): Device counter numbered first_row, None until the first block sets it
+    """
+    def __init__(self, filename, num_channels, buffer_size=1 << 20, first_row=1, first_counter=None, **options):
+        """
+        Initialize the writer. The file is opened by start().
+        Args:
+            filename (str): Path of the CSV file
+            num_channels (int): Channels per sample
+            buffer_size (int, optional): Size of the file buffer in bytes. Defaults to 1 MiB.
+            first_row (int, optional): Counter of the first row, to continue the numbering of an earlier file. Defaults to 1.
+            first_counter (int, optional): Device counter numbered first_row, to continue the numbering of an earlier file. Defaults to the counter of the first sample written.
+            **options: max_samples, flush_interval and fsync, see RecordingWriter
+        """
+        super().__init__(filename, num_channels, **options)
+        self.buffer_size = buffer_size
+        self.first_row = first_row
+        self.first_counter = first_counter
+        self._next_row = first_row    # Row after the last one numbered
+
+    def open_files(self):
+        """Open the file and write the header row."""
+        f = open(self.filename, 'w', newline='', buffering=self.buffer_size)
+        csv.writer(f).writerow(csv_headers(self.num_channels))
+        self.files.append(f)
+
+    def row_numbers(self, block):
+        """
+        Counter column of a block: first_row plus the distance of each device counter from first_counter. Blocks without counters continue after the previous row.
+        Args:
+            block (SampleBlock): Block to number
+        Returns:
+            numpy.ndarray: int64 row numbers
+        """
+        count = len(block.samples)
+        if block.counters is not None and len(block.counters) == count and count:
+            counters = np.asarray(block.counters, dtype=np.int64)
+            if self.first_counter is None:
+                self.first_counter = int(counters[0])
+            rows = counters + (self.first_row - self.first_counter)
+        else:
+            rows = np.arange(self._next_row, self._next_row + count, dtype=np.int64)
+        if count:
+            self._next_row = int(rows[-1]) + 1
+        return rows
+
+    def write_blocks(self, blocks):
+        """
+        Format and write a batch of blocks, numbering the rows from their device counters. Timestamps are not part of the CSV layout.
+        Returns:
+            int: Characters written
+        """
+        samples = blocks[0].samples if len(blocks) == 1 else np.concatenate([b.samples for b in blocks])
+        rows = self.row_numbers(blocks[0]) if len(blocks) == 1 else np.concatenate([self.row_numbers(b) for b in blocks])
+        text = format_rows(rows, samples)
+        self.files[0].write(text)
+        return len(text)
@@ -2,6 +2,7 @@ import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 import pandas as pd
 import plotly.graph_objects as go
+from chordspy.binary_recording import BinaryRecording
 
 class CSVPlotterApp:
     def __init__(self, root):                 # Initialize the main application window
@@ -41,8 +42,10 @@ class CSVPlotterApp:
         self.plot_button.pack(pady=10)
 
     def load_csv(self):
-        self.filename = filedialog.askopenfilename(filetypes=[("CSV files", "*.csv")])   # Open file dialog to select CSV file
-        if self.filename:
+        self.filename = filedialog.askopenfilename(filetypes=[("Recordings", "*.csv *.bin"), ("CSV files", "*.csv"), ("Binary recordings", "*.bin")])   # Open file dialog to select a recording
+        if self.filename and self.filename.endswith(".bin"):
+            self.load_binary()
+        elif self.filename:
             try:
                 with open(self.filename, "r", encoding="utf-8") as f:                    # Open the selected CSV file
                     lines = f.readlines()                                                # Read all lines into a list for header detection
@@ -72,6 +75,16 @@ class CSVPlotterApp:
             except Exception as e:
                 messagebox.showerror("Error", f"Could not load CSV file: {e}")
 
+    def load_binary(self):
+        try:
+            recording = BinaryRecording(self.filename)                                   # Memory-mapped, no parsing needed
+            self.data = pd.DataFrame(recording.samples, columns=recording.header['channel_names'])
+            self.data.insert(0, 'Counter', range(1, len(self.data) + 1))
+            self.setup_dropdown_menu()
+            self.file_label.config(text=f"File: {self.filename.split('/')[-1]}")
+        except Exception as e:
+            messagebox.showerror("Error", f"Could not load binary recording: {e}")
+
     def setup_dropdown_menu(self):
         # Get available channel columns
         channel_columns = [col for col in self.data.columns if 'Channel' in col]
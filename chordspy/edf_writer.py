@@ -0,0 +1,351 @@
+"""
+Streaming EDF+ (16-bit) and BDF+ (24-bit) recording.
+EdfFile assembles fixed-duration data records in numpy as samples arrive and appends them to the file, with the
+header's record count left at -1 (allowed while recording) and patched with the final count on close. Every record
+carries the EDF+ timekeeping annotation; counter gaps (lost packets) are written as "Missing N samples" annotations
+so the continuous (EDF+C) time axis stays honest about them.
+
+The physical range is the range of ADC codes the transport really sends, passed explicitly as code_range (0 ..
+2^resolution - 1 by default, which is what every CHORDS board sends over USB, BLE and WiFi), and the digital range is
+the same width centered on zero, so the conversion is exact and lossless. EDF holds resolutions up to 16 bits, BDF up to 24.
+
+EdfWriter runs EdfFile on the RecordingWriter thread for Connection recordings; convert_csv() converts existing CSV
+recordings in fixed-size chunks with constant memory.
+
+Usage:
+$ python -m chordspy.edf_writer ChordsPy_20250101_120000.csv --rate 500 --resolution 12
+$ python -m chordspy.edf_writer ChordsPy_20250101_120000.csv --rate 500 --bdf
+"""
+
+# Importing necessary libraries
+import os
+import argparse
+from datetime import datetime
+import numpy as np
+from chordspy.recording import RecordingWriter
+from chordspy.csv_writer import csv_headers
+
+RECORD_COUNT_OFFSET = 236    # Position of the "number of data records" header field
+ANNOTATION_BYTES = 120       # Bytes of the annotation signal in every data record
+
+class EdfFile:
+    """
+    Writes samples to an EDF+ or BDF+ file, record by record, on the caller's thread.
+    Attributes:
+        filename (str): Path of the output file
+        num_channels (int): Channels per sample
+        sampling_rate (int): Samples per second, must give a whole number of samples per record
+        resolution (int): ADC resolution in bits
+        code_range (tuple): (lowest, highest) ADC code, the physical range of every channel
+        bdf (bool): Write BDF+ (24-bit) instead of EDF+ (16-bit)
+        record_duration (float): Seconds per data record
+        samples_per_record (int): Samples per channel in one data record
+        records_written (int): Complete data records written
+        missing_samples (int): Samples reported missing by counter gaps
+    """
+    def __init__(self, filename, num_channels, sampling_rate, resolution=12, code_range=None, bdf=False, record_duration=1.0, board=None, labels=None, start=None):
+        """
+        Initialize the file. Nothing is written until open().
+        Args:
+            filename (str): Path of the output file
+            num_channels (int): Channels per sample
+            sampling_rate (float): Samples per second
+            resolution (int, optional): ADC resolution in bits. Defaults to 12.
+            code_range (tuple, optional): (lowest, highest) ADC code. Defaults to 0 .. 2^resolution - 1.
+            bdf (bool, optional): Write BDF+ instead of EDF+. Defaults to False.
+            record_duration (float, optional): Seconds per data record. Defaults to 1.0.
+            board (str, optional): Board name written to the recording identification
+            labels (list, optional): Channel labels. Defaults to Channel1 ... ChannelN.
+            start (datetime, optional): Start of the recording. Defaults to now.
+        Raises:
+            ValueError: If the code range does not fit the format or the record would hold a fractional number of samples
+        """
+        low, high = code_range or (0, (1 << resolution) - 1)
+        bits = max(int(high - low).bit_length(), 1)
+        if resolution > (24 if bdf else 16) or bits > (24 if bdf else 16):
+            raise ValueError(f"{max(resolution, bits)}-bit data does not fit {'BDF' if bdf else 'EDF'}, use BDF for up to 24 bits")
+        samples_per_record = sampling_rate * record_duration
+        if abs(samples_per_record - round(samples_per_record)) > 1e-9:
+            raise ValueError(f"{sampling_rate} Hz x {record_duration} s is not a whole number of samples per record")
+
+        self.filename = filename
+        self.num_channels = num_channels
+        self.sampling_rate = sampling_rate
+        self.resolution = resolution
+        self.code_range = (int(low), int(high))
+        self.bdf = bdf
+        self.record_duration = record_duration
+        self.samples_per_record = int(round(samples_per_record))
+        self.board = board
+        self.labels = labels or csv_headers(num_channels)[1:]
+        self.start = start or datetime.now()
+        self.records_written = 0
+        self.missing_samples = 0
+        self.file = None
+
+        # Physical values are ADC codes, digital values the same codes shifted to be centered on zero
+        self.physical_min, self.physical_max = self.code_range
+        self.digital_min = -(1 << (bits - 1))
+        self.digital_max = self.digital_min + self.physical_max - self.physical_min
+        self.sample_bytes = 3 if bdf else 2
+
+        self._pending = np.empty((0, num_channels), dtype=np.int32)    # Samples of the record being filled
+        self._annotations = []           # (onset seconds, text) waiting for a record
+        self._next_counter = None        # Expected next device counter
+        self._samples_total = 0          # Samples accepted
+        self._last = None                # Last sample written, repeated to fill records
+
+    def header(self, records):
+        """
+        Build the EDF+/BDF+ header.
+        Args:
+            records (int): Number of data records, -1 while unknown
+        Returns:
+            bytes: Header of 256 * (signals + 1) bytes
+        """
+        def field(value, width):
+            return str(value).encode('ascii', 'replace')[:width].ljust(width)
+
+        signals = self.num_channels + 1
+        kind = 'BDF' if self.bdf else 'EDF'
+        months = ['JAN', 'FEB', 'MAR', 'APR', 'MAY', 'JUN', 'JUL', 'AUG', 'SEP', 'OCT', 'NOV', 'DEC']
+        startdate = f"{self.start.day:02d}-{months[self.start.month - 1]}-{self.start.year}"
+        equipment = (self.board or 'ChordsPy').replace(' ', '_')
+        annotation_samples = ANNOTATION_BYTES // self.sample_bytes
+
+        header = (b'\xffBIOSEMI' if self.bdf else field('0', 8))
+        header += field('X X X X', 80)                                              # Patient: code, sex, birthdate, name unknown
+        header += field(f'Startdate {startdate} X X {equipment}', 80)               # Recording identification
+        header += field(self.start.strftime('%d.%m.%y'), 8)
+        header += field(self.start.strftime('%H.%M.%S'), 8)
+        header += field(256 * (signals + 1), 8)
+        header += field(f'{kind}+C', 44)                                            # Continuous recording
+        header += field(records, 8)
+        header += field(f'{self.record_duration:g}', 8)
+        header += field(signals, 4)
+
+        labels = self.labels + [f'{kind} Annotations']
+        header += b''.join(field(label, 16) for label in labels)
+        header += b''.join(field('', 80) for _ in labels)                                       # Transducer type
+        header += b''.join(field('ADU', 8) for _ in self.labels) + field('', 8)                 # Physical dimension: ADC units
+        header += b''.join(field(self.physical_min, 8) for _ in self.labels) + field(-1, 8)
+        header += b''.join(field(self.physical_max, 8) for _ in self.labels) + field(1, 8)
+        annotation_min = -(1 << (8 * self.sample_bytes - 1))
+        header += b''.join(field(self.digital_min, 8) for _ in self.labels) + field(annotation_min, 8)
+        header += b''.join(field(self.digital_max, 8) for _ in self.labels) + field(-annotation_min - 1, 8)
+        header += b''.join(field('', 80) for _ in labels)                                       # Prefiltering
+        header += b''.join(field(self.samples_per_record, 8) for _ in self.labels) + field(annotation_samples, 8)
+        header += b''.join(field('', 32) for _ in labels)
+        return header
+
+    def open(self):
+        """
+        Create the file and write the header with an unknown record count.
+        Raises:
+            OSError: If the file cannot be created
+        """
+        self.file = open(self.filename, 'wb')
+        self.file.write(self.header(-1))
+
+    def to_digital(self, samples):
+        """
+        Convert ADC codes to the digital values stored in the file.
+        Args:
+            samples (numpy.ndarray): (n, num_channels) ADC codes
+        Returns:
+            numpy.ndarray: (n, num_channels) int32 digital values within the digital range
+        """
+        digital = np.rint(np.asarray(samples, dtype=np.float64)) - self.physical_min + self.digital_min
+        return np.clip(digital, self.digital_min, self.digital_max).astype(np.int32)
+
+    def write(self, samples, counters=None):
+        """
+        Add samples and write every data record that is complete.
+        Args:
+            samples (array-like): (n, num_channels) ADC codes
+            counters (array-like, optional): Unwrapped device counters, used to annotate lost samples
+        Returns:
+            int: Bytes written
+        """
+        samples = np.asarray(samples)
+        if samples.ndim == 1:
+            samples = samples.reshape(1, -1)
+        if counters is not None and len(counters):
+            if self._next_counter is not None and counters[0] > self._next_counter:
+                missing = int(counters[0] - self._next_counter)
+                self.missing_samples += missing
+                self._annotations.append((self._samples_total / self.sampling_rate, f'Missing {missing} samples'))
+            self._next_counter = int(counters[-1]) + 1
+        self._samples_total += len(samples)
+
+        self._pending = np.concatenate([self._pending, self.to_digital(samples[:, :self.num_channels])])
+        written = 0
+        while len(self._pending) >= self.samples_per_record:
+            written += self.write_record(self._pending[:self.samples_per_record])
+            self._pending = self._pending[self.samples_per_record:]
+        return written
+
+    def annotation_bytes(self):
+        """
+        Build the annotation signal of the next record: timekeeping TAL first, then any waiting annotations that fit.
+        Returns:
+            bytes: Exactly ANNOTATION_BYTES bytes
+        """
+        data = f'+{self.records_written * self.record_duration:g}\x14\x14\x00'.encode()
+        while self._annotations:
+            onset, text = self._annotations[0]
+            tal = f'+{onset:.6f}'.rstrip('0').rstrip('.').encode() + b'\x14' + text.encode('utf-8') + b'\x14\x00'
+            if len(data) + len(tal) > ANNOTATION_BYTES:
+                break    # Carried over to the next record
+            data += tal
+            self._annotations.pop(0)
+        return data.ljust(ANNOTATION_BYTES, b'\x00')
+
+    def write_record(self, digital):
+        """
+        Write one data record.
+        Args:
+            digital (numpy.ndarray): (samples_per_record, num_channels) digital values
+        Returns:
+            int: Bytes written
+        """
+        self._last = digital[-1:]
+        values = np.ascontiguousarray(digital.T).ravel()    # Signals one after another
+        if self.bdf:
+            data = values.astype('<i4').view(np.uint8).reshape(-1, 4)[:, :3].tobytes()
+        else:
+            data = values.astype('<i2').tobytes()
+        data += self.annotation_bytes()
+        self.file.write(data)
+        self.records_written += 1
+        return len(data)
+
+    def close(self):
+        """
+        Pad and write the last partial record, patch the record count in the header and close the file.
+        Returns:
+            int: Bytes written
+        """
+        written = 0
+        if len(self._pending):
+            padding = self.samples_per_record - len(self._pending)
+            self._annotations.append((self._samples_total / self.sampling_rate, f'Padding {padding} samples'))
+            last = np.repeat(self._pending[-1:], padding, axis=0)    # Repeat the last sample instead of a step to zero
+            written += self.write_record(np.concatenate([self._pending, last]))
+            self._pending = self._pending[:0]
+        while self._annotations and self.records_written:    # Annotations that did not fit get records of their own
+            written += self.write_record(np.repeat(self._last, self.samples_per_record, axis=0))
+        self.file.seek(RECORD_COUNT_OFFSET)
+        self.file.write(str(self.records_written).encode().ljust(8))
+        self.file.close()
+        return written
+
+class EdfWriter(RecordingWriter):
+    """
+    Writes sample blocks to an EDF+ or BDF+ file on a background thread.
+    Attributes:
+        edf (EdfFile): The file being written
+    """
+    def __init__(self, filename, num_channels, sampling_rate=500, board=None, resolution=12, code_range=None, bdf=False, record_duration=1.0, **options):
+        """
+        Initialize the writer. The file is created by start().
+        Args:
+            filename (str): Path of the .edf or .bdf file
+            num_channels (int): Channels per sample
+            sampling_rate (float, optional): Samples per second. Defaults to 500.
+            board (str, optional): Board name written to the header
+            resolution (int, optional): ADC resolution in bits. Defaults to 12.
+            code_range (tuple, optional): (lowest, highest) ADC code, see Connection.code_range(). Defaults to 0 .. 2^resolution - 1.
+            bdf (bool, optional): Write BDF+ instead of EDF+. Defaults to False.
+            record_duration (float, optional): Seconds per data record. Defaults to 1.0.
+            **options: max_samples, flush_interval and fsync, see RecordingWriter
+        """
+        super().__init__(filename, num_channels, **options)
+        self.edf = EdfFile(filename, num_channels, sampling_rate, resolution, code_range, bdf, record_duration, board)
+
+    def open_files(self):
+        """Create the file and write the header."""
+        self.edf.open()
+        self.files.append(self.edf.file)
+
+    def write_blocks(self, blocks):
+        """
+        Add a batch of blocks, writing every completed data record.
+        Returns:
+            int: Bytes written
+        """
+        return sum(self.edf.write(block.samples, block.counters) for block in blocks)
+
+    def close_files(self):
+        """Write the last record and patch the record count."""
+        self.bytes_written += self.edf.close()
+
+    def stats(self):
+        """
+        Snapshot of the writer counters.
+        Returns:
+            dict: RecordingWriter statistics plus data records written and samples reported missing
+        """
+        stats = super().stats()
+        stats['records_written'] = self.edf.records_written
+        stats['missing_samples'] = self.edf.missing_samples
+        return stats
+
+def convert_csv(csv_filename, edf_filename=None, sampling_rate=500, resolution=12, code_range=None, bdf=False, chunk_samples=100000):
+    """
+    Convert a CSV recording to EDF+ or BDF+ in chunks, so memory use does not grow with the file.
+    Args:
+        csv_filename (str): CSV written by Connection (a 'Counter' header row followed by the channel columns)
+        edf_filename (str, optional): Output path. Defaults to the CSV name with .edf or .bdf.
+        sampling_rate (float, optional): Sampling rate of the recording. Defaults to 500.
+        resolution (int, optional): ADC resolution in bits. Defaults to 12.
+        code_range (tuple, optional): (lowest, highest) ADC code. Defaults to 0 .. 2^resolution - 1.
+        bdf (bool, optional): Write BDF+ instead of EDF+. Defaults to False.
+        chunk_samples (int, optional): Rows read per step. Defaults to 100000.
+    Returns:
+        str: Path of the EDF/BDF file
+    Raises:
+        ValueError: If the CSV has no 'Counter' header row
+    """
+    import pandas as pd    # Only the converters need pandas, recording does not load it
+    # Skip any metadata lines before the header, like csvplotter does
+    header_index = None
+    with open(csv_filename, 'r', encoding='utf-8') as f:
+        for i, line in enumerate(f):
+            if 'Counter' in line:
+                header_index = i
+                break
+    if header_index is None:
+        raise ValueError("CSV file must contain a 'Counter' column")
+
+    edf_filename = edf_filename or os.path.splitext(csv_filename)[0] + ('.bdf' if bdf else '.edf')
+    start = datetime.fromtimestamp(os.path.getmtime(csv_filename))    # Best available guess of the recording time
+    edf = None
+    for chunk in pd.read_csv(csv_filename, skiprows=header_index, header=0, chunksize=chunk_samples):
+        channels = [column for column in chunk.columns if column != 'Counter']
+        if edf is None:
+            edf = EdfFile(edf_filename, len(channels), sampling_rate, resolution, code_range, bdf, labels=channels, start=start)
+            edf.open()
+        edf.write(chunk[channels].to_numpy())
+    if edf is None:
+        raise ValueError("CSV file has no samples")
+    edf.close()
+    return edf_filename
+
+def main():
+    """
+    Command line entry point: convert CSV recordings to EDF+ or BDF+.
+    """
+    parser = argparse.ArgumentParser(description='Convert ChordsPy CSV recordings to EDF+ or BDF+')
+    parser.add_argument('csv', nargs='+', help='CSV recordings to convert')
+    parser.add_argument('--rate', type=float, default=500, help='Sampling rate in Hz')
+    parser.add_argument('--resolution', type=int, default=12, help='ADC resolution in bits')
+    parser.add_argument('--code-range', type=int, nargs=2, metavar=('LOW', 'HIGH'), help='Lowest and highest ADC code, defaults to 0 .. 2^resolution - 1')
+    parser.add_argument('--bdf', action='store_true', help='Write 24-bit BDF+ instead of 16-bit EDF+')
+    args = parser.parse_args()
+
+    for filename in args.csv:
+        print(f"{filename} -> {convert_csv(filename, None, args.rate, args.resolution, args.code_range, args.bdf)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,498 @@
+"""
+Virtual CHORDS USB board on a Linux/macOS pseudo-terminal, and emulated NPG BLE devices (on any platform).
+This script emulates the serial side of any board in Chords_USB.supported_boards so that Chords_USB and the whole
+Connection pipeline can be exercised, benchmarked and regression-tested without hardware. It:
+- Answers 'WHORU' with the emulated board name
+- Honors 'START' / 'STOP'
+- Streams correctly framed packets at the board's channel count and sampling rate (or an overdrive rate)
+- Generates configurable waveforms
+- Optionally injects byte corruption, dropped packets and counter jumps
+
+Pseudo-terminals are not listed by serial.tools.list_ports, so point Chords_USB at the emulator with the
+CHORDSPY_SERIAL_PORTS environment variable:
+
+Usage:
+$ python -m chordspy.emulator --board STM32G4-CORE-BOARD --rate 4000
+$ CHORDSPY_SERIAL_PORTS=/dev/pts/3 python -m chordspy.connection --protocol usb
+
+BLE devices are emulated in process instead: BleEmulator.client stands in for bleak.BleakClient and delivers
+notifications of 10 samples at 500 Hz per device on the caller's event loop, as bleak does:
+    emulator = BleEmulator()
+    manager.connect_ble_devices(["EMU:01", "EMU:02"], client_factory=emulator.client)
+    emulator.drop("EMU:01", 3.0)    # Out of range for 3 s, then reconnectable
+Tests can pass a fake clock and step it, waiting for caught_up() after every step, so the devices follow it exactly.
+"""
+
+# Importing necessary libraries
+import os
+import asyncio
+import time
+import select
+import argparse
+import threading
+import numpy as np
+from pylsl import local_clock
+from chordspy.chords_serial import Chords_USB
+
+class BoardEmulator:
+    """
+    Emulates one CHORDS USB board behind a pseudo-terminal.
+    Attributes:
+        board (str): Emulated board name (a key of Chords_USB.supported_boards)
+        num_channels (int): Channels per packet
+        sampling_rate (float): Packets per second actually streamed
+        resolution (int): ADC resolution in bits, used to scale the waveforms
+        waveform (str): One of WAVEFORMS
+        corrupt_rate (float): Probability that a packet gets one random byte overwritten
+        drop_rate (float): Probability that a packet is not sent (its counter value is still consumed)
+        counter_jump_rate (float): Probability that the counter skips ahead by a random amount before a packet
+        port (str): Path of the pseudo-terminal to open with pyserial, available after start()
+        streaming (bool): True between 'START' and 'STOP'
+        packets_sent (int): Packets written to the port
+        packets_dropped (int): Packets skipped by drop injection
+        packets_corrupted (int): Packets with an injected corrupt byte
+        counter_jumps (int): Injected counter jumps
+        bytes_overrun (int): Bytes discarded because the reader did not keep up
+    """
+    WAVEFORMS = ("sine", "square", "ramp", "noise")
+    MAX_PENDING = 1 << 20    # Bytes buffered for a slow reader before the emulator starts discarding
+    EMIT_HISTORY = 1 << 16   # Samples whose generation time is remembered for emit_time()
+
+    def __init__(self, board="NPG-LITE", sampling_rate=None, waveform="sine", corrupt_rate=0.0, drop_rate=0.0, counter_jump_rate=0.0, seed=None):
+        """
+        Initialize the emulator. Nothing is opened until start() is called.
+        Args:
+            board (str, optional): Board to emulate. Defaults to "NPG-LITE".
+            sampling_rate (float, optional): Override the board's nominal sampling rate (overdrive). Defaults to the board's rate.
+            waveform (str, optional): Signal shape, one of WAVEFORMS. Defaults to "sine".
+            corrupt_rate (float, optional): Per-packet corruption probability. Defaults to 0.
+            drop_rate (float, optional): Per-packet drop probability. Defaults to 0.
+            counter_jump_rate (float, optional): Per-packet counter jump probability. Defaults to 0.
+            seed (int, optional): Seed for waveform noise and fault injection.
+        """
+        if board not in Chords_USB.supported_boards:
+            raise ValueError(f"Unsupported board: {board}")
+        if waveform not in self.WAVEFORMS:
+            raise ValueError(f"Unknown waveform: {waveform}")
+
+        config = Chords_USB.supported_boards[board]
+        self.board = board
+        self.num_channels = config["Num_channels"]
+        self.sampling_rate = sampling_rate or config["sampling_rate"]
+        self.resolution = config["resolution"]
+        self.waveform = waveform
+        self.corrupt_rate = corrupt_rate
+        self.drop_rate = drop_rate
+        self.counter_jump_rate = counter_jump_rate
+        self.rng = np.random.default_rng(seed)
+        self.packet_dtype = Chords_USB.make_packet_dtype(self.num_channels)
+
+        self.port = None
+        self.streaming = False
+        self.packets_sent = 0
+        self.packets_dropped = 0
+        self.packets_corrupted = 0
+        self.counter_jumps = 0
+        self.bytes_overrun = 0
+
+        self._master = None
+        self._slave = None
+        self._thread = None
+        self._stop_event = threading.Event()
+        self._pending = bytearray()     # Bytes waiting for the reader
+        self._sample_index = 0          # Samples generated since START, drives the waveform and the schedule
+        self._counter = 0               # Value of the next packet counter
+        self._stream_start = None
+        self._emit_times = np.full(self.EMIT_HISTORY, np.nan)    # local_clock() generation time by unwrapped counter
+
+    def start(self):
+        """
+        Open the pseudo-terminal and start serving commands in a background thread.
+        Returns:
+            str: Path of the emulated serial port
+        """
+        import pty, tty    # POSIX only, imported here so BleEmulator also loads on Windows
+        self._master, self._slave = pty.openpty()
+        tty.setraw(self._slave)                # No echo, no line discipline
+        os.set_blocking(self._master, False)   # Never stall the emulator on a slow reader
+        self.port = os.ttyname(self._slave)
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self.port
+
+    def stop(self):
+        """Stop the emulator thread and close the pseudo-terminal."""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=1)
+            self._thread = None
+        for fd in (self._master, self._slave):
+            if fd is not None:
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+        self._master = self._slave = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def handle_command(self, command):
+        """
+        React to one command line received from the host.
+        Args:
+            command (str): Command without the trailing newline
+        """
+        if command == "WHORU":
+            self._pending.extend(f"{self.board}\n".encode())
+        elif command == "START":
+            self.streaming = True
+            self._sample_index = 0
+            self._stream_start = time.perf_counter()
+        elif command == "STOP":
+            self.streaming = False
+            self._pending.clear()
+
+    def generate(self, count):
+        """
+        Generate the next packets of the stream, with fault injection applied.
+        Args:
+            count (int): Number of samples to generate
+        Returns:
+            bytes: Framed packets ready to be written
+        """
+        index = self._sample_index + np.arange(count)
+        self._sample_index += count
+
+        # Counters, with optional random jumps, wrap at 256 like the firmware
+        steps = np.ones(count, dtype=np.int64)
+        if self.counter_jump_rate:
+            jumps = self.rng.random(count) < self.counter_jump_rate
+            steps[jumps] += self.rng.integers(1, 255, size=int(jumps.sum()))
+            self.counter_jumps += int(jumps.sum())
+        counters = self._counter + np.cumsum(steps) - 1
+        self._counter = int(counters[-1] + 1)
+        self._emit_times[counters % self.EMIT_HISTORY] = local_clock()
+
+        packets = np.zeros(count, dtype=self.packet_dtype)
+        packets['sync'] = [Chords_USB.SYNC_BYTE1, Chords_USB.SYNC_BYTE2]
+        packets['counter'] = counters % 256
+        packets['channels'] = self.waveform_values(index)
+        packets['end'] = Chords_USB.END_BYTE
+
+        if self.drop_rate:
+            keep = self.rng.random(count) >= self.drop_rate
+            self.packets_dropped += int(count - keep.sum())
+            packets = packets[keep]
+
+        raw = np.frombuffer(packets.tobytes(), dtype=np.uint8).copy()
+        if self.corrupt_rate and len(packets):
+            hit = np.flatnonzero(self.rng.random(len(packets)) < self.corrupt_rate)
+            offsets = self.rng.integers(0, self.packet_dtype.itemsize, size=len(hit))
+            raw[hit * self.packet_dtype.itemsize + offsets] ^= self.rng.integers(1, 256, size=len(hit), dtype=np.uint8)
+            self.packets_corrupted += len(hit)
+
+        self.packets_sent += len(packets)
+        return raw.tobytes()
+
+    def emit_time(self, counter):
+        """
+        Time at which a packet was generated, i.e. its bytes became available on the port. Used by
+        chordspy.latency.LatencyProbe as the emit stage of a simulated source.
+        Args:
+            counter (int): Unwrapped packet counter, as in Chords_USB.last_counters (counting from the first packet after START)
+        Returns:
+            float: local_clock() time, NaN if the packet is too old or was never generated
+        """
+        return float(self._emit_times[counter % self.EMIT_HISTORY]) if self._counter - self.EMIT_HISTORY <= counter < self._counter else float('nan')
+
+    def waveform_values(self, index):
+        """
+        Compute the channel values for a range of sample indices.
+        Args:
+            index (numpy.ndarray): Sample indices since START
+        Returns:
+            numpy.ndarray: (len(index), num_channels) unsigned values within the board's resolution
+        """
+        full_scale = (1 << self.resolution) - 1
+        mid = full_scale / 2
+        t = index[:, None] / self.sampling_rate
+        freqs = 1.0 + np.arange(self.num_channels)     # Channel n carries an (n+1) Hz signal
+        if self.waveform == "sine":
+            values = mid + 0.8 * mid * np.sin(2 * np.pi * freqs * t)
+        elif self.waveform == "square":
+            values = mid + 0.8 * mid * np.sign(np.sin(2 * np.pi * freqs * t))
+        elif self.waveform == "ramp":
+            values = (index[:, None] + np.arange(self.num_channels)) % (full_scale + 1)
+        else:
+            values = mid + self.rng.normal(0, mid / 8, size=(len(index), self.num_channels))
+        return np.clip(np.rint(values), 0, full_scale).astype(np.uint16)
+
+    def _run(self):
+        """Emulator loop: read commands, stream due packets, flush pending bytes."""
+        commands = bytearray()
+        while not self._stop_event.is_set():
+            readable, _, _ = select.select([self._master], [], [], 0.001)
+            if readable:
+                try:
+                    commands.extend(os.read(self._master, 1024))
+                except OSError:
+                    pass
+                while b"\n" in commands:
+                    line, _, rest = bytes(commands).partition(b"\n")
+                    commands = bytearray(rest)
+                    self.handle_command(line.strip().decode(errors="ignore"))
+
+            if self.streaming:
+                due = int((time.perf_counter() - self._stream_start) * self.sampling_rate) - self._sample_index
+                if due > 0:
+                    self._pending.extend(self.generate(min(due, int(self.sampling_rate) + 1)))
+
+            if self._pending:
+                try:
+                    written = os.write(self._master, self._pending)
+                    del self._pending[:written]
+                except BlockingIOError:
+                    pass
+                except OSError:
+                    self._pending.clear()
+                if len(self._pending) > self.MAX_PENDING:    # Reader is not keeping up, behave like an overrun UART
+                    excess = len(self._pending) - self.MAX_PENDING
+                    del self._pending[:excess]
+                    self.bytes_overrun += excess
+
+    def stats(self):
+        """
+        Snapshot of the emulator counters.
+        Returns:
+            dict: Packets sent, dropped, corrupted, counter jumps and overrun bytes
+        """
+        return {
+            'packets_sent': self.packets_sent,
+            'packets_dropped': self.packets_dropped,
+            'packets_corrupted': self.packets_corrupted,
+            'counter_jumps': self.counter_jumps,
+            'bytes_overrun': self.bytes_overrun,
+        }
+
+class BleEmulator:
+    """
+    Emulated NPG BLE devices, one per address, for Chords_BLE(client_factory=emulator.client).
+    A device starts sampling when it is first connected and keeps counting from then on, also while it is out of range,
+    so an outage shows up as a gap in its counters like with a real device.
+    Attributes:
+        sampling_rate (float): Samples per second of every device
+        block_count (int): Samples per notification
+        num_channels (int): Channels per sample
+        drop_rate (float): Probability that a notification is lost on the air
+        clock (callable): Time source of the devices in seconds
+        notifications_sent (dict): Notifications delivered per address
+        notifications_dropped (dict): Notifications lost by drop injection per address
+    """
+    SAMPLE_DTYPE = np.dtype([('counter', np.uint8), ('channels', '>i2', (3,))])    # Layout of Chords_BLE.SAMPLE_DTYPE
+
+    def __init__(self, sampling_rate=500, block_count=10, waveform="sine", drop_rate=0.0, seed=None, clock=time.monotonic):
+        """
+        Initialize the emulator.
+        Args:
+            sampling_rate (float, optional): Samples per second of every device. Defaults to 500.
+            block_count (int, optional): Samples per notification. Defaults to 10.
+            waveform (str, optional): Signal shape, one of BoardEmulator.WAVEFORMS. Defaults to "sine".
+            drop_rate (float, optional): Per-notification drop probability. Defaults to 0.
+            seed (int, optional): Seed for waveform noise and drop injection.
+            clock (callable, optional): Time source in seconds. Defaults to time.monotonic; tests pass a fake clock they step.
+        """
+        self.sampling_rate = sampling_rate
+        self.block_count = block_count
+        self.num_channels = self.SAMPLE_DTYPE['channels'].shape[0]
+        self.drop_rate = drop_rate
+        self.clock = clock
+        self.signal = BoardEmulator("NPG-LITE", sampling_rate, waveform, seed=seed)    # Waveforms only, its port is never opened
+        self.rng = np.random.default_rng(seed)
+        self.notifications_sent = {}
+        self.notifications_dropped = {}
+        self._start = {}             # Address -> clock() of the first connection
+        self._offline_until = {}     # Address -> clock() until which the device is out of range
+        self._clients = {}           # Address -> client currently connected
+
+    def client(self, address):
+        """
+        Client factory: a FakeBleakClient for the device at address.
+        Args:
+            address (str): Any address, each one is a separate device
+        Returns:
+            FakeBleakClient: The client
+        """
+        return FakeBleakClient(self, address)
+
+    def drop(self, address, seconds):
+        """
+        Take a device out of range: its connection is lost now and connecting fails for the given time.
+        Args:
+            address (str): Device address
+            seconds (float): Time out of range
+        """
+        self._offline_until[address] = self.clock() + seconds
+        client = self._clients.get(address)
+        if client is not None:
+            client.lose_link()
+
+    def start_time(self, address):
+        """
+        Time at which a device started sampling, its sample n is taken n / sampling_rate seconds later.
+        Args:
+            address (str): Device address
+        Returns:
+            float: clock() of its first connection, None if it was never connected
+        """
+        return self._start.get(address)
+
+    def available(self, address):
+        """Whether the device is in range."""
+        return self.clock() >= self._offline_until.get(address, 0.0)
+
+    def samples_due(self, address):
+        """Samples the device has produced since it was first connected."""
+        return int((self.clock() - self._start[address]) * self.sampling_rate)
+
+    def caught_up(self):
+        """
+        Whether every streaming device has sent all notifications due by now. After stepping a fake clock, wait for
+        this before the next step so that every notification is delivered at the time it is due.
+        Returns:
+            bool: True if no notification is overdue
+        """
+        for address, client in list(self._clients.items()):
+            if client._streaming and (client.next_sample is None or client.next_sample + self.block_count <= self.samples_due(address)):
+                return False
+        return True
+
+    def packet(self, address, first):
+        """
+        One notification of block_count samples starting at sample number first.
+        Returns:
+            bytearray: The notification, or None if drop injection lost it
+        """
+        if self.drop_rate and self.rng.random() < self.drop_rate:
+            self.notifications_dropped[address] = self.notifications_dropped.get(address, 0) + 1
+            return None
+        index = first + np.arange(self.block_count)
+        samples = np.zeros(self.block_count, dtype=self.SAMPLE_DTYPE)
+        samples['counter'] = index % 256
+        samples['channels'] = self.signal.waveform_values(index).astype(np.int16)
+        self.notifications_sent[address] = self.notifications_sent.get(address, 0) + 1
+        return bytearray(samples.tobytes())
+
+    def stats(self):
+        """
+        Snapshot of the emulator counters.
+        Returns:
+            dict: Address -> notifications sent and dropped
+        """
+        return {address: {'notifications_sent': sent, 'notifications_dropped': self.notifications_dropped.get(address, 0)}
+                for address, sent in self.notifications_sent.items()}
+
+class FakeBleakClient:
+    """
+    Stand-in for bleak.BleakClient with the part of its API used by Chords_BLE. Notifications are delivered by a task on
+    the event loop that called start_notify, like bleak's callbacks.
+    Attributes:
+        address (str): Device address
+        is_connected (bool): Whether the link is up
+    """
+    def __init__(self, emulator, address):
+        self.emulator = emulator
+        self.address = address
+        self.is_connected = False
+        self.next_sample = None    # Sample number of the next notification, set once notifications start
+        self._streaming = False
+        self._task = None
+
+    async def connect(self):
+        """Connect, failing like bleak while the device is out of range."""
+        await asyncio.sleep(0.01)
+        if not self.emulator.available(self.address):
+            raise RuntimeError(f"Device with address {self.address} was not found")
+        self.emulator._start.setdefault(self.address, self.emulator.clock())
+        self.emulator._clients[self.address] = self
+        self.is_connected = True
+        return True
+
+    async def disconnect(self):
+        """Disconnect and stop the notifications."""
+        self.lose_link()
+        return True
+
+    async def write_gatt_char(self, uuid, data, response=False):
+        """Control characteristic: START and STOP streaming."""
+        if not self.is_connected:
+            raise RuntimeError("Not connected")
+        if bytes(data) == b"START":
+            self._streaming = True
+        elif bytes(data) == b"STOP":
+            self._streaming = False
+
+    async def start_notify(self, uuid, callback):
+        """Deliver the device's samples to callback(sender, data) from now on."""
+        if not self.is_connected:
+            raise RuntimeError("Not connected")
+        self._task = asyncio.get_running_loop().create_task(self._notify(callback))
+
+    def lose_link(self):
+        """Drop the connection without telling the host, like a device going out of range."""
+        self.is_connected = False
+        self._streaming = False
+        if self.emulator._clients.get(self.address) is self:
+            del self.emulator._clients[self.address]
+        if self._task:
+            self._task.get_loop().call_soon_threadsafe(self._task.cancel)
+            self._task = None
+
+    async def _notify(self, callback):
+        """Send every notification that is due, then sleep until the next one."""
+        block = self.emulator.block_count
+        self.next_sample = self.emulator.samples_due(self.address) // block * block    # Samples produced before this connection are lost
+        interval = block / self.emulator.sampling_rate
+        while self.is_connected:
+            due = self.emulator.samples_due(self.address)
+            while self._streaming and self.next_sample + block <= due:
+                packet = self.emulator.packet(self.address, self.next_sample)
+                if packet is not None:
+                    callback(None, packet)
+                self.next_sample += block
+            await asyncio.sleep(interval)
+
+def main():
+    """
+    Command line entry point: run an emulated board until interrupted.
+    """
+    parser = argparse.ArgumentParser(description='Emulate a CHORDS USB board on a pseudo-terminal')
+    parser.add_argument('--board', default='NPG-LITE', choices=sorted(Chords_USB.supported_boards), help='Board to emulate')
+    parser.add_argument('--rate', type=float, help='Override the sampling rate in Hz (e.g. 4000 for overdrive tests)')
+    parser.add_argument('--waveform', default='sine', choices=BoardEmulator.WAVEFORMS, help='Signal shape')
+    parser.add_argument('--corrupt-rate', type=float, default=0.0, help='Probability of corrupting a byte in a packet')
+    parser.add_argument('--drop-rate', type=float, default=0.0, help='Probability of dropping a packet')
+    parser.add_argument('--counter-jump-rate', type=float, default=0.0, help='Probability of a counter jump before a packet')
+    parser.add_argument('--seed', type=int, help='Random seed for noise and fault injection')
+    args = parser.parse_args()
+
+    emulator = BoardEmulator(args.board, args.rate, args.waveform, args.corrupt_rate, args.drop_rate, args.counter_jump_rate, args.seed)
+    port = emulator.start()
+    print(f"Emulating {emulator.board}: {emulator.num_channels} channels at {emulator.sampling_rate} Hz on {port}")
+    print(f"Connect with: CHORDSPY_SERIAL_PORTS={port} python -m chordspy.connection --protocol usb")
+    try:
+        while True:
+            time.sleep(5)
+            print(emulator.stats())
+    except KeyboardInterrupt:
+        print("\nStopping emulator")
+    finally:
+        emulator.stop()
+
+if __name__ == "__main__":
+    main()
@@ -4,9 +4,13 @@ import pyqtgraph as pg  # For real-time plotting
 from pyqtgraph.Qt import QtWidgets, QtCore  # PyQt components for GUI
 import numpy as np
 import time
+from chordspy.ring_buffer import RingBuffer
+from chordspy.shared_ring import SharedRingReader
 
 # Initialize global variables
 inlet = None
+ring = None       # Shared-memory ring of a local ChordsPy connection, read in place instead of through LSL
+last_seq = 0
 data = None
 num_channels = 6  # Default number of channels
 curves = []
@@ -16,6 +20,9 @@ stream_active = True
 
 def update_plots():
     global data, last_data_time, stream_active
+    if ring is not None:
+        update_plots_from_ring()
+        return
     if inlet is None or not stream_active:
         return
     
@@ -25,13 +32,12 @@ def update_plots():
     if samples:
         last_data_time = time.time()
         # Update data buffer
-        for sample in samples:
-            data = np.roll(data, -1, axis=1)  # Shift data left
-            data[:, -1] = sample[:num_channels]  # Add new channel data to the right end of the array
+        data.extend(np.asarray(samples)[:, :num_channels])  # Append the whole chunk to the ring buffer
 
         # Update the curves with the new data
+        window = data.latest()
         for i in range(num_channels):
-            curves[i].setData(data[i])
+            curves[i].setData(window[i])
     else:
         # Check if data not received for more than 2 seconds
         if last_data_time and (time.time() - last_data_time) > 2:
@@ -41,8 +47,35 @@ def update_plots():
             timer.stop()
             win.close()
 
+def update_plots_from_ring():
+    global last_data_time, stream_active, last_seq
+    if not stream_active:
+        return
+    seq = ring.write_seq
+    if seq != last_seq:
+        last_seq = seq
+        last_data_time = time.time()
+        window = ring.latest(min(2000, ring.capacity))    # View into shared memory, no copy
+        for i in range(num_channels):
+            curves[i].setData(window[i])
+    elif ring.closed or (last_data_time and (time.time() - last_data_time) > 2):
+        stream_active = False
+        lsl_label.setText("LSL Status: Stream disconnected")
+        QtWidgets.QApplication.processEvents()
+        timer.stop()
+        win.close()
+
 def plot_lsl_data():
-    global inlet, num_channels, data, last_data_time, stream_active
+    global inlet, num_channels, data, last_data_time, stream_active, ring
+
+    try:
+        ring = SharedRingReader()    # A ChordsPy connection on this machine
+        num_channels = ring.num_channels
+        last_data_time = time.time()
+        print(f"Reading {num_channels} channels from the ChordsPy shared memory ring.")
+        return init_gui()
+    except FileNotFoundError:
+        ring = None
 
     print("Searching for available LSL streams...")
     streams = resolve_streams()                         # Discover available LSL streams
@@ -74,7 +107,7 @@ def plot_lsl_data():
     print(f"Detected {num_channels} channels.")
     
     # Initialize data buffer based on the number of channels
-    data = np.zeros((num_channels, 2000))  # Buffer to hold the last 2000 samples for each channel
+    data = RingBuffer(num_channels, 2000)  # Buffer to hold the last 2000 samples for each channel
 
     return init_gui()
 
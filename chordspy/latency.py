@@ -0,0 +1,225 @@
+"""
+End-to-end latency probe, from the bytes a device sends to the samples an LSL consumer receives.
+With a LatencyProbe on Connection.latency_probe, every chunk is stamped with pylsl.local_clock() as it passes each
+stage of the pipeline:
+- emit     the source produced the newest sample of the chunk (only known for simulated sources, see emit_time)
+- read     the transport got the chunk's bytes: Chords_USB.read_data right after the serial read, the BLE
+           notification handler on entry, the WiFi reader right after recv()
+- publish  Connection.deliver_samples took the chunk off the sample queue and stamped its samples
+- push     the LSL sink returned from push_chunk
+- receive  a consumer (ReferenceConsumer) pulled the chunk's newest sample from an inlet
+Chunks are followed through the stages by the LSL timestamp of their newest sample, which travels with the samples to
+the consumer. The probe reports the time spent between consecutive stages:
+- serial   emit -> read       bytes waiting in the device, OS and serial buffers
+- queue    read -> publish    decoding, the sample queue and Connection pacing
+- sink     publish -> push    the LSL sink queue and push_chunk
+- lsl      push -> receive    LSL transport plus the consumer's polling timer
+- total    first stamped stage -> receive
+
+Usage:
+    probe = LatencyProbe()
+    manager = Connection()
+    manager.latency_probe = probe       # Before connecting, the LSL sink is created with the stream
+    manager.connect_usb()
+    consumer = ReferenceConsumer(probe, manager.stream_name, poll_interval=0.01).start()
+    ...
+    print(probe.format_report())
+"""
+
+# Importing necessary libraries
+import time
+import threading
+import numpy as np
+from pylsl import local_clock
+
+STAGES = ('emit', 'read', 'publish', 'push', 'receive')
+INTERVALS = (('serial', 'emit', 'read'), ('queue', 'read', 'publish'), ('sink', 'publish', 'push'), ('lsl', 'push', 'receive'))
+PERCENTILES = (50, 95, 99)
+
+def timestamp_key(timestamp):
+    """Dictionary key of an LSL timestamp, to the microsecond."""
+    return int(round(timestamp * 1e6))
+
+class LatencyProbe:
+    """
+    Per-chunk stage timestamps and the latency percentiles derived from them.
+    Attributes:
+        stamps (numpy.ndarray): (max_chunks, len(STAGES)) local_clock() stamps, NaN where a stage was not reached
+        chunks (int): Chunks stamped since the last reset, the oldest rows are reused beyond max_chunks
+        emit_time (callable): Maps the unwrapped counter of a sample to the time the source produced it, or None
+    """
+    def __init__(self, max_chunks=100000, emit_time=None):
+        """
+        Initialize an empty probe.
+        Args:
+            max_chunks (int, optional): Chunks kept for the report. Defaults to 100000.
+            emit_time (callable, optional): Emission time lookup of a simulated source, e.g. BoardEmulator.emit_time
+        """
+        self.max_chunks = max_chunks
+        self.emit_time = emit_time
+        self.stamps = np.full((max_chunks, len(STAGES)), np.nan)
+        self.chunks = 0
+        self._keys = [None] * max_chunks    # Key of each row, to forget it when the row is reused
+        self._rows = {}                     # Key -> row of the chunks being followed
+
+    def reset(self):
+        """Forget every stamped chunk, e.g. after a warm-up period."""
+        self.stamps[:] = np.nan
+        self.chunks = 0
+        self._keys = [None] * self.max_chunks
+        self._rows = {}
+
+    def published(self, block, timestamps):
+        """
+        Start following a chunk. Called by Connection.deliver_samples before the chunk is handed to the sinks.
+        Args:
+            block (SampleBlock): Block taken off the sample queue, its timestamp is the read time
+            timestamps (numpy.ndarray): LSL timestamps assigned to its samples
+        """
+        now = local_clock()
+        row = self.chunks % self.max_chunks
+        self._rows.pop(self._keys[row], None)
+        key = timestamp_key(timestamps[-1])
+        self._keys[row] = key
+        self.stamps[row] = np.nan
+        if self.emit_time is not None and block.counters is not None and len(block.counters):
+            self.stamps[row, 0] = self.emit_time(int(block.counters[-1]))
+        self.stamps[row, 1] = block.timestamp
+        self.stamps[row, 2] = now
+        self._rows[key] = row
+        self.chunks += 1
+
+    def pushed(self, timestamps):
+        """Stamp the push of a chunk to LSL. Called by LslSink after push_chunk."""
+        now = local_clock()
+        row = self._rows.get(timestamp_key(timestamps[-1]))
+        if row is not None:
+            self.stamps[row, 3] = now
+
+    def received(self, timestamps):
+        """
+        Stamp the chunks whose newest sample is among samples just pulled by a consumer.
+        Args:
+            timestamps (list): Timestamps returned by pull_chunk
+        """
+        now = local_clock()
+        for timestamp in timestamps:
+            row = self._rows.get(timestamp_key(timestamp))
+            if row is not None and np.isnan(self.stamps[row, 4]):
+                self.stamps[row, 4] = now
+
+    def intervals(self):
+        """
+        Latency of every chunk per interval.
+        Returns:
+            dict: Interval name -> numpy array of seconds, for the chunks that reached both stages
+        """
+        stamps = self.stamps[:min(self.chunks, self.max_chunks)]
+        result = {}
+        for name, first, last in INTERVALS:
+            values = stamps[:, STAGES.index(last)] - stamps[:, STAGES.index(first)]
+            result[name] = values[np.isfinite(values)]
+        start = stamps[:, 0] if self.emit_time is not None else stamps[:, 1]
+        total = stamps[:, 4] - start
+        result['total'] = total[np.isfinite(total)]
+        return result
+
+    def report(self):
+        """
+        Latency percentiles per interval.
+        Returns:
+            dict: Interval name -> {'count', 'p50', 'p95', 'p99', 'max'} in seconds (None without data)
+        """
+        report = {}
+        for name, values in self.intervals().items():
+            entry = {'count': len(values)}
+            for p in PERCENTILES:
+                entry[f'p{p}'] = float(np.percentile(values, p)) if len(values) else None
+            entry['max'] = float(values.max()) if len(values) else None
+            report[name] = entry
+        return report
+
+    def format_report(self):
+        """
+        The report as a table in milliseconds.
+        Returns:
+            str: One line per interval
+        """
+        lines = [f"{'stage':<8} {'chunks':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}"]
+        for name, entry in self.report().items():
+            if not entry['count']:
+                continue
+            values = ''.join(f" {entry[k] * 1e3:>8.3f}" for k in ('p50', 'p95', 'p99', 'max'))
+            lines.append(f"{name:<8} {entry['count']:>7}{values}")
+        return '\n'.join(lines)
+
+class ReferenceConsumer:
+    """
+    LSL consumer that stamps what it receives, standing in for apps like keystroke.py or game.py.
+    Attributes:
+        probe (LatencyProbe): Probe to stamp
+        stream_name (str): Name of the LSL stream to resolve
+        poll_interval (float): Seconds between polls, like an app's timer; 0 wakes up on every chunk
+        samples_received (int): Samples pulled so far
+        ready (threading.Event): Set once the inlet is open
+    """
+    def __init__(self, probe, stream_name, poll_interval=0.0):
+        """
+        Initialize the consumer. Nothing is resolved until start() is called.
+        Args:
+            probe (LatencyProbe): Probe to stamp
+            stream_name (str): Name of the LSL stream, e.g. Connection.stream_name
+            poll_interval (float, optional): Seconds between polls. Defaults to 0 (wake up on every chunk).
+        """
+        self.probe = probe
+        self.stream_name = stream_name
+        self.poll_interval = poll_interval
+        self.samples_received = 0
+        self.ready = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """
+        Start resolving the stream and pulling from it in a background thread. The stream may appear later; ready is set
+        once the inlet is open.
+        Returns:
+            ReferenceConsumer: self
+        """
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop pulling."""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    def _run(self):
+        """Consumer loop: wait for the stream, then pull chunks and stamp them until stopped."""
+        from pylsl import StreamInlet, resolve_byprop
+        streams = []
+        while not streams:
+            if self._stop_event.is_set():
+                return
+            streams = resolve_byprop('name', self.stream_name, timeout=1.0)
+        inlet = StreamInlet(streams[0])
+        inlet.open_stream(10.0)
+        self.ready.set()
+        while not self._stop_event.is_set():
+            if self.poll_interval:
+                samples, timestamps = inlet.pull_chunk(timeout=0.0)
+            else:
+                sample, timestamp = inlet.pull_sample(timeout=0.1)    # pull_chunk with a timeout waits for a full buffer
+                samples, timestamps = inlet.pull_chunk(timeout=0.0)
+                if timestamp is not None:
+                    timestamps = [timestamp] + list(timestamps)
+            if timestamps:
+                self.probe.received(timestamps)
+                self.samples_received += len(timestamps)
+            if self.poll_interval:
+                time.sleep(self.poll_interval)
+        inlet.close_stream()
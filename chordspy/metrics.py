@@ -0,0 +1,270 @@
+"""
+In-process metrics registry with Prometheus text exposition.
+Three kinds of metrics are updated directly from the acquisition threads:
+- Counter    monotonically increasing total (inc)
+- Gauge      value that goes up and down (set, inc)
+- Histogram  fixed buckets chosen at creation; observe() is a bisect and two additions, observe_many() takes a
+             numpy array of values at once
+Updates take no lock: each metric is normally written by a single thread and readers only need a recent value, so
+a scrape can at worst see a histogram whose count is one observation ahead of its buckets. Only creating a metric or
+a new label combination takes the registry lock.
+
+Values that already live elsewhere (queue depths, StreamStats loss counters, sink counters) are not copied on the hot
+path: a collector function registered with add_collector() reads them when /metrics is scraped.
+
+Usage:
+    from chordspy.metrics import REGISTRY
+    parse = REGISTRY.histogram('chordspy_decode_seconds', 'Time to decode one chunk', ['transport'], DURATION_BUCKETS)
+    parse.labels(transport='usb').observe(0.0002)
+    print(REGISTRY.render())
+"""
+
+# Importing necessary libraries
+import math
+import bisect
+import threading
+import numpy as np
+
+DURATION_BUCKETS = (1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3, 1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0)
+INTERVAL_BUCKETS = (0.001, 0.002, 0.005, 0.01, 0.015, 0.02, 0.03, 0.05, 0.075, 0.1, 0.2, 0.5, 1.0)
+
+def format_value(value):
+    """Format a sample value the way the Prometheus text format expects."""
+    if value is None:
+        return 'NaN'
+    value = float(value)
+    if math.isnan(value):
+        return 'NaN'
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(int(value)) if value.is_integer() and abs(value) < 1e15 else repr(value)
+
+def format_labels(labels):
+    """
+    Format a label set.
+    Args:
+        labels (dict or tuple): Label names and values
+    Returns:
+        str: '{name="value",...}', or '' without labels
+    """
+    items = labels.items() if isinstance(labels, dict) else labels
+    if not items:
+        return ''
+    escaped = (f'{name}="{escape(value)}"' for name, value in items)
+    return '{' + ','.join(escaped) + '}'
+
+def escape(value):
+    """Escape a label value: backslash, double quote and line feed."""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+class Counter:
+    """
+    Monotonically increasing total.
+    Attributes:
+        value (float): Current total
+    """
+    kind = 'counter'
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        """Add a non-negative amount."""
+        self.value += amount
+
+    def samples(self, name, labels):
+        """Exposition rows: [(name, labels, value)]."""
+        return [(name, labels, self.value)]
+
+class Gauge:
+    """
+    Value that can go up and down.
+    Attributes:
+        value (float): Current value
+    """
+    kind = 'gauge'
+
+    def __init__(self):
+        self.value = 0
+
+    def set(self, value):
+        """Set the value."""
+        self.value = value
+
+    def inc(self, amount=1):
+        """Add an amount, negative to decrease."""
+        self.value += amount
+
+    def samples(self, name, labels):
+        """Exposition rows: [(name, labels, value)]."""
+        return [(name, labels, self.value)]
+
+class Histogram:
+    """
+    Distribution of observed values in fixed buckets.
+    Attributes:
+        buckets (tuple): Upper bounds of the buckets, increasing; a +Inf bucket is implied
+        counts (list): Observations per bucket (not cumulative), the last entry being the +Inf bucket
+        sum (float): Sum of the observed values
+        count (int): Number of observations
+    """
+    kind = 'histogram'
+
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._bounds = np.asarray(self.buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        """Record one value."""
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def observe_many(self, values):
+        """
+        Record an array of values with one searchsorted/bincount instead of a Python loop.
+        Args:
+            values (array-like): Values to record
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if not len(values):
+            return
+        per_bucket = np.bincount(np.searchsorted(self._bounds, values, side='left'), minlength=len(self.counts))
+        for i in np.flatnonzero(per_bucket):
+            self.counts[i] += int(per_bucket[i])
+        self.sum += float(values.sum())
+        self.count += len(values)
+
+    def samples(self, name, labels):
+        """Exposition rows: cumulative buckets, sum and count."""
+        rows = []
+        total = 0
+        for bound, count in zip(self.buckets + (math.inf,), self.counts):
+            total += count
+            rows.append((name + '_bucket', tuple(labels) + (('le', format_value(bound)),), total))
+        rows.append((name + '_sum', labels, self.sum))
+        rows.append((name + '_count', labels, self.count))
+        return rows
+
+class Family:
+    """
+    A named metric with zero or more label dimensions, holding one child metric per label combination.
+    Attributes:
+        name (str): Metric name
+        help (str): Description
+        label_names (tuple): Names of the label dimensions
+        kind (str): 'counter', 'gauge' or 'histogram'
+    """
+    def __init__(self, name, help, cls, label_names=(), **options):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(label_names)
+        self.kind = cls.kind
+        self._cls = cls
+        self._options = options
+        self._children = {}
+        self._lock = threading.Lock()
+        if not self.label_names:
+            self._children[()] = cls(**options)
+
+    def labels(self, **labels):
+        """
+        Child metric of a label combination, created on first use. Keep the result to avoid the lookup on hot paths.
+        Returns:
+            Counter, Gauge or Histogram: The child metric
+        """
+        key = tuple((name, labels[name]) for name in self.label_names)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._cls(**self._options))
+        return child
+
+    def __getattr__(self, attribute):
+        """Metrics without labels can be updated directly on the family (inc, set, observe, ...)."""
+        if attribute.startswith('_') or self.label_names:
+            raise AttributeError(attribute)
+        return getattr(self._children[()], attribute)
+
+    def samples(self):
+        """Exposition rows of every child."""
+        rows = []
+        for key, child in list(self._children.items()):
+            rows.extend(child.samples(self.name, key))
+        return rows
+
+class Registry:
+    """
+    Collection of metric families and collector functions, rendered together in the Prometheus text format.
+    """
+    def __init__(self):
+        self._families = {}
+        self._collectors = {}
+        self._lock = threading.Lock()
+
+    def _family(self, name, help, cls, label_names, **options):
+        """Get or create a family, checking that an existing one has the same kind and labels."""
+        with self._lock:
+            family = self._families.get(name)
+            if family is None:
+                family = self._families[name] = Family(name, help, cls, label_names, **options)
+            elif family.kind != cls.kind or family.label_names != tuple(label_names):
+                raise ValueError(f"Metric {name} already registered as a {family.kind} with labels {family.label_names}")
+            return family
+
+    def counter(self, name, help, label_names=()):
+        """Get or create a counter family."""
+        return self._family(name, help, Counter, label_names)
+
+    def gauge(self, name, help, label_names=()):
+        """Get or create a gauge family."""
+        return self._family(name, help, Gauge, label_names)
+
+    def histogram(self, name, help, label_names=(), buckets=DURATION_BUCKETS):
+        """Get or create a histogram family with fixed buckets."""
+        return self._family(name, help, Histogram, label_names, buckets=buckets)
+
+    def add_collector(self, key, collect):
+        """
+        Register a function called at every scrape, replacing any collector registered under the same key.
+        Args:
+            key (str): Identifies the collector, e.g. 'connection'
+            collect (callable): Returns a list of (name, kind, help, [(labels dict, value), ...])
+        """
+        with self._lock:
+            self._collectors[key] = collect
+
+    def remove_collector(self, key):
+        """Unregister a collector."""
+        with self._lock:
+            self._collectors.pop(key, None)
+
+    def render(self):
+        """
+        Current values in the Prometheus text exposition format (version 0.0.4).
+        Returns:
+            str: The exposition
+        """
+        lines = []
+        for family in list(self._families.values()):
+            lines.append(f"# HELP {family.name} {family.help}")
+            lines.append(f"# TYPE {family.name} {family.kind}")
+            for name, labels, value in family.samples():
+                lines.append(f"{name}{format_labels(labels)} {format_value(value)}")
+        for key, collect in list(self._collectors.items()):
+            try:
+                metrics = collect()
+            except Exception as e:
+                print(f"Metrics collector {key} failed: {str(e)}")
+                continue
+            for name, kind, help, values in metrics:
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in values:
+                    lines.append(f"{name}{format_labels(labels)} {format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+REGISTRY = Registry()    # Process-wide registry served by app.py at /metrics
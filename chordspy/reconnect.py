@@ -0,0 +1,85 @@
+"""
+Exponential backoff for the transport reconnect loops.
+When a device goes away (USB cable unplugged, BLE link lost, WiFi websocket closed) Connection keeps its LSL outlet,
+recording and sinks alive and tries to reconnect the transport after 0.5 s, 1 s, 2 s, ... up to a maximum delay, so a
+device that comes back is picked up again within that maximum plus the time it takes to connect. A random jitter
+keeps several clients from retrying in lockstep.
+"""
+
+# Importing necessary libraries
+import time
+import random
+import asyncio
+
+class Backoff:
+    """
+    Delays of successive reconnect attempts.
+    Attributes:
+        initial (float): Delay before the first attempt in seconds
+        maximum (float): Largest delay in seconds, bounds the time to resume once the device is back
+        factor (float): Growth of the delay after every failed attempt
+        jitter (float): Fraction of the delay added or removed at random
+        attempts (int): Attempts made since the last reset
+    """
+    def __init__(self, initial=0.5, maximum=5.0, factor=2.0, jitter=0.1):
+        """
+        Initialize the backoff.
+        Args:
+            initial (float, optional): Delay before the first attempt. Defaults to 0.5 s.
+            maximum (float, optional): Largest delay. Defaults to 5 s.
+            factor (float, optional): Growth factor. Defaults to 2.
+            jitter (float, optional): Random fraction of the delay. Defaults to 0.1.
+        """
+        self.initial = initial
+        self.maximum = maximum
+        self.factor = factor
+        self.jitter = jitter
+        self.attempts = 0
+
+    def reset(self):
+        """Start over from the initial delay, after a successful connection."""
+        self.attempts = 0
+
+    def next_delay(self):
+        """
+        Delay before the next attempt, counting the attempt.
+        Returns:
+            float: Seconds to wait
+        """
+        delay = min(self.maximum, self.initial * self.factor ** self.attempts)
+        self.attempts += 1
+        return max(0.0, delay * (1 + random.uniform(-self.jitter, self.jitter)))
+
+    def wait(self, keep_waiting, step=0.1):
+        """
+        Sleep for the next delay in short steps, giving up early when keep_waiting() turns false.
+        Args:
+            keep_waiting (callable): Returns False to abandon the wait (e.g. Connection.cleanup was called)
+            step (float, optional): Seconds between checks. Defaults to 0.1.
+        Returns:
+            bool: True if the full delay elapsed, False if the wait was abandoned
+        """
+        deadline = time.monotonic() + self.next_delay()
+        while keep_waiting():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return True
+            time.sleep(min(step, remaining))
+        return False
+
+    async def async_wait(self, keep_waiting, step=0.1):
+        """
+        Same as wait(), for reconnect loops running on an asyncio event loop (the shared loop of the BLE devices).
+        Args:
+            keep_waiting (callable): Returns False to abandon the wait
+            step (float, optional): Seconds between checks. Defaults to 0.1.
+        Returns:
+            bool: True if the full delay elapsed, False if the wait was abandoned
+        """
+        deadline = time.monotonic() + self.next_delay()
+        while keep_waiting():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return True
+            await asyncio.sleep(min(step, remaining))
+        return False
@@ -0,0 +1,161 @@
+"""
+Headless recording from the command line, built on Connection.
+Connects one device, records it in any recording format for a fixed duration or until Ctrl+C / SIGTERM, prints a
+stats line every few seconds and shuts down in a fixed order: the transport stops, every sample already read is
+delivered and written, the files are closed, then the device is released and a final loss/latency summary is printed.
+Only the requested transport is loaded (bleak for BLE only); Flask and Qt are never imported.
+
+Usage:
+$ python -m chordspy.record --protocol usb --duration 60 --format bin
+$ python -m chordspy.record --protocol ble --ble-address AA:BB:CC:DD:EE:FF --format edf --channels 2 --no-lsl
+$ chordspy-record --protocol wifi --output session1 --stats-interval 10
+
+The exit status is 0 when the whole recording was written, 1 if the device could not be connected or the writer failed.
+"""
+
+# Importing necessary libraries
+import sys
+import time
+import signal
+import argparse
+import threading
+from chordspy.connection import Connection
+
+FORMATS = ('csv', 'bin', 'zbin', 'edf', 'bdf')
+
+def connect(manager, args):
+    """
+    Connect the requested transport and wait for the stream to start.
+    Args:
+        manager (Connection): Connection manager
+        args (argparse.Namespace): Parsed command line
+    Returns:
+        bool: True once samples are flowing, False if the device could not be connected in time
+    """
+    if args.protocol == 'usb':
+        return manager.connect_usb()
+    if args.protocol == 'wifi':
+        return manager.connect_wifi()
+
+    # connect_ble runs the BLE event loop until the session ends, the stream starts with the first notification
+    thread = threading.Thread(target=manager.connect_ble, args=(args.ble_address,), daemon=True)
+    thread.start()
+    deadline = time.monotonic() + args.connect_timeout
+    while not manager.stream_active and thread.is_alive() and time.monotonic() < deadline:
+        time.sleep(0.1)
+    return manager.stream_active
+
+def lost_to_overload(manager, sinks):
+    """
+    Samples dropped, rejected or decimated so far by the overload policies of the sample queue and of the sinks.
+    Args:
+        manager (Connection): Connection manager
+        sinks (dict): Sinks by name, captured before cleanup detaches them
+    Returns:
+        int: Lost samples
+    """
+    queues = [manager.sample_queue] + [getattr(sink, 'queue', None) for sink in sinks.values()]
+    return sum(queue.overflow_samples + queue.rejected_samples + queue.decimated_samples for queue in queues if queue)
+
+def format_lag(sink):
+    """Last and worst lag of a sink in milliseconds."""
+    return f"{sink.last_lag_seconds * 1e3:.1f} ms (max {sink.max_lag_seconds * 1e3:.1f} ms)"
+
+def print_stats(manager, recorder, elapsed):
+    """Print one progress line: samples written, losses and the recording lag."""
+    stream = manager.stream_stats()
+    print(f"[{elapsed:7.1f} s] {recorder.rows_written} samples written, "
+          f"{stream.get('missing_samples', 0)} missing, {lost_to_overload(manager, manager.sinks.sinks)} lost to overload, "
+          f"recording lag {format_lag(recorder)}", flush=True)
+
+def print_summary(recorder, sinks, stream, overload_lost, elapsed):
+    """
+    Print the final summary, after the recording has been closed.
+    Args:
+        recorder (RecordingWriter): Writer of the finished recording
+        sinks (dict): Sinks attached at shutdown, by name
+        stream (dict): Connection.stream_stats() taken before the transport was released
+        overload_lost (int): Samples lost to the overload policies
+        elapsed (float): Recorded seconds
+    """
+    print("\nRecording summary")
+    print(f"  file:              {recorder.filename}")
+    print(f"  duration:          {elapsed:.1f} s")
+    print(f"  samples written:   {recorder.rows_written} ({recorder.bytes_written} bytes)")
+    print(f"  missing samples:   {stream.get('missing_samples', 0)} (lost between device and host)")
+    print(f"  duplicate packets: {stream.get('duplicate_packets', 0)}")
+    print(f"  overload losses:   {overload_lost}")
+    if stream.get('reconnects'):
+        print(f"  reconnects:        {stream['reconnects']} ({stream['outage_seconds']:.1f} s without the device)")
+    if stream.get('measured_rate'):
+        print(f"  sampling rate:     {stream['measured_rate']:.2f} Hz (drift {stream.get('drift_ppm', 0):.0f} ppm)")
+    for name, sink in sinks.items():
+        print(f"  {name + ' lag:':<18} {format_lag(sink)}")
+    if recorder.error:
+        print(f"  writer error:      {recorder.error}")
+
+def main():
+    """
+    Command line entry point of the headless recorder.
+    The main execution flow:
+    1. Parse command line arguments and configure the connection manager
+    2. Connect the device and start the recording
+    3. Print stats until the duration has elapsed, a stop signal arrives or the stream ends
+    4. Shut down (recording drained and closed, then the transport) and print the summary
+    """
+    parser = argparse.ArgumentParser(description='Record a device without the web interface')
+    parser.add_argument('--protocol', choices=['usb', 'wifi', 'ble'], required=True, help='Connection protocol to use (usb|wifi|ble)')
+    parser.add_argument('--ble-address', help='Direct BLE device address (scans and asks otherwise)')
+    parser.add_argument('--output', help='Filename without extension (default ChordsPy_<timestamp>)')
+    parser.add_argument('--duration', type=float, help='Seconds to record (default: until Ctrl+C)')
+    parser.add_argument('--format', choices=FORMATS, default='csv', help='Recording format (default csv)')
+    parser.add_argument('--channels', type=int, help='Record only the first N channels')
+    parser.add_argument('--no-lsl', action='store_true', help='Do not publish the stream on LSL')
+    parser.add_argument('--stats-interval', type=float, default=5.0, help='Seconds between stats lines, 0 disables them (default 5)')
+    parser.add_argument('--connect-timeout', type=float, default=30.0, help='Seconds to wait for the first BLE samples (default 30)')
+    args = parser.parse_args()
+    if args.channels is not None and args.channels < 1:
+        parser.error("--channels must be at least 1")
+
+    manager = Connection()
+    manager.lsl_enabled = not args.no_lsl
+    manager.recording_channels = args.channels
+    manager.show_rate = False    # The stats lines replace the rate line
+    stop = threading.Event()
+    recorder = None
+    start = None
+    try:
+        if not connect(manager, args):
+            print("Could not connect to the device")
+            return 1
+        # Installed after connecting: Chords_USB sets its own SIGINT handler, which exits without draining the recording
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda signum, frame: stop.set())
+
+        if not manager.start_recording(args.output, args.format):
+            return 1
+        recorder = manager.recorder
+        start = time.monotonic()
+        next_stats = start + args.stats_interval
+        print("Recording... (Press Ctrl+C to stop)")
+        while not stop.is_set() and manager.running and not recorder.error:
+            now = time.monotonic()
+            if args.duration is not None and now - start >= args.duration:
+                break
+            if args.stats_interval and now >= next_stats:
+                print_stats(manager, recorder, now - start)
+                next_stats += args.stats_interval
+            stop.wait(0.1)
+    except KeyboardInterrupt:
+        pass    # Ctrl+C while connecting
+    finally:
+        elapsed = time.monotonic() - start if start is not None else 0.0
+        sinks = dict(manager.sinks.sinks)
+        stream = manager.stream_stats()
+        manager.cleanup()    # Delivers what is queued, closes the recording, then releases the device
+        if recorder is not None:
+            print_summary(recorder, sinks, stream, lost_to_overload(manager, sinks), elapsed)
+    return 1 if recorder is None or recorder.error else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
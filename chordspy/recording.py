@@ -0,0 +1,193 @@
+"""
+Common machinery of the background recording writers (CSV, binary, ...).
+A RecordingWriter never touches the disk on the caller's thread: write() only queues a sample block in a bounded
+SampleQueue. A dedicated thread takes everything that is waiting, hands it to the format-specific write_blocks(),
+flushes (and fsyncs) the open files periodically and, on close(), drains the queue completely before closing them.
+Subclasses implement open_files() and write_blocks() and may override close_files() to finish their file layout.
+Writers are sinks (chordspy.sinks), so Connection attaches the active recording to its SinkBus next to LSL.
+"""
+
+# Importing necessary libraries
+import os
+import time
+import numpy as np
+from chordspy.sample_queue import SampleBlock
+from chordspy.sinks import Sink
+
+class RecordingWriter(Sink):
+    """
+    Base class of the background recording writers.
+    Attributes:
+        filename (str): Path of the main output file
+        num_channels (int): Channels per sample
+        flush_interval (float): Seconds between flushes to the operating system
+        fsync (bool): Also force the data to disk on every flush
+        files (list): Open file objects flushed, fsynced and closed by the writer thread
+        samples_queued (int): Samples accepted by write()
+        rows_written (int): Samples written to the files
+        bytes_written (int): Bytes (characters for text formats) written to the files
+        flushes (int): Periodic flushes performed
+        max_write_seconds (float): Longest time spent formatting and writing one batch
+        max_flush_seconds (float): Longest flush (and fsync)
+    """
+    BATCH_SAMPLES = 20000    # Most samples handed to write_blocks() in one pass
+
+    def __init__(self, filename, num_channels, max_samples=60000, flush_interval=1.0, fsync=True, policy='drop-oldest'):
+        """
+        Initialize the writer. Files are opened by start().
+        Args:
+            filename (str): Path of the main output file
+            num_channels (int): Channels per sample
+            max_samples (int, optional): Capacity of the queue in samples. Defaults to 60000 (two minutes at 500 Hz).
+            flush_interval (float, optional): Seconds between flushes. Defaults to 1.0.
+            fsync (bool, optional): fsync the files on every flush. Defaults to True.
+            policy (str, optional): Overflow policy of the queue, 'block' never loses samples but can hold up the publisher. Defaults to 'drop-oldest'.
+        """
+        super().__init__('recording', max_samples, policy)
+        self.filename = filename
+        self.num_channels = num_channels
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.files = []
+        self.samples_queued = 0
+        self.rows_written = 0
+        self.bytes_written = 0
+        self.flushes = 0
+        self.max_write_seconds = 0.0
+        self.max_flush_seconds = 0.0
+
+    def open_files(self):
+        """Open the output files, append them to self.files and write any header. Runs on the caller's thread."""
+        raise NotImplementedError
+
+    def write_blocks(self, blocks):
+        """
+        Write a batch of queued blocks. Runs on the writer thread.
+        Args:
+            blocks (list): SampleBlock objects, oldest first
+        Returns:
+            int: Bytes (or characters) written
+        """
+        raise NotImplementedError
+
+    def close_files(self):
+        """Finish and close the output files. Runs on the writer thread after the final flush."""
+        for f in self.files:
+            f.close()
+
+    def start(self):
+        """
+        Open the files and start the writer thread.
+        Raises:
+            OSError: If a file cannot be opened
+        """
+        self.open_files()
+        super().start()
+
+    def write(self, samples, counters=None, timestamp=None):
+        """
+        Queue a block of samples for writing. Never blocks unless the writer uses the 'block' policy.
+        Args:
+            samples (array-like): (n, num_channels) samples, or the channel values of one sample
+            counters (array-like, optional): Unwrapped device counters of the samples
+            timestamp (float, optional): local_clock() timestamp of the first sample
+        Returns:
+            bool: False if the writer is closed or failed, True otherwise
+        """
+        samples = np.asarray(samples)
+        if samples.ndim == 1:
+            samples = samples.reshape(1, -1)
+        return self.put(SampleBlock(samples, counters, timestamp))
+
+    def put(self, block, timeout=None):
+        """
+        Queue a block, keeping only the recorded channels.
+        Args:
+            block (SampleBlock): Block to write
+            timeout (float, optional): Longest wait for room under the 'block' policy, see Sink.put
+        Returns:
+            bool: False if the writer is closed or failed, True otherwise
+        """
+        if block.samples.shape[1] > self.num_channels:
+            block = block._replace(samples=block.samples[:, :self.num_channels])
+        if not self.queue.put(block, timeout):
+            return False
+        self.samples_queued += len(block.samples)
+        return True
+
+    def _next_batch(self):
+        """
+        Wait for queued blocks and collect everything already waiting, up to BATCH_SAMPLES.
+        Returns:
+            list: SampleBlock objects, empty when nothing arrived within flush_interval
+        """
+        block = self.queue.get(timeout=self.flush_interval)
+        if block is None:
+            return []
+        blocks = [block]
+        count = len(block.samples)
+        while count < self.BATCH_SAMPLES:
+            block = self.queue.get(timeout=0)    # Take whatever else is already waiting
+            if block is None:
+                break
+            blocks.append(block)
+            count += len(block.samples)
+        return blocks
+
+    def _flush(self):
+        """Flush every file buffer, and fsync if enabled."""
+        start = time.perf_counter()
+        for f in self.files:
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        self.flushes += 1
+        self.max_flush_seconds = max(self.max_flush_seconds, time.perf_counter() - start)
+
+    def _run(self):
+        """Writer loop: write batches, flush periodically, drain and close on shutdown."""
+        last_flush = time.monotonic()
+        try:
+            while True:
+                blocks = self._next_batch()
+                if not blocks:
+                    if self.queue.closed:
+                        break
+                else:
+                    self.measure_lag(blocks[0])
+                    start = time.perf_counter()
+                    self.bytes_written += self.write_blocks(blocks)
+                    self.rows_written += sum(len(b.samples) for b in blocks)
+                    elapsed = time.perf_counter() - start
+                    self.write_seconds.observe(elapsed)
+                    self.max_write_seconds = max(self.max_write_seconds, elapsed)
+
+                if time.monotonic() - last_flush >= self.flush_interval:
+                    self._flush()
+                    last_flush = time.monotonic()
+            self._flush()
+        except Exception as e:
+            self.error = str(e)
+            print(f"Error writing {self.filename}: {self.error}")
+            self.queue.close()
+        finally:
+            try:
+                self.close_files()
+            except Exception as e:
+                self.error = self.error or str(e)
+
+    def stats(self):
+        """
+        Snapshot of the writer and queue counters. Rising depth or overflow means the disk is not keeping up.
+        Returns:
+            dict: Queue depth and overflow, rows and bytes written, flushes and the worst write/flush times
+        """
+        stats = super().stats()
+        stats.update({
+            'rows_written': self.rows_written,
+            'bytes_written': self.bytes_written,
+            'flushes': self.flushes,
+            'max_write_seconds': self.max_write_seconds,
+            'max_flush_seconds': self.max_flush_seconds,
+        })
+        return stats
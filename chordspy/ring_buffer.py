@@ -0,0 +1,123 @@
+"""
+Preallocated ring buffer for multichannel sample windows.
+This module replaces the `np.roll` rolling windows used across ChordsPy. Every sample is written twice (at the write
+index and one capacity further on), so the most recent N samples are always contiguous in memory and can be handed
+out as a zero-copy view. Appending costs O(1) per sample regardless of the window length.
+"""
+
+# Importing necessary libraries
+import numpy as np
+
+class RingBuffer:
+    """
+    Fixed-size multichannel ring buffer with a write index.
+    The buffer is laid out as (num_channels, capacity), the same layout as the rolling `data` windows it replaces,
+    so `latest()` can be used wherever a `data[:, -n:]` slice was used before.
+    Attributes:
+        num_channels (int): Number of channels stored per sample
+        capacity (int): Number of samples kept per channel
+        write_index (int): Position in [0, capacity) where the next sample will be written
+        total_written (int): Total number of samples ever written
+    """
+    def __init__(self, num_channels, capacity, dtype=np.float64, buffer=None):
+        """
+        Initialize a zero-filled ring buffer.
+        Args:
+            num_channels (int): Number of channels stored per sample
+            capacity (int): Number of samples kept per channel
+            dtype (numpy.dtype, optional): Element type. Defaults to float64.
+            buffer (numpy.ndarray, optional): Preallocated (num_channels, 2 * capacity) storage to use instead of a new array, e.g. a view into shared memory. It is not cleared.
+        """
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.num_channels = num_channels
+        self.capacity = capacity
+        self.write_index = 0
+        self.total_written = 0
+        if buffer is None:
+            buffer = np.zeros((num_channels, 2 * capacity), dtype=dtype)   # Mirrored storage, see module docstring
+        elif buffer.shape != (num_channels, 2 * capacity):
+            raise ValueError(f"buffer must have shape {(num_channels, 2 * capacity)}")
+        self._buffer = buffer
+
+    def __len__(self):
+        """Number of valid samples currently held (at most capacity)."""
+        return min(self.total_written, self.capacity)
+
+    @property
+    def shape(self):
+        """Shape of the full window as returned by latest() and snapshot()."""
+        return (self.num_channels, self.capacity)
+
+    def append(self, sample):
+        """
+        Append one sample.
+        Args:
+            sample (array-like): Sequence of num_channels values
+        """
+        index = self.write_index
+        self._buffer[:, index] = sample
+        self._buffer[:, index + self.capacity] = sample
+        self.write_index = (index + 1) % self.capacity
+        self.total_written += 1
+
+    def extend(self, block):
+        """
+        Append a block of samples in at most two slice assignments per half of the mirror.
+        Args:
+            block (array-like): (n_samples, num_channels) array, oldest sample first
+        """
+        block = np.asarray(block)
+        n = len(block)
+        if n == 0:
+            return
+        if n >= self.capacity:     # Only the newest capacity samples survive
+            block = block[-self.capacity:]
+            self.write_index = (self.write_index + n - self.capacity) % self.capacity
+            self.total_written += n - self.capacity
+            n = self.capacity
+
+        columns = block.T
+        start = self.write_index
+        first = min(n, self.capacity - start)    # Samples that fit before wrapping
+        self._buffer[:, start:start + first] = columns[:, :first]
+        self._buffer[:, start + self.capacity:start + self.capacity + first] = columns[:, :first]
+        if first < n:
+            rest = n - first
+            self._buffer[:, :rest] = columns[:, first:]
+            self._buffer[:, self.capacity:self.capacity + rest] = columns[:, first:]
+        self.write_index = (start + n) % self.capacity
+        self.total_written += n
+
+    def latest(self, n=None):
+        """
+        Return the newest samples as a read-only view, oldest first. No data is copied.
+        Args:
+            n (int, optional): Number of samples. Defaults to the full capacity.
+        Returns:
+            numpy.ndarray: (num_channels, n) view that stays valid until the next write wraps over it
+        """
+        if n is None:
+            n = self.capacity
+        if not 0 <= n <= self.capacity:
+            raise ValueError(f"n must be between 0 and {self.capacity}")
+        end = self.write_index + self.capacity
+        view = self._buffer[:, end - n:end]
+        view.flags.writeable = False
+        return view
+
+    def snapshot(self, n=None):
+        """
+        Return an ordered copy of the newest samples that is safe to keep across writes.
+        Args:
+            n (int, optional): Number of samples. Defaults to the full capacity.
+        Returns:
+            numpy.ndarray: (num_channels, n) array, oldest sample first
+        """
+        return self.latest(n).copy()
+
+    def clear(self):
+        """Reset the buffer to zeros and rewind the write index."""
+        self._buffer.fill(0)
+        self.write_index = 0
+        self.total_written = 0
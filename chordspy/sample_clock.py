@@ -0,0 +1,113 @@
+"""
+Counter-derived sample timestamps with online clock-drift correction.
+Host arrival times carry USB/BLE/WiFi batching jitter, but the device counter advances exactly once per sample.
+SampleClock keeps, for every short interval, the chunk that arrived earliest relative to its counter (the one that
+waited least in buffers), fits `arrival_time = offset + period * counter` over a sliding window of those points
+(least squares on the slope, intercept moved down to the earliest arrival so transport latency is not added to every
+sample) and then stamps every sample of a chunk from its unwrapped counter in one vectorized step. The fitted period
+gives the device clock drift against the nominal rate.
+"""
+
+# Importing necessary libraries
+import numpy as np
+
+class SampleClock:
+    """
+    Maps unwrapped device counters to local_clock() timestamps.
+    Attributes:
+        nominal_rate (float): Expected sampling rate in Hz
+        window (int): Number of intervals kept for the fit
+        period (float): Fitted seconds per counter step
+        offset (float): Fitted time of counter value zero
+        drift_ppm (float): Device rate deviation from nominal_rate in parts per million
+        resets (int): Times the fit was restarted because the counter and the host clock disagreed
+    """
+    MIN_SPAN = 1.0        # Seconds of history needed before the slope is fitted instead of assumed nominal
+    BIN_SECONDS = 0.25    # Length of the interval represented by one fit point
+    RESET_ERROR = 1.0     # Seconds of disagreement that make the fit start over (device restart, counter reset)
+
+    def __init__(self, nominal_rate, window=512):
+        """
+        Initialize the clock.
+        Args:
+            nominal_rate (float): Expected sampling rate in Hz
+            window (int, optional): Intervals kept for the fit. Defaults to 512 (about two minutes).
+        """
+        self.nominal_rate = nominal_rate
+        self.window = window
+        self.reset()
+
+    def reset(self):
+        """Forget the fit and its history."""
+        self._counters = np.zeros(self.window)
+        self._times = np.zeros(self.window)
+        self._count = 0          # Points written in total
+        self._bin_start = None   # Arrival time that opened the current interval
+        self._bin_point = None   # (counter, arrival) of the earliest arrival in the current interval
+        self.period = 1.0 / self.nominal_rate
+        self.offset = None
+        self._fit_offset = None  # Intercept of the last fit over committed points
+        self.drift_ppm = 0.0
+        self.resets = getattr(self, 'resets', 0)
+
+    def timestamps(self, counters, arrival_time):
+        """
+        Add a chunk to the fit and return a timestamp for each of its samples.
+        Args:
+            counters (array-like): Unwrapped counters of the chunk's samples, oldest first
+            arrival_time (float): local_clock() time at which the chunk was received
+        Returns:
+            numpy.ndarray: float64 timestamps, one per counter
+        """
+        counters = np.asarray(counters, dtype=np.float64)
+        if not len(counters):
+            return counters
+        last = counters[-1]
+
+        # A counter that lands far away from the current fit means the stream restarted
+        if self.offset is not None and abs(self.offset + self.period * last - arrival_time) > self.RESET_ERROR:
+            self.reset()
+            self.resets += 1
+
+        # Keep the least delayed chunk of the interval, commit it and refit once the interval is over
+        if self._bin_point is None or arrival_time - self.period * last < self._bin_point[1] - self.period * self._bin_point[0]:
+            self._bin_point = (last, arrival_time)
+        if self._bin_start is None:
+            self._bin_start = arrival_time
+        if arrival_time - self._bin_start >= self.BIN_SECONDS:
+            index = self._count % self.window
+            self._counters[index], self._times[index] = self._bin_point
+            self._count += 1
+            self._bin_point = None
+            self._bin_start = None
+            self.fit()
+
+        # Between refits only the intercept can move down, which is O(1). Before the first fit it is the running minimum
+        # since the first chunk, so the stamps never step back while the fit gathers its first interval.
+        candidate = arrival_time - self.period * last
+        if self._fit_offset is not None:
+            self.offset = min(self._fit_offset, candidate)
+        elif self.offset is None:
+            self.offset = candidate
+        else:
+            self.offset = min(self.offset, candidate)
+        return self.offset + self.period * counters
+
+    def fit(self):
+        """Refit period and intercept from the committed points in the window."""
+        n = min(self._count, self.window)
+        x = self._counters[:n]
+        y = self._times[:n]
+        x0 = x.min()    # Fit relative to the oldest point to keep the numbers small
+        dx = x - x0
+
+        if n >= 2 and dx.max() * self.period >= self.MIN_SPAN:
+            mx = dx.mean()
+            my = y.mean()
+            var = np.dot(dx - mx, dx - mx)
+            if var > 0:
+                self.period = float(np.dot(dx - mx, y - my) / var)
+                self.drift_ppm = (1.0 / (self.period * self.nominal_rate) - 1.0) * 1e6
+
+        # Lowest line with the fitted slope that no arrival lies under: latency only ever delays a chunk
+        self._fit_offset = float(np.min(y - self.period * dx)) - self.period * x0
@@ -0,0 +1,180 @@
+"""
+Bounded queue of decoded sample blocks between a transport reader and its consumers.
+By default the producer side never blocks: when the queue is full the oldest blocks are dropped and counted, so a
+stalled consumer cannot stall serial/BLE/WiFi I/O. Three other overflow policies exist for consumers with different
+needs: 'drop-newest' refuses incoming blocks instead (keeps what is queued, for consumers that prefer old data to a
+jump), 'block' makes the producer wait for room (lossless, for consumers that must see every sample; a put() timeout
+bounds the wait, after which the oldest blocks are dropped) and 'decimate' thins incoming blocks to every 2nd, 4th,
+... sample until they fit (keeps the whole time span at a lower rate, for displays). Depth, high-water mark and overflow counters are plain attributes so they can be read from any thread to
+size the buffer for long sessions.
+"""
+
+# Importing necessary libraries
+import time
+import threading
+from collections import deque, namedtuple
+
+# One decoded block: samples is (n, num_channels), counters the unwrapped device counters (or None), timestamp the host
+# arrival time, or the timestamp of the first sample once stamped, and timestamps the per-sample timestamps (or None)
+SampleBlock = namedtuple('SampleBlock', ['samples', 'counters', 'timestamp', 'timestamps'], defaults=[None])
+
+POLICIES = ('drop-oldest', 'drop-newest', 'block', 'decimate')
+
+def decimate_block(block, step):
+    """
+    Keep every step-th sample of a block, with its counter and timestamp.
+    Args:
+        block (SampleBlock): Block to thin
+        step (int): Keep one sample out of step
+    Returns:
+        SampleBlock: The thinned block
+    """
+    return SampleBlock(block.samples[::step],
+                       None if block.counters is None else block.counters[::step],
+                       block.timestamp,
+                       None if block.timestamps is None else block.timestamps[::step])
+
+class SampleQueue:
+    """
+    Thread-safe bounded FIFO of SampleBlock objects, bounded by the total number of queued samples.
+    Attributes:
+        max_samples (int): Capacity of the queue in samples
+        policy (str): What put() does when a block does not fit: 'drop-oldest', 'drop-newest', 'block' or 'decimate'
+        depth (int): Samples currently queued
+        max_depth (int): Highest depth seen since creation
+        blocks_in (int): Blocks accepted by put()
+        samples_in (int): Samples accepted by put()
+        samples_out (int): Samples handed out by get()
+        overflow_blocks (int): Blocks dropped because the queue was full
+        overflow_samples (int): Samples dropped because the queue was full
+        rejected_blocks (int): Incoming blocks refused by the 'drop-newest' policy
+        rejected_samples (int): Samples of the refused blocks
+        decimated_samples (int): Samples left out of thinned blocks by the 'decimate' policy
+        blocked_seconds (float): Total time put() waited for room under the 'block' policy
+        block_timeouts (int): Waits for room that ran out, after which the oldest blocks were dropped
+        closed (bool): True once close() was called
+    """
+    def __init__(self, max_samples=5000, policy='drop-oldest'):
+        """
+        Initialize an empty queue.
+        Args:
+            max_samples (int, optional): Capacity in samples. Defaults to 5000 (10 s at 500 Hz).
+            policy (str, optional): Overflow policy, one of POLICIES. Defaults to 'drop-oldest'.
+        Raises:
+            ValueError: For an unknown policy
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown overflow policy: {policy}")
+        self.max_samples = max_samples
+        self.policy = policy
+        self._blocks = deque()
+        self._condition = threading.Condition()
+        self.depth = 0
+        self.max_depth = 0
+        self.blocks_in = 0
+        self.samples_in = 0
+        self.samples_out = 0
+        self.overflow_blocks = 0
+        self.overflow_samples = 0
+        self.rejected_blocks = 0
+        self.rejected_samples = 0
+        self.decimated_samples = 0
+        self.blocked_seconds = 0.0
+        self.block_timeouts = 0
+        self.closed = False
+
+    def put(self, block, timeout=None):
+        """
+        Queue a block. If it does not fit, the oldest blocks are dropped ('drop-oldest'), the block is refused
+        ('drop-newest'), the caller waits for room ('block'), or the block is thinned ('decimate', dropping the oldest
+        blocks if even one sample does not fit).
+        Args:
+            block (SampleBlock): Block to queue
+            timeout (float, optional): Longest wait for room under the 'block' policy, after which the oldest blocks are dropped. 0 never waits, None waits until there is room or the queue is closed.
+        Returns:
+            bool: False if the queue is closed, True otherwise
+        """
+        n = len(block.samples)
+        with self._condition:
+            if self.closed:
+                return False
+            if self.policy == 'block' and self._blocks and self.depth + n > self.max_samples:
+                start = time.perf_counter()
+                if not self._condition.wait_for(lambda: not self._blocks or self.depth + n <= self.max_samples or self.closed, timeout):
+                    self.block_timeouts += 1
+                self.blocked_seconds += time.perf_counter() - start
+                if self.closed:
+                    return False
+            elif self.policy == 'drop-newest' and self._blocks and self.depth + n > self.max_samples:
+                self.rejected_blocks += 1
+                self.rejected_samples += n
+                return True
+            elif self.policy == 'decimate':
+                step = 1
+                while n > 1 and self.depth + n > self.max_samples:
+                    step *= 2
+                    n = (len(block.samples) + step - 1) // step
+                if step > 1:
+                    self.decimated_samples += len(block.samples) - n
+                    block = decimate_block(block, step)
+            while self._blocks and self.depth + n > self.max_samples:    # Make room by dropping the oldest data
+                dropped = self._blocks.popleft()
+                self.depth -= len(dropped.samples)
+                self.overflow_blocks += 1
+                self.overflow_samples += len(dropped.samples)
+            self._blocks.append(block)
+            self.depth += n
+            self.blocks_in += 1
+            self.samples_in += n
+            if self.depth > self.max_depth:
+                self.max_depth = self.depth
+            self._condition.notify()
+        return True
+
+    def get(self, timeout=None):
+        """
+        Remove and return the oldest block, waiting for one if the queue is empty.
+        Args:
+            timeout (float, optional): Seconds to wait. None waits until a block arrives or the queue is closed.
+        Returns:
+            SampleBlock: The oldest block, or None on timeout or when the queue is closed and empty
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self._blocks or self.closed, timeout)
+            if not self._blocks:
+                return None
+            block = self._blocks.popleft()
+            self.depth -= len(block.samples)
+            self.samples_out += len(block.samples)
+            if self.policy == 'block':
+                self._condition.notify_all()    # Wake a producer waiting for room
+            return block
+
+    def close(self):
+        """Stop accepting blocks and wake up every waiting consumer. Blocks already queued can still be read."""
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+
+    def stats(self):
+        """
+        Snapshot of the queue counters.
+        Returns:
+            dict: Depth, capacity and overflow counters
+        """
+        return {
+            'depth': self.depth,
+            'max_depth': self.max_depth,
+            'max_samples': self.max_samples,
+            'policy': self.policy,
+            'blocks_in': self.blocks_in,
+            'samples_in': self.samples_in,
+            'samples_out': self.samples_out,
+            'overflow_blocks': self.overflow_blocks,
+            'overflow_samples': self.overflow_samples,
+            'rejected_blocks': self.rejected_blocks,
+            'rejected_samples': self.rejected_samples,
+            'decimated_samples': self.decimated_samples,
+            'blocked_seconds': self.blocked_seconds,
+            'block_timeouts': self.block_timeouts,
+        }
@@ -0,0 +1,436 @@
+"""
+Recordings split into segments by duration or size, with a session manifest.
+Multi-hour sessions in one file are awkward to copy, upload or open, and a damaged file loses everything.
+SegmentedWriter is a RecordingWriter whose writer thread drives an ordinary format writer (CSV, binary, compressed,
+EDF) synchronously through its open_files()/write_blocks()/close_files() hooks and swaps it for a new one when the
+current segment reaches max_seconds of samples or max_bytes on disk. Rotation therefore happens on the writer thread,
+never on the acquisition thread, and blocks are split at the exact sample where a duration limit falls, so every
+sample ends up in exactly one segment.
+
+Files of a session started as recording.csv:
+- recording_0001.csv, recording_0002.csv, ...   Segments, each a complete recording of its format
+- recording.manifest.json                        Format, channels, sampling rate and, per segment, the file name,
+                                                 first sample position, sample count, first/last device counter,
+                                                 first/last timestamp, bytes and whether it was closed cleanly
+The manifest is replaced atomically on every flush and rotation, so after a crash it still describes every segment.
+SegmentedRecording reads the segments back as one continuous stream.
+
+Usage:
+$ python -m chordspy.segmented_recording ChordsPy_20250101_120000.manifest.json
+$ python -m chordspy.segmented_recording ChordsPy_20250101_120000.manifest.json --to-csv
+"""
+
+# Importing necessary libraries
+import os
+import json
+import argparse
+from datetime import datetime
+import numpy as np
+from chordspy.recording import RecordingWriter
+from chordspy.sample_queue import SampleBlock
+from chordspy.binary_recording import BinaryRecording, write_csv
+from chordspy.compressed_recording import CompressedRecording
+
+MANIFEST_VERSION = 1
+
+def manifest_filename(filename):
+    """
+    Path of the manifest of a segmented session.
+    Args:
+        filename (str): Session filename, e.g. recording.csv
+    Returns:
+        str: e.g. recording.manifest.json
+    """
+    return os.path.splitext(filename)[0] + '.manifest.json'
+
+def segment_filename(filename, number):
+    """
+    Path of one segment of a session.
+    Args:
+        filename (str): Session filename, e.g. recording.csv
+        number (int): Segment number, starting at 1
+    Returns:
+        str: e.g. recording_0001.csv
+    """
+    base, extension = os.path.splitext(filename)
+    return f"{base}_{number:04d}{extension}"
+
+def split_block(block, count, sampling_rate):
+    """
+    Split a block after its first count samples.
+    Args:
+        block (SampleBlock): Block to split
+        count (int): Samples in the first part
+        sampling_rate (float): Nominal rate used to timestamp the second part
+    Returns:
+        tuple: (first SampleBlock, second SampleBlock)
+    """
+    counters = block.counters
+    timestamp = block.timestamp
+    return (SampleBlock(block.samples[:count], None if counters is None else counters[:count], timestamp),
+            SampleBlock(block.samples[count:], None if counters is None else counters[count:],
+                        None if timestamp is None else timestamp + count / sampling_rate))
+
+class SegmentedWriter(RecordingWriter):
+    """
+    Writes a session as a series of segment files on a background thread.
+    Attributes:
+        format (str): Recording format, written to the manifest
+        sampling_rate (float): Nominal sampling rate in Hz
+        segment_factory (callable): factory(path, first_sample, first_counter) returning an unstarted RecordingWriter for a segment
+        max_seconds (float): Rotate after this many seconds of samples, None for no duration limit
+        max_bytes (int): Rotate once a segment holds this many bytes, None for no size limit
+        manifest (str): Path of the manifest file
+        segments (list): Manifest entry of every segment, the last one being written
+        segment (RecordingWriter): Writer of the current segment
+    """
+    def __init__(self, filename, num_channels, segment_factory, format, sampling_rate=500, max_seconds=None, max_bytes=None, **options):
+        """
+        Initialize the writer. The first segment is opened by start().
+        Args:
+            filename (str): Session filename, segments and manifest are named after it
+            num_channels (int): Channels per sample
+            segment_factory (callable): factory(path, first_sample, first_counter) returning an unstarted RecordingWriter, first_counter being the device counter of the session's first sample (None before it is known)
+            format (str): Recording format, e.g. 'csv' or 'bin'
+            sampling_rate (float, optional): Nominal sampling rate in Hz. Defaults to 500.
+            max_seconds (float, optional): Segment duration in seconds of samples
+            max_bytes (int, optional): Segment size in bytes, checked before every block
+            **options: max_samples, flush_interval and fsync, see RecordingWriter
+        Raises:
+            ValueError: If neither max_seconds nor max_bytes is given
+        """
+        if not max_seconds and not max_bytes:
+            raise ValueError("A segment duration or size is required")
+        super().__init__(filename, num_channels, **options)
+        self.format = format
+        self.sampling_rate = sampling_rate
+        self.segment_factory = segment_factory
+        self.max_seconds = max_seconds
+        self.max_bytes = max_bytes
+        self.max_segment_samples = int(round(max_seconds * sampling_rate)) if max_seconds else None
+        self.manifest = manifest_filename(filename)
+        self.segments = []
+        self.segment = None
+        self.created = datetime.now().isoformat()
+
+    def open_files(self):
+        """Open the first segment and write the manifest."""
+        self.open_segment()
+        self.write_manifest()
+
+    def open_segment(self):
+        """Create the writer of the next segment and open its files."""
+        path = segment_filename(self.filename, len(self.segments) + 1)
+        first_sample = self.segments[-1]['first_sample'] + self.segments[-1]['samples'] if self.segments else 0
+        first_counter = self.segments[0]['first_counter'] if self.segments else None
+        self.segment = self.segment_factory(path, first_sample, first_counter)
+        self.segment.fsync = self.fsync
+        self.segment.open_files()
+        self.files = self.segment.files
+        self.segments.append({
+            'file': os.path.basename(path),
+            'first_sample': first_sample,
+            'samples': 0,
+            'first_counter': None,
+            'last_counter': None,
+            'first_timestamp': None,
+            'last_timestamp': None,
+            'bytes': 0,
+            'complete': False,
+        })
+
+    def close_segment(self):
+        """Flush, fsync and close the current segment."""
+        segment, self.segment = self.segment, None
+        self.files = []
+        written = segment.bytes_written
+        try:
+            segment._flush()
+        finally:
+            segment.close_files()    # May write a last chunk or record
+            self.bytes_written += segment.bytes_written - written
+            entry = self.segments[-1]
+            entry['bytes'] = segment.bytes_written
+            entry['complete'] = segment.error is None
+
+    def write_segment(self, block):
+        """
+        Write one block to the current segment and record it in the manifest entry.
+        Args:
+            block (SampleBlock): Block that fits in the current segment
+        Returns:
+            int: Bytes written
+        """
+        written = self.segment.write_blocks([block])
+        count = len(block.samples)
+        self.segment.rows_written += count
+        self.segment.bytes_written += written
+        entry = self.segments[-1]
+        entry['samples'] += count
+        entry['bytes'] = self.segment.bytes_written
+        if block.counters is not None and len(block.counters):
+            if entry['first_counter'] is None:
+                entry['first_counter'] = int(block.counters[0])
+            entry['last_counter'] = int(block.counters[-1])
+        if block.timestamp is not None:
+            if entry['first_timestamp'] is None:
+                entry['first_timestamp'] = float(block.timestamp)
+            entry['last_timestamp'] = float(block.timestamp) + (count - 1) / self.sampling_rate
+        return written
+
+    def write_blocks(self, blocks):
+        """
+        Write a batch of blocks, rotating whenever the current segment is full.
+        Returns:
+            int: Bytes written
+        """
+        written = 0
+        for block in blocks:
+            while len(block.samples):
+                entry = self.segments[-1]
+                if entry['samples'] and (self.max_bytes and self.segment.bytes_written >= self.max_bytes or
+                                         self.max_segment_samples and entry['samples'] >= self.max_segment_samples):
+                    self.rotate()    # Only once more samples arrive, so a session never ends with an empty segment
+                    continue
+                if self.max_segment_samples and entry['samples'] + len(block.samples) > self.max_segment_samples:
+                    part, block = split_block(block, self.max_segment_samples - entry['samples'], self.sampling_rate)
+                    written += self.write_segment(part)
+                    continue
+                written += self.write_segment(block)
+                break
+        return written
+
+    def rotate(self):
+        """Close the current segment, start the next one and update the manifest."""
+        self.close_segment()
+        self.open_segment()
+        self.write_manifest()
+
+    def _flush(self):
+        """Flush the current segment and refresh the manifest."""
+        super()._flush()
+        self.write_manifest()
+
+    def close_files(self):
+        """Close the last segment and write the final manifest."""
+        if self.segment:
+            self.close_segment()
+        self.write_manifest(complete=self.error is None)
+
+    def write_manifest(self, complete=False):
+        """
+        Replace the manifest atomically.
+        Args:
+            complete (bool, optional): The session was closed cleanly. Defaults to False.
+        """
+        manifest = {
+            'version': MANIFEST_VERSION,
+            'format': self.format,
+            'channels': self.num_channels,
+            'sampling_rate': self.sampling_rate,
+            'created': self.created,
+            'max_seconds': self.max_seconds,
+            'max_bytes': self.max_bytes,
+            'samples': sum(entry['samples'] for entry in self.segments),
+            'complete': complete,
+            'segments': self.segments,
+        }
+        temporary = self.manifest + '.tmp'
+        with open(temporary, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(temporary, self.manifest)
+
+    def stats(self):
+        """
+        Snapshot of the writer counters.
+        Returns:
+            dict: RecordingWriter statistics plus the segment count and the current segment file
+        """
+        stats = super().stats()
+        stats['segments'] = len(self.segments)
+        stats['segment'] = self.segments[-1]['file'] if self.segments else None
+        return stats
+
+class SegmentedRecording:
+    """
+    Read-only view of a segmented session as one continuous recording.
+    Attributes:
+        manifest (dict): Contents of the manifest file
+        folder (str): Directory holding the segments
+        format (str): Recording format of the segments
+        num_channels (int): Channels per sample
+        sampling_rate (float): Nominal sampling rate in Hz
+        segments (list): Manifest entries of the segments
+        starts (numpy.ndarray): Position of the first sample of every segment, plus the total length
+    """
+    def __init__(self, filename):
+        """
+        Open a session. Only the manifest is read; segments are opened on first access.
+        Args:
+            filename (str): Path of the .manifest.json file
+        Raises:
+            ValueError: For EDF sessions, which are read with EDF tools
+        """
+        with open(filename) as f:
+            self.manifest = json.load(f)
+        self.folder = os.path.dirname(os.path.abspath(filename))
+        self.format = self.manifest['format']
+        if self.format in ('edf', 'bdf'):
+            raise ValueError("EDF/BDF segments are read with EDF tools, e.g. pyedflib or MNE")
+        self.num_channels = self.manifest['channels']
+        self.sampling_rate = self.manifest['sampling_rate']
+        self.segments = self.manifest['segments']
+        self._readers = {}
+        counts = [self.segment_length(i) for i in range(len(self.segments))]
+        self.starts = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+
+    def path(self, number):
+        """Path of a segment file by its position in the manifest."""
+        return os.path.join(self.folder, self.segments[number]['file'])
+
+    def reader(self, number):
+        """
+        Reader of a binary or compressed segment, opened on first use.
+        Args:
+            number (int): Position of the segment in the manifest
+        Returns:
+            BinaryRecording: BinaryRecording or CompressedRecording
+        """
+        if number not in self._readers:
+            opener = CompressedRecording if self.format == 'zbin' else BinaryRecording
+            self._readers[number] = opener(self.path(number))
+        return self._readers[number]
+
+    def segment_length(self, number):
+        """
+        Samples in a segment: the manifest count for closed segments, the file contents for one cut short.
+        Args:
+            number (int): Position of the segment in the manifest
+        Returns:
+            int: Sample count
+        """
+        entry = self.segments[number]
+        if entry['complete'] or not os.path.exists(self.path(number)):
+            return entry['samples']
+        if self.format == 'csv':
+            with open(self.path(number), 'rb') as f:
+                return max(sum(1 for line in f if line.endswith(b'\n')) - 1, 0)    # Complete rows after the header
+        return len(self.reader(number))
+
+    def __len__(self):
+        return int(self.starts[-1])
+
+    @property
+    def duration(self):
+        """Length of the session in seconds at the nominal sampling rate."""
+        return len(self) / self.sampling_rate
+
+    def read_segment(self, number, start, stop):
+        """
+        Samples of one segment by position within it.
+        Returns:
+            numpy.ndarray: (n, num_channels) samples
+        """
+        if self.format == 'csv':
+            import pandas as pd    # Only reading CSV segments needs pandas, recording does not load it
+            frame = pd.read_csv(self.path(number), skiprows=range(1, start + 1), nrows=stop - start)
+            return frame.iloc[:, 1:].to_numpy()
+        return np.asarray(self.reader(number).read(start, stop))
+
+    def read(self, start=0, stop=None):
+        """
+        Samples by session position, joined across segment boundaries.
+        Args:
+            start (int, optional): First sample index. Defaults to 0.
+            stop (int, optional): Sample index after the last one. Defaults to the end.
+        Returns:
+            numpy.ndarray: (n, num_channels) samples
+        """
+        start, stop, _ = slice(start, stop).indices(len(self))
+        parts = []
+        number = max(int(np.searchsorted(self.starts, start, side='right')) - 1, 0)
+        while start < stop and number < len(self.segments):
+            offset = int(self.starts[number])
+            end = min(stop, int(self.starts[number + 1]))
+            if end > start:
+                parts.append(self.read_segment(number, start - offset, end - offset))
+                start = end
+            number += 1
+        if not parts:
+            return np.empty((0, self.num_channels))
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def sample_at(self, seconds):
+        """
+        Session position of the first sample at or after a time, using the segment timestamps when recorded.
+        Args:
+            seconds (float): Time since the first sample
+        Returns:
+            int: Sample index between 0 and len(self)
+        """
+        firsts = [entry['first_timestamp'] for entry in self.segments]
+        if any(t is None for t in firsts):
+            return int(min(max(np.ceil(seconds * self.sampling_rate - 1e-9), 0), len(self)))
+        times = np.asarray(firsts) - firsts[0]
+        number = max(int(np.searchsorted(times, seconds, side='right')) - 1, 0)
+        offset = max(np.ceil((seconds - times[number]) * self.sampling_rate - 1e-9), 0)
+        return int(min(self.starts[number] + offset, self.starts[number + 1]))
+
+    def time_range(self, start=None, stop=None):
+        """
+        Samples recorded between two times.
+        Args:
+            start (float, optional): Seconds since the first sample. Defaults to the beginning.
+            stop (float, optional): Seconds since the first sample, exclusive. Defaults to the end.
+        Returns:
+            numpy.ndarray: (n, num_channels) samples
+        """
+        first = 0 if start is None else self.sample_at(start)
+        last = len(self) if stop is None else self.sample_at(stop)
+        return self.read(first, max(first, last))
+
+    def gaps(self):
+        """
+        Device counter discontinuities between consecutive segments, which would mean samples lost at a boundary.
+        Returns:
+            list: (segment number, samples missing or negative if repeated) for every discontinuity
+        """
+        gaps = []
+        for number in range(1, len(self.segments)):
+            last = self.segments[number - 1]['last_counter']
+            first = self.segments[number]['first_counter']
+            if last is not None and first is not None and first != last + 1:
+                gaps.append((number, first - last - 1))
+        return gaps
+
+    def close(self):
+        """Close the open segment readers."""
+        for reader in self._readers.values():
+            if hasattr(reader, 'close'):
+                reader.close()
+        self._readers = {}
+
+def main():
+    """
+    Command line entry point: list a session's segments and optionally join them into one CSV.
+    """
+    parser = argparse.ArgumentParser(description='Inspect or join a segmented ChordsPy recording')
+    parser.add_argument('manifest', help='Path of the .manifest.json file')
+    parser.add_argument('--to-csv', nargs='?', const='', metavar='CSV', help='Join into one CSV (default: session name with .csv)')
+    args = parser.parse_args()
+
+    recording = SegmentedRecording(args.manifest)
+    print(f"{recording.format} session, {recording.num_channels} channels at {recording.sampling_rate:g} Hz, "
+          f"{len(recording)} samples, {recording.duration:.1f} s, {'complete' if recording.manifest['complete'] else 'not closed cleanly'}")
+    for entry in recording.segments:
+        print(f"  {entry['file']}: samples {entry['first_sample']}..{entry['first_sample'] + entry['samples'] - 1}, "
+              f"counters {entry['first_counter']}..{entry['last_counter']}, {entry['bytes']} bytes")
+    for number, missing in recording.gaps():
+        print(f"  Counter discontinuity before {recording.segments[number]['file']}: {missing} samples")
+    if args.to_csv is not None:
+        csv_filename = args.to_csv or args.manifest.replace('.manifest.json', '') + '_joined.csv'
+        print(f"CSV written to {write_csv(recording, csv_filename)}")
+    recording.close()
+
+if __name__ == "__main__":
+    main()
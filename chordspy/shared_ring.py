@@ -0,0 +1,293 @@
+"""
+Shared-memory ring buffer that lets local apps read the live stream without going through LSL.
+Connection writes every block into a multiprocessing.shared_memory segment (named 'chordspy' by default) next to the
+LSL outlet. Apps launched from the web interface attach to it by name and look at the newest samples in place: the
+samples live in the same mirrored (num_channels, 2 * capacity) layout as chordspy.ring_buffer.RingBuffer, so the
+latest N samples are always one contiguous numpy view. There is no resolve step, no inlet and no copy.
+
+Segment layout:
+- 64-byte header (HEADER_DTYPE): magic, version, channel count, capacity, sampling rate, write sequence number
+  (total samples written), local_clock() timestamp of the newest sample, generation (changes when a new writer
+  creates the segment) and a closed flag
+- float32 samples, (num_channels, 2 * capacity)
+
+Readers never take a lock. The writer stores the samples first and publishes the new write sequence number last, so a
+reader that samples the sequence number before and after looking at the data knows whether the writer lapped it: a
+view of the newest n samples stays intact until capacity - n more samples are written.
+
+Client usage:
+    from chordspy.shared_ring import SharedRingReader
+    ring = SharedRingReader('chordspy', timeout=5)
+    window = ring.latest(1000)      # (channels, 1000) view, no copy
+    block = ring.read_new()         # Samples written since the previous call, overruns counted in ring.overrun_samples
+"""
+
+# Importing necessary libraries
+import os
+import time
+import numpy as np
+from multiprocessing import shared_memory, resource_tracker
+from chordspy.ring_buffer import RingBuffer
+from chordspy.sinks import Sink
+
+MAGIC = b"CHRDRING"
+VERSION = 1
+DEFAULT_NAME = 'chordspy'
+HEADER_SIZE = 64
+HEADER_DTYPE = np.dtype([('magic', 'S8'), ('version', '<u4'), ('channels', '<u4'), ('capacity', '<u8'),
+                         ('sampling_rate', '<f8'), ('write_seq', '<u8'), ('last_timestamp', '<f8'),
+                         ('generation', '<u8'), ('closed', '<u4')])
+SAMPLE_DTYPE = np.dtype('<f4')
+_created = set()    # Names of the segments created by writers in this process
+
+def segment_views(shm):
+    """
+    Header record and sample array of a mapped segment.
+    Args:
+        shm (SharedMemory): The segment
+    Returns:
+        tuple: (header numpy record view, (channels, 2 * capacity) sample view or None if the header is not valid yet)
+    """
+    header = np.ndarray((), dtype=HEADER_DTYPE, buffer=shm.buf)
+    if header['magic'] != MAGIC:
+        return header, None
+    shape = (int(header['channels']), 2 * int(header['capacity']))
+    return header, np.ndarray(shape, dtype=SAMPLE_DTYPE, buffer=shm.buf, offset=HEADER_SIZE)
+
+class SharedRingWriter:
+    """
+    Creates the shared segment and appends sample blocks to it.
+    Attributes:
+        name (str): Shared memory name
+        num_channels (int): Channels per sample
+        capacity (int): Samples kept
+        header (numpy.ndarray): Header record in shared memory
+        ring (RingBuffer): Ring buffer over the shared sample array
+    """
+    def __init__(self, name, num_channels, sampling_rate, capacity):
+        """
+        Create (or replace a stale) shared segment.
+        Args:
+            name (str): Shared memory name
+            num_channels (int): Channels per sample
+            sampling_rate (float): Nominal sampling rate in Hz
+            capacity (int): Samples kept
+        """
+        self.name = name
+        self.num_channels = num_channels
+        self.capacity = capacity
+        size = HEADER_SIZE + num_channels * 2 * capacity * SAMPLE_DTYPE.itemsize
+        try:
+            self.shm = shared_memory.SharedMemory(name, create=True, size=size)
+        except FileExistsError:    # Left behind by a writer that did not exit cleanly
+            stale = shared_memory.SharedMemory(name)
+            stale.close()
+            stale.unlink()
+            self.shm = shared_memory.SharedMemory(name, create=True, size=size)
+        _created.add(name)
+
+        self.header = np.ndarray((), dtype=HEADER_DTYPE, buffer=self.shm.buf)
+        self.header['version'] = VERSION
+        self.header['channels'] = num_channels
+        self.header['capacity'] = capacity
+        self.header['sampling_rate'] = sampling_rate
+        self.header['write_seq'] = 0
+        self.header['last_timestamp'] = np.nan
+        self.header['generation'] = time.time_ns() ^ os.getpid()
+        self.header['closed'] = 0
+        self.header['magic'] = MAGIC    # Written last, readers wait for it
+        samples = np.ndarray((num_channels, 2 * capacity), dtype=SAMPLE_DTYPE, buffer=self.shm.buf, offset=HEADER_SIZE)
+        self.ring = RingBuffer(num_channels, capacity, SAMPLE_DTYPE, buffer=samples)
+
+    def write(self, samples, timestamp=None):
+        """
+        Append a block and publish it to readers.
+        Args:
+            samples (numpy.ndarray): (n, num_channels) samples, oldest first
+            timestamp (float, optional): local_clock() timestamp of the newest sample
+        """
+        self.ring.extend(samples[:, :self.num_channels])
+        if timestamp is not None:
+            self.header['last_timestamp'] = timestamp
+        self.header['write_seq'] = self.ring.total_written    # Publish after the samples are in place
+
+    def close(self):
+        """Mark the stream as ended and remove the segment. Attached readers keep their mapping until they close."""
+        self.header['closed'] = 1
+        self.header = None
+        self.ring = None
+        self.shm.close()
+        self.shm.unlink()
+        _created.discard(self.name)
+
+class SharedRingSink(Sink):
+    """
+    Sink that writes every block into a shared ring.
+    Attributes:
+        writer (SharedRingWriter): The shared segment
+    """
+    def __init__(self, num_channels, sampling_rate, capacity, name=DEFAULT_NAME, **options):
+        """
+        Create the shared segment.
+        Args:
+            num_channels (int): Channels per sample
+            sampling_rate (float): Nominal sampling rate in Hz
+            capacity (int): Samples kept in shared memory
+            name (str, optional): Shared memory name. Defaults to 'chordspy'.
+            **options: max_samples and policy, see Sink
+        """
+        super().__init__('shared_ring', **options)
+        self.writer = SharedRingWriter(name, num_channels, sampling_rate, capacity)
+
+    def consume(self, block):
+        """Append the block, recording the timestamp of its newest sample."""
+        self.writer.write(block.samples, block.timestamps[-1] if block.timestamps is not None else block.timestamp)
+
+    def close(self, timeout=None):
+        """Drain the queue, then remove the shared segment."""
+        drained = super().close(timeout)
+        if self.writer.shm is not None and self.writer.header is not None:
+            self.writer.close()
+        return drained
+
+class SharedRingReader:
+    """
+    Lock-free reader attached to a shared ring by name.
+    Attributes:
+        name (str): Shared memory name
+        num_channels (int): Channels per sample
+        capacity (int): Samples kept by the writer
+        sampling_rate (float): Nominal sampling rate in Hz
+        read_seq (int): Write sequence number up to which read_new() has returned samples
+        view_seq (int): Write sequence number at which the last latest() view ends
+        overrun_samples (int): Samples read_new() missed because the writer lapped the reader
+    """
+    def __init__(self, name=DEFAULT_NAME, timeout=0.0):
+        """
+        Attach to a shared ring.
+        Args:
+            name (str, optional): Shared memory name. Defaults to 'chordspy'.
+            timeout (float, optional): Seconds to wait for the writer to create the segment. Defaults to 0 (no wait).
+        Raises:
+            FileNotFoundError: If no ring of that name appears within the timeout
+        """
+        self.name = name
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                self.shm = shared_memory.SharedMemory(name)
+                header, samples = segment_views(self.shm)
+                if samples is not None:
+                    break
+                self.shm.close()    # Created but header not written yet
+                header = samples = None
+            except FileNotFoundError:
+                pass
+            if time.monotonic() >= deadline:
+                raise FileNotFoundError(f"No ChordsPy shared ring named '{name}'")
+            time.sleep(0.05)
+        if os.name == 'posix' and name not in _created:
+            resource_tracker.unregister(self.shm._name, 'shared_memory')    # The writer owns the segment, do not unlink it when this process exits
+        self.header = header
+        self._samples = samples
+        self.num_channels = int(header['channels'])
+        self.capacity = int(header['capacity'])
+        self.sampling_rate = float(header['sampling_rate'])
+        self.generation = int(header['generation'])
+        self.read_seq = self.write_seq
+        self.view_seq = self.read_seq
+        self.overrun_samples = 0
+
+    @property
+    def write_seq(self):
+        """Total samples written by the writer."""
+        return int(self.header['write_seq'])
+
+    @property
+    def last_timestamp(self):
+        """local_clock() timestamp of the newest sample, NaN if unknown."""
+        return float(self.header['last_timestamp'])
+
+    @property
+    def closed(self):
+        """True once the writer has stopped; attach again to follow a new stream."""
+        return bool(self.header['closed'])
+
+    def latest(self, n=None):
+        """
+        The newest samples as a read-only view into shared memory, oldest first. Nothing is copied.
+        Args:
+            n (int, optional): Number of samples. Defaults to the capacity.
+        Returns:
+            numpy.ndarray: (num_channels, n) view, intact while valid(n) is True
+        """
+        n = self.capacity if n is None else n
+        if not 0 <= n <= self.capacity:
+            raise ValueError(f"n must be between 0 and {self.capacity}")
+        seq = self.write_seq
+        end = seq % self.capacity + self.capacity
+        view = self._samples[:, end - n:end]
+        view.flags.writeable = False
+        self.view_seq = seq
+        return view
+
+    def valid(self, n=None):
+        """
+        Whether the last latest(n) view is still intact, i.e. the writer has not wrapped over it since.
+        Args:
+            n (int, optional): Length of the view. Defaults to the capacity.
+        Returns:
+            bool: True if no sample of the view has been overwritten
+        """
+        n = self.capacity if n is None else n
+        return self.write_seq - self.view_seq <= self.capacity - n
+
+    def read_latest(self, n=None):
+        """
+        A consistent copy of the newest samples, retried if the writer wrapped over them during the copy.
+        Args:
+            n (int, optional): Number of samples. Defaults to the capacity minus one second, so the copy cannot be lapped.
+        Returns:
+            numpy.ndarray: (num_channels, n) array, oldest sample first
+        """
+        n = self.capacity - int(self.sampling_rate) if n is None else n
+        while True:
+            copy = self.latest(n).copy()
+            if self.valid(n):
+                return copy
+
+    def read_new(self, max_samples=None):
+        """
+        Copy the samples written since the previous call. If the writer lapped the reader, the lost samples are
+        counted in overrun_samples and reading resumes at the oldest sample still held.
+        Args:
+            max_samples (int, optional): Return at most this many of the oldest new samples
+        Returns:
+            numpy.ndarray: (num_channels, n) array, oldest sample first
+        """
+        seq = self.write_seq
+        if int(self.header['generation']) != self.generation:    # Segment reused by a new writer
+            self.generation = int(self.header['generation'])
+            self.read_seq = 0
+        start = self.read_seq
+        if seq - start > self.capacity:
+            self.overrun_samples += seq - self.capacity - start
+            start = seq - self.capacity
+        stop = seq if max_samples is None else min(seq, start + max_samples)
+        first = start % self.capacity
+        block = self._samples[:, first:first + stop - start].copy()    # Mirrored layout: never wraps
+        if self.write_seq - start > self.capacity:    # Lapped during the copy, the oldest part may be newer data
+            lost = min(self.write_seq - self.capacity - start, block.shape[1])
+            self.overrun_samples += lost
+            block = block[:, lost:]
+        self.read_seq = stop
+        return block
+
+    def close(self):
+        """Detach from the segment. Views returned by latest() must not be used afterwards."""
+        self.header = None
+        self._samples = None
+        try:
+            self.shm.close()
+        except BufferError:    # A latest() view is still referenced, the mapping goes away with it
+            pass
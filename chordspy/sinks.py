@@ -0,0 +1,238 @@
+"""
+Fan-out of decoded sample blocks to independent outputs (sinks).
+Connection publishes every stamped block once to a SinkBus, which hands it to each attached sink. Every sink owns a
+bounded SampleQueue with its own overflow policy and a worker thread, so a slow sink (a stalled disk, an LSL outlet
+nobody reads) only fills its own queue instead of holding up the others. Sinks can be attached and detached while
+samples are flowing; detaching drains the sink's queue before it is closed.
+
+Sinks:
+- LslSink          pushes each block to an LSL StreamOutlet as one chunk with per-sample timestamps
+- RecordingWriter  the background writers of chordspy.recording (CSV, binary, compressed, EDF) are sinks too
+Any object with a name, put(block, timeout), close(timeout) and stats() can be attached; subclassing Sink and implementing
+consume() is the simple way to write one.
+"""
+
+# Importing necessary libraries
+import time
+import threading
+import numpy as np
+from pylsl import local_clock
+from chordspy.sample_queue import SampleQueue
+from chordspy.metrics import REGISTRY
+
+class Sink:
+    """
+    Base class of the sinks: a bounded queue drained by a worker thread that calls consume() for every block.
+    Attributes:
+        name (str): Name under which the sink is attached to a SinkBus
+        queue (SampleQueue): Blocks waiting for the sink, with the sink's overflow policy
+        blocks_consumed (int): Blocks handed to consume()
+        errors (int): consume() calls that raised
+        error (str): Message of the last error, None while healthy
+        last_lag_seconds (float): Age of the last consumed block's first sample when the sink got to it
+        max_lag_seconds (float): Largest such age seen
+        write_seconds (Histogram): Time spent in consume() per block, exported as chordspy_sink_write_seconds
+    """
+    def __init__(self, name, max_samples=5000, policy='drop-oldest'):
+        """
+        Initialize the sink. The worker thread is started by start().
+        Args:
+            name (str): Name of the sink
+            max_samples (int, optional): Capacity of the queue in samples. Defaults to 5000.
+            policy (str, optional): Overflow policy: 'drop-oldest', 'drop-newest', 'block' or 'decimate'. Defaults to 'drop-oldest'.
+        """
+        self.name = name
+        self.queue = SampleQueue(max_samples, policy)
+        self.blocks_consumed = 0
+        self.errors = 0
+        self.error = None
+        self.last_lag_seconds = 0.0
+        self.max_lag_seconds = 0.0
+        self.write_seconds = REGISTRY.histogram('chordspy_sink_write_seconds', 'Time a sink spends writing one block or batch', ['sink']).labels(sink=name)
+        self._thread = None
+
+    def consume(self, block):
+        """
+        Handle one block. Runs on the sink's worker thread.
+        Args:
+            block (SampleBlock): Stamped block, timestamps holds one timestamp per sample
+        """
+        raise NotImplementedError
+
+    def start(self):
+        """Start the worker thread."""
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def put(self, block, timeout=None):
+        """
+        Queue a block for the sink, applying its overflow policy. Called by the publisher.
+        Args:
+            block (SampleBlock): Block to queue
+            timeout (float, optional): Longest wait for room under the 'block' policy, after which the oldest blocks are dropped and a block timeout is counted. None waits until there is room.
+        Returns:
+            bool: False if the sink is closed, True otherwise
+        """
+        return self.queue.put(block, timeout)
+
+    def close(self, timeout=None):
+        """
+        Stop accepting blocks and let the worker consume what is still queued.
+        Args:
+            timeout (float, optional): Seconds to wait for the worker. None waits until it is done.
+        Returns:
+            bool: True if the queue was drained without errors
+        """
+        self.queue.close()
+        if self._thread:
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                return False
+        return self.error is None
+
+    def measure_lag(self, block):
+        """Record how old a block is when the sink gets to it, from the local_clock() timestamp of its first sample."""
+        if block.timestamp is not None:
+            self.last_lag_seconds = float(local_clock() - block.timestamp)
+            self.max_lag_seconds = max(self.max_lag_seconds, self.last_lag_seconds)
+
+    def _run(self):
+        """Worker loop: consume blocks until the queue is closed and empty."""
+        while True:
+            block = self.queue.get()
+            if block is None:
+                break
+            self.measure_lag(block)
+            try:
+                start = time.perf_counter()
+                self.consume(block)
+                self.write_seconds.observe(time.perf_counter() - start)
+                self.blocks_consumed += 1
+            except Exception as e:
+                self.errors += 1
+                if self.error is None:
+                    print(f"\n{self.name} sink error: {str(e)}")
+                self.error = str(e)
+
+    def stats(self):
+        """
+        Snapshot of the sink counters.
+        Returns:
+            dict: Queue depth (lag in samples), overflow and decimation counters, lag in seconds and errors
+        """
+        stats = self.queue.stats()
+        stats.update({
+            'blocks_consumed': self.blocks_consumed,
+            'lag_samples': self.queue.depth,
+            'last_lag_seconds': self.last_lag_seconds,
+            'max_lag_seconds': self.max_lag_seconds,
+            'errors': self.errors,
+            'error': self.error,
+        })
+        return stats
+
+class LslSink(Sink):
+    """
+    Pushes blocks to an LSL outlet, one push_chunk call per block.
+    Attributes:
+        outlet (StreamOutlet): The outlet
+        probe (LatencyProbe): Stamps the push of every block in latency measurement mode, None otherwise
+    """
+    def __init__(self, outlet, name='lsl', probe=None, **options):
+        """
+        Initialize the sink.
+        Args:
+            outlet (StreamOutlet): Outlet created by Connection.setup_lsl
+            name (str, optional): Name of the sink. Defaults to 'lsl'.
+            probe (LatencyProbe, optional): Latency probe, see chordspy.latency
+            **options: max_samples and policy, see Sink
+        """
+        super().__init__(name, **options)
+        self.outlet = outlet
+        self.probe = probe
+
+    def consume(self, block):
+        """Push the block with its per-sample timestamps, or let LSL stamp it now if it has none."""
+        chunk = np.ascontiguousarray(block.samples, dtype=np.float32)    # push_chunk reads a C-contiguous float32 array directly
+        timestamps = block.timestamps.tolist() if block.timestamps is not None else 0.0
+        self.outlet.push_chunk(chunk, timestamps)
+        if self.probe and block.timestamps is not None:
+            self.probe.pushed(block.timestamps)
+
+class SinkBus:
+    """
+    Registry of sinks that receive every published block.
+    Attributes:
+        sinks (dict): Attached sinks by name
+    """
+    def __init__(self):
+        """Initialize an empty bus."""
+        self.sinks = {}
+        self._lock = threading.Lock()
+
+    def attach(self, sink, start=True):
+        """
+        Attach a sink, replacing (and closing) any sink of the same name.
+        Args:
+            sink (Sink): Sink to attach
+            start (bool, optional): Start the sink's worker thread. Defaults to True; pass False for sinks already started.
+        Returns:
+            Sink: The attached sink
+        """
+        if start:
+            sink.start()
+        with self._lock:
+            previous = self.sinks.get(sink.name)
+            self.sinks = {**self.sinks, sink.name: sink}    # Copy on write, publish() iterates without the lock
+        if previous is not None and previous is not sink:
+            previous.close()
+        return sink
+
+    def detach(self, name, timeout=None):
+        """
+        Detach a sink and close it once it has consumed its queue.
+        Args:
+            name (str): Name of the sink
+            timeout (float, optional): Seconds to wait for the drain. None waits until it is done.
+        Returns:
+            Sink: The detached sink, or None if no sink has that name
+        """
+        with self._lock:
+            sinks = dict(self.sinks)
+            sink = sinks.pop(name, None)
+            self.sinks = sinks
+        if sink is not None:
+            sink.close(timeout)
+        return sink
+
+    def get(self, name):
+        """Attached sink by name, or None."""
+        return self.sinks.get(name)
+
+    def publish(self, block, timeout=None):
+        """
+        Hand a block to every attached sink. Only a sink with the 'block' policy can make this wait, for at most timeout
+        seconds per sink, so a stalled sink drops its oldest blocks instead of holding up the publisher and the other sinks.
+        Args:
+            block (SampleBlock): Stamped block
+            timeout (float, optional): Longest wait for room in each sink's queue. None waits until there is room.
+        """
+        for sink in self.sinks.values():
+            sink.put(block, timeout)
+
+    def close(self, timeout=1.0):
+        """
+        Detach and close every sink.
+        Args:
+            timeout (float, optional): Seconds to wait for each sink. Defaults to 1.0.
+        """
+        for name in list(self.sinks):
+            self.detach(name, timeout)
+
+    def stats(self):
+        """
+        Snapshot of every sink's counters.
+        Returns:
+            dict: Sink name -> stats()
+        """
+        return {name: sink.stats() for name, sink in self.sinks.items()}
@@ -336,6 +336,8 @@ let isConnected = false;
 let isRecording = false;
 let eventSource = null;
 let isScanning = false;
+let bleEventSource = null;
+let bleDevices = new Map(); // Cached devices of the background scanner, by address
 
 // Function to update the filename timestamp periodically
 function startTimestampUpdater() {
@@ -444,6 +446,41 @@ connectionBtns.forEach(btn => {
 function showBleDeviceModal() {
     bleModal.classList.remove('hidden');
     scanBleDevices();
+    startBleEvents();
+}
+
+// Hide BLE device selection modal and stop listening for devices
+function hideBleDeviceModal() {
+    bleModal.classList.add('hidden');
+    stopBleEvents();
+}
+
+// Listen for devices found and lost by the background scanner while the modal is open
+function startBleEvents() {
+    if (bleEventSource) return;
+
+    bleEventSource = new EventSource('/ble_events');
+    bleEventSource.onmessage = function(e) {
+        const event = JSON.parse(e.data);
+        if (event.type === 'found') {
+            bleDevices.set(event.device.address, event.device);
+        } else if (event.type === 'lost') {
+            bleDevices.delete(event.device.address);
+        }
+        if (!isScanning) {
+            renderBleDevices(Array.from(bleDevices.values()));
+        }
+    };
+    bleEventSource.onerror = function() {
+        logError('BLE events connection error');
+    };
+}
+
+function stopBleEvents() {
+    if (bleEventSource) {
+        bleEventSource.close();
+        bleEventSource = null;
+    }
 }
 
 // Scan for BLE devices
@@ -451,6 +488,7 @@ function scanBleDevices() {
     if (isScanning) return;
     
     isScanning = true;
+    bleDevices = new Map();
     bleDevicesList.innerHTML = `
         <div class="flex items-center justify-center py-4">
             <i class="fas fa-circle-notch fa-spin text-blue-500 mr-2"></i>
@@ -467,8 +505,12 @@ function scanBleDevices() {
         })
         .then(data => {
             isScanning = false;
-            if (data.status === 'success' && data.devices.length > 0) {
-                renderBleDevices(data.devices);
+            if (data.status === 'success') {
+                // Devices found after this answer arrive through /ble_events
+                data.devices.forEach(device => bleDevices.set(device.address, device));
+                if (bleDevices.size > 0 || !data.scanning) {
+                    renderBleDevices(Array.from(bleDevices.values()));
+                }
             } else {
                 bleDevicesList.innerHTML = `
                     <div class="text-center py-4 text-gray-500">
@@ -501,6 +543,7 @@ function renderBleDevices(devices) {
         return;
     }
     
+    devices.sort((a, b) => (b.rssi ?? -1000) - (a.rssi ?? -1000));
     devices.forEach(device => {
         const deviceElement = document.createElement('div');
         deviceElement.className = 'p-3 border-b dark:border-gray-700 hover:bg-gray-100 dark:hover:bg-gray-700 cursor-pointer flex items-center';
@@ -508,7 +551,7 @@ function renderBleDevices(devices) {
             <i class="fab fa-bluetooth-b text-blue-500 mr-3 text-lg"></i>
             <div class="flex-1">
                 <div class="font-medium text-gray-800 dark:text-gray-200">${device.name}</div>
-                <div class="text-xs text-gray-500">${device.address}</div>
+                <div class="text-xs text-gray-500">${device.address}${device.rssi != null ? ` · ${device.rssi} dBm` : ''}</div>
             </div>
             ${selectedBleDevice?.address === device.address ? 
                 '<i class="fas fa-check text-green-500 ml-2"></i>' : ''}
@@ -516,7 +559,7 @@ function renderBleDevices(devices) {
         
         deviceElement.addEventListener('click', () => {
             selectedBleDevice = device;
-            bleModal.classList.add('hidden');
+            hideBleDeviceModal();
             connectBtn.disabled = false; // Enable connect button after selection
         });
         
@@ -526,7 +569,7 @@ function renderBleDevices(devices) {
 
 // Close BLE modal
 closeBleModal.addEventListener('click', () => {
-    bleModal.classList.add('hidden');
+    hideBleDeviceModal();
     connectionBtns.forEach(b => b.classList.remove('bg-cyan-500', 'text-white'));
     selectedProtocol = null;
     selectedBleDevice = null;
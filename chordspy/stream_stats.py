@@ -0,0 +1,169 @@
+"""
+Packet-counter based loss and drift accounting for CHORDS streams.
+Every CHORDS transport stamps its packets with a rolling 8-bit counter. StreamStats unwraps that counter per chunk
+of packets with numpy and keeps running totals of received packets, missing samples, duplicates and resyncs, plus
+the sampling rate measured against the host clock and the resulting clock drift. The rate is measured from the first
+chunk that arrives settle_seconds after the stream started, so the backlog read at connect (packets buffered by the OS
+and the serial or radio link while the device was opened) does not inflate it. After a reconnect, restart() takes the
+next packet as a new counter baseline, since an outage longer than one counter wrap cannot be measured from the counter.
+
+All counters are plain attributes written by a single acquisition thread, so other threads (e.g. Connection or the
+web interface) can read them at any time without taking a lock.
+"""
+
+# Importing necessary libraries
+import time
+import numpy as np
+
+class StreamStats:
+    """
+    Running loss and drift statistics for one data stream.
+    Attributes:
+        nominal_rate (float): Expected sampling rate in Hz
+        counter_modulo (int): Counter wrap-around value (256 for an 8-bit counter)
+        packets_received (int): Total packets accepted
+        missing_samples (int): Total samples lost, from gaps in the unwrapped counter
+        duplicate_packets (int): Total packets carrying the same counter as their predecessor
+        resync_events (int): Total times the byte stream had to be re-synchronised
+        last_counter (int): Last unwrapped counter value, None before the first packet
+        settle_seconds (float): Host time after the first packet before the rate measurement starts
+        measured_rate (float): Device samples per second of host time since the rate anchor, 0 until settle_seconds have passed
+        drift_ppm (float): Deviation of measured_rate from nominal_rate in parts per million
+    """
+    def __init__(self, nominal_rate, counter_modulo=256, settle_seconds=1.0):
+        """
+        Initialize empty statistics.
+        Args:
+            nominal_rate (float): Expected sampling rate in Hz
+            counter_modulo (int, optional): Counter wrap-around value. Defaults to 256.
+            settle_seconds (float, optional): Seconds after the first packet before the rate is measured, long enough to drain the connect backlog. Defaults to 1.
+        """
+        self.nominal_rate = nominal_rate
+        self.counter_modulo = counter_modulo
+        self.settle_seconds = settle_seconds
+        self.reset()
+
+    def reset(self):
+        """Clear all counters and the rate estimate."""
+        self.packets_received = 0
+        self.missing_samples = 0
+        self.duplicate_packets = 0
+        self.resync_events = 0
+        self.last_counter = None
+        self.first_counter = None
+        self._restarted = False         # Set by restart(), the next packet starts a new session
+        self.first_time = None
+        self.rate_counter = None        # Counter and host time the rate is measured from, set once the stream has settled
+        self.rate_time = None
+        self.last_time = None
+        self.measured_rate = 0.0
+        self.drift_ppm = 0.0
+        self.interval_packets = 0       # Packets since the last interval reset (used for per-second logging)
+        self.interval_missing = 0       # Missing samples since the last interval reset
+
+    def restart(self):
+        """
+        Start a new session of the same stream after a reconnect. The totals are kept, but the first packet of the new
+        session becomes the counter baseline: the device's counter carries on from wherever it got to during the outage,
+        which modulo the wrap says nothing about how many samples were lost (Connection measures the outage instead).
+        The unwrapped counter moves past the last one to the new packet's counter and the rate is measured again from a new anchor.
+        """
+        if self.last_counter is None:
+            return
+        self._restarted = True
+        self.first_time = None
+        self.rate_counter = None
+        self.rate_time = None
+
+    def update(self, counters, now=None):
+        """
+        Account for a chunk of packets.
+        Args:
+            counters (array-like): Raw (wrapped) counter values of the packets, in arrival order
+            now (float, optional): Host arrival time of the chunk in seconds. Defaults to time.perf_counter().
+        Returns:
+            numpy.ndarray: Unwrapped counter value of every packet in the chunk (int64)
+        """
+        counters = np.asarray(counters, dtype=np.int64)
+        n = len(counters)
+        if n == 0:
+            return np.empty(0, dtype=np.int64)
+        if now is None:
+            now = time.perf_counter()
+
+        # Step between consecutive counters modulo the wrap, the very first packet counts as a step of one
+        steps = np.empty(n, dtype=np.int64)
+        steps[1:] = (counters[1:] - counters[:-1]) % self.counter_modulo
+        if self.last_counter is None:
+            steps[0] = 0
+            base = int(counters[0])
+            self.first_counter = base
+            self.first_time = now
+        elif self._restarted:
+            steps[0] = (counters[0] - self.last_counter - 1) % self.counter_modulo + 1    # Ahead of the last counter, congruent with the new one
+            base = self.last_counter
+        else:
+            steps[0] = (counters[0] - self.last_counter) % self.counter_modulo
+            base = self.last_counter
+
+        unwrapped = base + np.cumsum(steps)
+        duplicates = int(np.count_nonzero(steps == 0)) - (1 if self.packets_received == 0 else 0)
+        if self._restarted:
+            steps[0] = 1    # First packet after a reconnect: its step is not a count of lost samples
+            self.first_time = now
+            self._restarted = False
+        gaps = steps[steps > 1]
+        missing = int(gaps.sum() - len(gaps))
+
+        self.packets_received += n
+        self.interval_packets += n
+        self.duplicate_packets += duplicates
+        self.missing_samples += missing
+        self.interval_missing += missing
+        self.last_counter = int(unwrapped[-1])
+        self.last_time = now
+
+        if self.rate_time is None:
+            if now - self.first_time >= self.settle_seconds:
+                self.rate_counter = self.last_counter    # Anchor on a chunk read live, after the connect backlog
+                self.rate_time = now
+        elif now > self.rate_time:
+            self.measured_rate = (self.last_counter - self.rate_counter) / (now - self.rate_time)
+            if self.nominal_rate:
+                self.drift_ppm = (self.measured_rate - self.nominal_rate) / self.nominal_rate * 1e6
+        return unwrapped
+
+    def record_resync(self, count=1):
+        """
+        Count re-synchronisation events reported by a decoder.
+        Args:
+            count (int, optional): Number of events. Defaults to 1.
+        """
+        self.resync_events += count
+
+    def take_interval(self):
+        """
+        Return and reset the per-interval packet and missing-sample counts.
+        Returns:
+            tuple: (packets, missing) since the previous call
+        """
+        packets, missing = self.interval_packets, self.interval_missing
+        self.interval_packets = 0
+        self.interval_missing = 0
+        return packets, missing
+
+    def as_dict(self):
+        """
+        Snapshot of the statistics as a plain dictionary.
+        Returns:
+            dict: Current counter, rate and drift values
+        """
+        return {
+            'packets_received': self.packets_received,
+            'missing_samples': self.missing_samples,
+            'duplicate_packets': self.duplicate_packets,
+            'resync_events': self.resync_events,
+            'nominal_rate': self.nominal_rate,
+            'measured_rate': self.measured_rate,
+            'drift_ppm': self.drift_ppm,
+        }
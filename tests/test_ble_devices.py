@@ -0,0 +1,315 @@
+"""
+Tests of the concurrent BLE acquisition of chordspy.ble_devices.
+BleMerger is driven with synthetic 500 Hz blocks on a fake clock. The Connection tests stream emulated devices
+(chordspy.emulator.BleEmulator, whose FakeBleakClient stands in for bleak) through connect_ble_devices on the same
+fake clock, stepped one notification at a time, so arrival times and outages do not depend on the machine's load.
+"""
+
+import time
+import asyncio
+import numpy as np
+import pytest
+from chordspy import ble_devices, chords_ble
+from chordspy.ble_devices import BleMerger
+from chordspy.ble_scanner import BleScanner
+from chordspy.connection import Connection
+from chordspy.emulator import BleEmulator
+from chordspy.sample_queue import SampleBlock
+from chordspy.sinks import Sink
+
+RATE = 500       # Samples per second of every device
+CHANNELS = 3     # Channels per device
+BLOCK = 10       # Samples per notification
+
+class FakeClock:
+    """local_clock() replacement that only moves when the test advances it."""
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+class CaptureSink(Sink):
+    """Sink keeping every block it is given."""
+    def __init__(self, name='capture'):
+        super().__init__(name, max_samples=1 << 20)
+        self.blocks = []
+
+    def consume(self, block):
+        self.blocks.append(block)
+
+    def rows(self, blocks=None):
+        """Samples and counters of the first blocks captured (all of them by default), concatenated."""
+        blocks = self.blocks[:blocks]
+        return np.concatenate([b.samples for b in blocks]), np.concatenate([b.counters for b in blocks])
+
+def device_block(first, start_time, n=BLOCK):
+    """
+    A stamped block of one device whose channels all hold the device counter of the sample.
+    Args:
+        first (int): Counter of the first sample
+        start_time (float): Timestamp of the sample with counter 0
+        n (int, optional): Samples in the block
+    """
+    counters = np.arange(first, first + n, dtype=np.int64)
+    timestamps = start_time + counters / RATE
+    samples = np.repeat(counters[:, None], CHANNELS, axis=1).astype(np.float64)
+    return SampleBlock(samples, counters, timestamps[0], timestamps)
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(ble_devices, 'local_clock', fake)
+    return fake
+
+@pytest.fixture
+def merger(clock):
+    published = []
+    merger = BleMerger(2, CHANNELS, RATE, lambda samples, counters, arrival: published.append((samples, counters)))
+    merger.published = published
+    return merger
+
+def merged_rows(merger):
+    """Every row the merger published and its row number."""
+    return (np.concatenate([samples for samples, _ in merger.published]),
+            np.concatenate([counters for _, counters in merger.published]))
+
+def test_merger_aligns_devices_by_timestamp(merger, clock):
+    # Device 0 starts at counter 40, device 1 at counter 180 and 20 samples (40 ms) later
+    for i in range(20):
+        merger.add(0, device_block(40 + i * BLOCK, -40 / RATE))
+        merger.add(1, device_block(180 + i * BLOCK, 20 / RATE - 180 / RATE))
+        clock.now += BLOCK / RATE
+    samples, rows = merged_rows(merger)
+    assert np.array_equal(rows, np.arange(len(rows)))
+    assert np.array_equal(samples[:, 0], rows + 40)
+    assert np.isnan(samples[:20, CHANNELS:]).all()           # Device 1 had not started yet
+    assert np.array_equal(samples[20:, CHANNELS], rows[20:] + 160)
+    assert merger.filled_samples == 20
+    assert merger.late_samples == 0
+
+def test_merger_fills_absent_device_after_hold(merger, clock):
+    for i in range(10):
+        merger.add(0, device_block(i * BLOCK, 0.0))
+        merger.add(1, device_block(i * BLOCK, 0.0))
+        clock.now += BLOCK / RATE
+    assert merger.rows_published == 100
+
+    # Device 1 goes silent: its rows are waited for until hold_seconds have passed
+    i = 10
+    while clock.now + BLOCK / RATE < merger.hold_deadline(1):
+        clock.now += BLOCK / RATE
+        merger.add(0, device_block(i * BLOCK, 0.0))
+        i += 1
+    assert merger.rows_published == 100
+    clock.now += BLOCK / RATE
+    merger.add(0, device_block(i * BLOCK, 0.0))
+    assert merger.rows_published == (i + 1) * BLOCK
+
+    samples, rows = merged_rows(merger)
+    assert not np.isnan(samples[:, :CHANNELS]).any()
+    assert np.isnan(samples[100:, CHANNELS:]).all()
+    assert not np.isnan(samples[:100, CHANNELS:]).any()
+    assert merger.filled_samples == len(rows) - 100
+
+def test_merger_counts_late_samples(merger, clock):
+    for i in range(5):
+        merger.add(0, device_block(i * BLOCK, 0.0))
+        merger.add(1, device_block(i * BLOCK, 0.0))
+    clock.now += 2 * merger.hold_seconds
+    for i in range(5, 10):
+        merger.add(0, device_block(i * BLOCK, 0.0))    # Device 1 is away, its rows 50 .. 99 are published as NaN
+    assert merger.rows_published == 100
+
+    merger.add(1, device_block(50, 0.0, n=60))         # Back with 50 samples for published rows and 10 new ones
+    assert merger.late_samples == 50
+    merger.add(0, device_block(100, 0.0))
+    samples, rows = merged_rows(merger)
+    assert merger.rows_published == 110
+    assert np.array_equal(samples[100:, CHANNELS], rows[100:])
+    assert merger.filled_samples == 50
+
+def test_merger_flush_publishes_remaining_rows(merger, clock):
+    merger.add(0, device_block(0, 0.0, n=30))
+    merger.add(1, device_block(0, 0.0, n=10))
+    assert merger.rows_published == 10
+    merger.flush()
+    samples, rows = merged_rows(merger)
+    assert merger.rows_published == 30
+    assert np.isnan(samples[10:, CHANNELS:]).all()
+
+@pytest.fixture
+def ble_clock(clock, monkeypatch):
+    """The fake clock, also used by Chords_BLE to stamp the arrival of notifications."""
+    monkeypatch.setattr(chords_ble, 'local_clock', clock)
+    return clock
+
+def start_devices(emulator, addresses, merged, client_factory=None, scanner=None):
+    """Connection streaming the emulated devices, with fast reconnects and no LSL outlets or shared ring."""
+    manager = Connection(metrics=False)
+    manager.ble_scanner = scanner
+    manager.lsl_enabled = False
+    manager.shared_ring_name = None
+    manager.show_rate = False
+    manager.reconnect_initial = 0.1
+    manager.reconnect_max = 0.2
+    capture = manager.sinks.attach(CaptureSink())
+    assert manager.connect_ble_devices(addresses, merged, client_factory or emulator.client)
+    deadline = time.monotonic() + 10.0
+    while not all(device.ble_connection.running for device in manager.ble_devices.values()):    # Subscribed, before the clock moves
+        assert time.monotonic() < deadline, "devices did not connect"
+        time.sleep(0.001)
+    return manager, capture
+
+def drained(manager):
+    """Whether the sample queues and sink queues of the connection and of its devices are empty."""
+    connections = [manager] + list(manager.ble_devices.values())
+    queues = [c.sample_queue for c in connections if c.sample_queue]
+    queues += [sink.queue for c in connections for sink in c.sinks.sinks.values()]
+    return all(queue.depth == 0 for queue in queues)
+
+def step_until(clock, emulator, manager, condition, timeout=30.0):
+    """
+    Advance the fake clock one notification at a time until condition() holds. After every step the devices send
+    what is due and the pipeline drains before the clock moves on, however slow the machine is.
+    Args:
+        timeout (float, optional): Real seconds before the test fails
+    """
+    deadline = time.monotonic() + timeout
+    while not condition():
+        clock.now += BLOCK / RATE
+        while not (emulator.caught_up() and drained(manager)):
+            assert time.monotonic() < deadline, "condition not reached"
+            time.sleep(0.001)
+
+def present_rows(capture, device):
+    """Rows of the captured merged stream in which the device has samples."""
+    return sum(int(np.count_nonzero(~np.isnan(b.samples[:, device * CHANNELS]))) for b in list(capture.blocks))
+
+def test_merged_stream_lines_up_emulated_devices(ble_clock):
+    emulator = BleEmulator(RATE, BLOCK, waveform='ramp', seed=1, clock=ble_clock)
+    addresses = ['EMU:00:00:00:00:00:01', 'EMU:00:00:00:00:00:02']
+    asyncio.run(emulator.client(addresses[1]).connect())    # The second device has been sampling for a second already
+    ble_clock.now += 1.0
+    manager, capture = start_devices(emulator, addresses, merged=True)
+    try:
+        step_until(ble_clock, emulator, manager, lambda: min(present_rows(capture, 0), present_rows(capture, 1)) > RATE)
+        stats = manager.ble_device_stats()['merged']
+    finally:
+        manager.cleanup()
+
+    samples, rows = capture.rows()
+    assert np.array_equal(rows, np.arange(rows[0], rows[0] + len(rows)))
+    both = ~np.isnan(samples).any(axis=1)
+    # The ramp carries the sample index: samples of one row were taken at the same time on both devices, give or
+    # take the notification interval by which a block's arrival follows its samples
+    index = samples[both][:, [0, CHANNELS]]
+    starts = [emulator.start_time(address) for address in addresses]
+    skew = (starts[0] + index[:, 0] / RATE) - (starts[1] + index[:, 1] / RATE)
+    assert np.abs(skew).max() < (BLOCK + 1) / RATE
+    assert np.ptp(skew) < 1e-9    # The offset is fixed once, rows then follow the counters
+    assert stats['late_samples'] == 0
+
+def test_merged_stream_fills_device_while_away(ble_clock):
+    emulator = BleEmulator(RATE, BLOCK, waveform='ramp', seed=1, clock=ble_clock)
+    addresses = ['EMU:00:00:00:00:00:01', 'EMU:00:00:00:00:00:02']
+    manager, capture = start_devices(emulator, addresses, merged=True)
+    try:
+        step_until(ble_clock, emulator, manager, lambda: present_rows(capture, 0) > RATE)
+        emulator.drop(addresses[0], 1.5)
+        before = present_rows(capture, 0)
+        late = manager.ble_device_stats()['merged']['late_samples']
+        step_until(ble_clock, emulator, manager, lambda: present_rows(capture, 0) > before + RATE)
+        stats = manager.ble_device_stats()
+        streamed = len(capture.blocks)    # Before cleanup, whose flush publishes the rows device 1 had not reached as NaN
+        assert not manager.start_recording('never_written', 'bin')    # Integer formats cannot hold the NaN fill
+    finally:
+        manager.cleanup()
+
+    samples, rows = capture.rows(streamed)
+    assert np.array_equal(rows, np.arange(rows[0], rows[0] + len(rows)))
+    other = ~np.isnan(samples[:, CHANNELS:]).any(axis=1)
+    assert other[np.argmax(other):].all()                    # The other device never stopped once it started
+
+    present = ~np.isnan(samples[:, :CHANNELS]).any(axis=1)
+    away = ~present[np.argmax(present):]
+    assert np.count_nonzero(np.diff(away.astype(int)) == 1) == 1    # One run of NaN while the device was away
+    outage = stats[addresses[0]]
+    assert outage['reconnects'] == 1
+    assert outage['outage_seconds'] >= 1.5
+    # The rows the device never sent plus the ones it sent after they had been published without it
+    assert away.sum() == outage['outage_missing_samples'] + stats['merged']['late_samples'] - late
+    assert stats['merged']['filled_samples'] >= away.sum()
+    assert present[-RATE // 2:].all()                       # Device 0 is back in the stream
+
+def test_one_device_reconnects_while_other_streams(ble_clock):
+    emulator = BleEmulator(RATE, BLOCK, seed=1, clock=ble_clock)
+    addresses = ['EMU:00:00:00:00:00:01', 'EMU:00:00:00:00:00:02']
+    manager, _ = start_devices(emulator, addresses, merged=False)
+    captures = [manager.ble_devices[address].sinks.attach(CaptureSink()) for address in addresses]
+    delivered = lambda device: sum(len(b.counters) for b in list(captures[device].blocks))
+    try:
+        step_until(ble_clock, emulator, manager, lambda: delivered(0) > RATE)
+        emulator.drop(addresses[0], 1.3)    # Not a whole number of 256-sample counter wraps
+        before = delivered(0)
+        step_until(ble_clock, emulator, manager, lambda: delivered(0) > before + RATE)
+        stats = manager.ble_device_stats()
+    finally:
+        manager.cleanup()
+
+    away, other = stats[addresses[0]], stats[addresses[1]]
+    assert away['reconnects'] == 1
+    assert away['missing_samples'] == 0                     # The outage is not aliased into counter gaps
+    assert away['outage_seconds'] >= 1.3
+    assert away['outage_missing_samples'] == round(away['outage_seconds'] * RATE) - BLOCK
+    assert other['reconnects'] == 0
+    assert other['missing_samples'] == 0
+
+    _, counters = captures[0].rows()
+    steps = np.diff(counters)
+    assert (steps >= 1).all()
+    assert np.count_nonzero(steps > 1) == 1                  # One jump over the outage
+    assert steps.max() == away['outage_missing_samples'] + 1
+    _, counters = captures[1].rows()
+    assert np.array_equal(counters, np.arange(counters[0], counters[0] + len(counters)))
+
+class IdleScanner:
+    """BleakScanner stand-in that hears nothing."""
+    def __init__(self, callback):
+        self.callback = callback
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+def test_scanner_paused_while_devices_connect(ble_clock):
+    emulator = BleEmulator(RATE, BLOCK, seed=1, clock=ble_clock)
+    addresses = ['EMU:00:00:00:00:00:01', 'EMU:00:00:00:00:00:02']
+    scanner = BleScanner(scanner_factory=IdleScanner).start()
+    scanning_at_connect = []
+
+    def client(address):
+        fake = emulator.client(address)
+        connect = fake.connect
+        async def recording_connect():
+            scanning_at_connect.append(scanner.scanning)
+            await connect()
+        fake.connect = recording_connect
+        return fake
+
+    try:
+        assert scanner.wait_first_cycle(3.0)
+        assert scanner.scanning
+        manager, _ = start_devices(emulator, addresses, merged=False, client_factory=client, scanner=scanner)
+        try:
+            deadline = time.monotonic() + 5.0
+            while not scanner.scanning:    # Scanning again once both devices are connected
+                assert time.monotonic() < deadline, "scanner was not resumed"
+                time.sleep(0.01)
+        finally:
+            manager.cleanup()
+    finally:
+        scanner.stop()
+    assert scanning_at_connect == [False, False]